@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+
+# Prior question difficulty (logits) for each generation tier, before any answers
+TIER_DIFFICULTY = {"easy": -1.0, "medium": 0.0, "hard": 1.0}
+# Serve questions the learner should get right about this often
+TARGET_SUCCESS_PROBABILITY = 0.6
+# Learner ability moves fast (a quiz is 10 questions), question difficulty slowly
+ABILITY_K = 0.8
+DIFFICULTY_K = 0.4
+# Step sizes shrink as K / (1 + decay * answers seen), so estimates settle with use
+ABILITY_DECAY = 0.1
+DIFFICULTY_DECAY = 0.05
+
+
+def success_probability(ability, difficulty):
+    # 1-PL (Rasch) model: P(correct) = sigmoid(ability - difficulty)
+    return 1.0 / (1.0 + np.exp(np.asarray(difficulty, dtype=float) - np.asarray(ability, dtype=float)))
+
+
+def elo_update(abilities, difficulties, outcomes, ability_answers, difficulty_answers):
+    """One Elo step for a batch of answers; every argument is array-like of equal length.
+
+    Returns (new abilities, new difficulties, predicted success probabilities).
+    """
+    abilities = np.asarray(abilities, dtype=float)
+    difficulties = np.asarray(difficulties, dtype=float)
+    expected = success_probability(abilities, difficulties)
+    residual = np.asarray(outcomes, dtype=float) - expected
+    ability_step = ABILITY_K / (1.0 + ABILITY_DECAY * np.asarray(ability_answers, dtype=float))
+    difficulty_step = DIFFICULTY_K / (1.0 + DIFFICULTY_DECAY * np.asarray(difficulty_answers, dtype=float))
+    return abilities + ability_step * residual, difficulties - difficulty_step * residual, expected
+
+
+def ability_after_answer(ability, ability_answers, difficulty, correct):
+    new_abilities, _, _ = elo_update([ability], [difficulty], [1.0 if correct else 0.0], [ability_answers], [0])
+    return float(new_abilities[0])
+
+
+def target_difficulty(ability, target_probability=TARGET_SUCCESS_PROBABILITY):
+    # Solve sigmoid(ability - difficulty) = target for difficulty
+    return ability - math.log(target_probability / (1.0 - target_probability))
+
+
+def tier_for_difficulty(difficulty):
+    return min(TIER_DIFFICULTY, key=lambda tier: abs(TIER_DIFFICULTY[tier] - difficulty))
+
+
+def pick_question_index(difficulties, available, target, band_width=None):
+    """Index of the available question closest to ``target``, or None.
+
+    With ``band_width`` set, questions further than that from the target
+    do not count, so an empty band can be refilled at the right tier.
+    """
+    if not len(difficulties):
+        return None
+    distance = np.abs(difficulties - target)
+    distance[~available] = np.inf
+    index = int(np.argmin(distance))
+    if not np.isfinite(distance[index]) or (band_width is not None and distance[index] > band_width):
+        return None
+    return index
@@ -1,56 +1,76 @@
+import time
+
+# Taken before the imports so a process's first run can report what they cost
+script_started_at = time.perf_counter()
+
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import json
 import asyncio
 import os
-from agno.agent import Agent
-from agno.models.groq import Groq
 from dotenv import load_dotenv
 import re
-from streamlit_mic_recorder import speech_to_text
-from gtts import gTTS
 import tempfile
-import io # Added for BytesIO
+import threading
+import uuid
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from content_cache import ContentCache, DEFAULT_CACHE_PATH
+from quiz_parsing import QuizStreamParser
+from curriculum import OUTLINE_SCHEMA_INSTRUCTION, SECTION_TOPICS_SCHEMA_INSTRUCTION, build_outline_prompt, expand_sections, generate_validated, is_valid_section, parse_outline, parse_section_topics, validator
+from quiz_state import QuizStateRegistry, ensure_section_id, new_section_id
+from study_plan import StudyPlanIndex
+from tts_cache import TTSAudioCache, DEFAULT_TTS_CACHE_DIR, get_synthesizer, split_into_chunks, submit_chunks
+from llm_scheduler import LLMScheduler, PRIORITY_INTERACTIVE, PRIORITY_PREFETCH, PRIORITY_BULK, PRIORITY_WARMUP, estimate_tokens
+from hedging import Hedger, DeadlineExceeded, DEFAULT_HEDGE_PERCENTILE, DEFAULT_MAX_HEDGE_RATIO
+from telemetry import Telemetry, start_json_dump, start_metrics_server
+from startup import StartupReport
+from progress_store import ProgressStore, DEFAULT_MAX_LEARNERS, DEFAULT_PROGRESS_DB_PATH, section_scope
+from session_memory import SessionMemoryRegistry, DEFAULT_SESSION_BUDGET_BYTES, DEFAULT_SPILL_DIR
+from job_queue import JobQueue, DEFAULT_JOB_DB_PATH, FINISHED_JOB_STATUSES, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+from warmup import DemandTracker, Warmer, DEFAULT_WARMUP_DB_PATH, DEFAULT_MIN_DEMAND, DEFAULT_TOP_N
+# agno, the Groq client and the mic recorder are imported on first use (gTTS in tts_cache),
+# as are the NumPy- and Arrow-backed question_bank, ability_model, subject_index and content_pack
+
+imports_done_at = time.perf_counter()
 
 load_dotenv()
 
 st.set_page_config(layout="wide", page_title="AI Study Assistant", initial_sidebar_state="expanded")
 
+@st.cache_resource
+def get_startup_report():
+    return StartupReport()
+
+startup_report = get_startup_report()
+startup_report.record_phase("eager_imports", imports_done_at - script_started_at)
+
 st.markdown("<h1 class='main-header'>🧠 AI Study Assistant 🚀</h1>", unsafe_allow_html=True)
 st.write("Organize your study with custom sections, topics, and generate targeted study maps or quizzes!")
 
+first_paint_s = time.perf_counter() - script_started_at
+startup_report.record_phase("first_paint", first_paint_s)
+
 if 'sections' not in st.session_state:
     st.session_state.sections = []
-if 'study_map_output' not in st.session_state:
-    st.session_state.study_map_output = {}
-if 'quiz_output' not in st.session_state:
-    st.session_state.quiz_output = {}
-if 'user_quiz_answers' not in st.session_state:
-    st.session_state.user_quiz_answers = {}
-if 'quiz_submitted' not in st.session_state:
-    st.session_state.quiz_submitted = {}
-if 'current_question_index' not in st.session_state:
-    st.session_state.current_question_index = {}
-if 'quiz_difficulty_state' not in st.session_state:
-    st.session_state.quiz_difficulty_state = {}
-if 'current_quiz_question_data' not in st.session_state:
-    st.session_state.current_quiz_question_data = {}
-if 'quiz_question_feedback' not in st.session_state:
-    st.session_state.quiz_question_feedback = {}
-if 'quiz_total_correct' not in st.session_state:
-    st.session_state.quiz_total_correct = {}
-if 'quiz_total_attempted' not in st.session_state:
-    st.session_state.quiz_total_attempted = {}
-if 'quiz_question_count' not in st.session_state:
-    st.session_state.quiz_question_count = {}
+# Section/topic lookups and topic search, see study_plan.StudyPlanIndex
+if 'study_plan_index' not in st.session_state:
+    st.session_state.study_plan_index = StudyPlanIndex(st.session_state.sections)
+st.session_state.study_plan_index.sync(st.session_state.sections)
+# Adaptive quiz state for every section, keyed by the section's stable id
+if 'quiz_states' not in st.session_state:
+    st.session_state.quiz_states = QuizStateRegistry()
 if 'active_quiz_section' not in st.session_state:
     st.session_state.active_quiz_section = None
-if 'quiz_current_grade' not in st.session_state:
-    st.session_state.quiz_current_grade = {}
-# NEW: State to lock quiz options
-if 'quiz_options_locked' not in st.session_state:
-    st.session_state.quiz_options_locked = {}
+if 'quiz_prefetch_stats' not in st.session_state:
+    st.session_state.quiz_prefetch_stats = {'hits': 0, 'misses': 0, 'wasted': 0}
 
 
+# Answers are stored per learner; the id rides in the URL so a refresh keeps the history
+if 'learner_id' not in st.session_state:
+    st.session_state.learner_id = st.query_params.get("learner") or uuid.uuid4().hex
+    st.query_params["learner"] = st.session_state.learner_id
+# Mirrors of the learner's rollup in the progress store, see calculate_overall_grade
 if 'overall_total_correct' not in st.session_state:
     st.session_state.overall_total_correct = 0
 if 'overall_total_attempted' not in st.session_state:
@@ -61,20 +81,106 @@ if 'overall_grade' not in st.session_state:
 if 'voice_input_subject' not in st.session_state:
     st.session_state.voice_input_subject = ""
 
-if 'tts_audio_files' not in st.session_state:
-    st.session_state.tts_audio_files = {}
+if 'tts_autoplay' not in st.session_state:
+    st.session_state.tts_autoplay = None
+
+# Time-to-first-token / time-to-complete of recent generations
+if 'generation_timings' not in st.session_state:
+    st.session_state.generation_timings = []
+# Wall time of recent full-script and fragment reruns, by scope
+if 'rerun_timings' not in st.session_state:
+    st.session_state.rerun_timings = {}
 
 MAX_QUIZ_QUESTIONS = 10
+MAX_GENERATION_TIMINGS = 50
+MAX_RERUN_TIMINGS = 20
+SIDEBAR_REFRESH_SECONDS = 5
+GROQ_MODEL_ID = "llama3-8b-8192"
+# Hedged duplicates of slow requests go to this model; the same one unless set
+LLM_HEDGE_MODEL_ID = os.getenv("LLM_HEDGE_MODEL_ID", GROQ_MODEL_ID)
+# Per-request HTTP timeout of the Groq client, so a hung connection cannot hold a call forever
+LLM_CLIENT_TIMEOUT_SECONDS = float(os.getenv("LLM_CLIENT_TIMEOUT_SECONDS", 120))
+QUIZ_PREFETCH_WORKERS = 8
+QUESTION_BANK_BATCH_SIZE = 5
+# Default of the sidebar's similar subject threshold, see subject_index.SubjectIndex.match
+SUBJECT_MATCH_THRESHOLD = float(os.getenv("SUBJECT_MATCH_THRESHOLD", 0.8))
+QUIZ_GENERATION_ATTEMPTS = int(os.getenv("QUIZ_GENERATION_ATTEMPTS", 3))
+STUDY_MAP_CONCURRENCY = int(os.getenv("STUDY_MAP_CONCURRENCY", 4))
+# Sections expanded at once; the LLM scheduler still caps the calls in flight
+CURRICULUM_SECTION_WORKERS = int(os.getenv("CURRICULUM_SECTION_WORKERS", 16))
+CURRICULUM_GENERATION_ATTEMPTS = int(os.getenv("CURRICULUM_GENERATION_ATTEMPTS", 3))
+TTS_CHUNK_CHARS = 400
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", 4))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 8))
+JOB_POLL_SECONDS = 0.5
+SECTIONS_PER_PAGE = int(os.getenv("SECTIONS_PER_PAGE", 5))
+TOPIC_SEARCH_RESULTS = 8
+SHOW_TELEMETRY_PANEL = os.getenv("TELEMETRY_ADMIN_PANEL", "").lower() in ("1", "true", "yes")
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1").lower() in ("1", "true", "yes")
+# Warm-up only runs once nothing else has used the LLM for this long, and while
+# at least this share of the shared requests/min and tokens/min budgets is left
+WARMUP_IDLE_SECONDS = float(os.getenv("WARMUP_IDLE_SECONDS", 10))
+WARMUP_MIN_HEADROOM = float(os.getenv("WARMUP_MIN_HEADROOM", 0.5))
+# Study maps warmed along with a popular curriculum, from its first section
+WARMUP_TOPICS_PER_SUBJECT = int(os.getenv("WARMUP_TOPICS_PER_SUBJECT", 4))
+# Expected completion size per agent, used to budget tokens/min before a call is sent
+EXPECTED_COMPLETION_TOKENS = {
+    "Study Map Agent": 1200,
+    "Quiz Generation Agent": 300,
+    "Question Bank Agent": 300 * QUESTION_BANK_BATCH_SIZE,
+    "Curriculum Outline Agent": 200,
+    "Curriculum Section Agent": 100,
+}
+# Longest an interactive call waits for a result before falling back to cached or bank
+# content; LLM_DEADLINES='{"Quiz Generation Agent": 10}' overrides any of them
+LLM_DEADLINE_SECONDS = {
+    "Study Map Agent": 60.0,
+    "Quiz Generation Agent": 20.0,
+    "Question Bank Agent": 45.0,
+    "Curriculum Outline Agent": 30.0,
+    "Curriculum Section Agent": 30.0,
+    **json.loads(os.getenv("LLM_DEADLINES", "{}")),
+}
 
 groq_api_key = os.getenv("GROQ_API_KEY")
 if not groq_api_key:
     st.error("GROQ_API_KEY environment variable not set. Please set it to use Groq API.")
     st.stop()
 
-@st.cache_resource
-def get_study_map_agent():
-    return Agent(
-        model=Groq(id="llama3-8b-8192"),
+def build_agent(model_id=GROQ_MODEL_ID, client=None, **agent_options):
+    # agno and the Groq client take about half a second to import, so sessions
+    # that never call an agent (e.g. only adding sections by hand) skip them
+    Agent = startup_report.lazy_import("agno.agent").Agent
+    Groq = startup_report.lazy_import("agno.models.groq").Groq
+    return Agent(model=Groq(id=model_id, timeout=LLM_CLIENT_TIMEOUT_SECONDS, client=client), **agent_options)
+
+def agent_options(agent):
+    return {'name': agent.name, 'role': agent.role, 'instructions': agent.instructions, 'markdown': agent.markdown}
+
+def build_hedge_agent(agent):
+    # A separate instance, so a hedge never shares run state with the primary
+    return build_agent(model_id=LLM_HEDGE_MODEL_ID, **agent_options(agent))
+
+def agent_for_run(agent):
+    # agno keeps run_response, run_id and memory on the Agent itself, and the
+    # shared agents are called from many threads at once, so every call runs on
+    # a fresh instance with the same options. The Groq HTTP client is shared.
+    return build_agent(model_id=agent.model.id, client=agent.model.get_client(), **agent_options(agent))
+
+def built_once(build):
+    # For the warm-up and job worker threads, which have no script run to call the
+    # st.cache_resource getters from: built on the first call from any thread, then shared
+    lock = threading.Lock()
+    built = []
+    def get():
+        with lock:
+            if not built:
+                built.append(build())
+            return built[0]
+    return get
+
+def build_study_map_agent():
+    return build_agent(
         name="Study Map Agent",
         role="An expert educator focused on breaking down complex topics into digestible study plans.",
         instructions=[
@@ -97,9 +203,11 @@ def get_study_map_agent():
     )
 
 @st.cache_resource
-def get_quiz_generation_agent():
-    return Agent(
-        model=Groq(id="llama3-8b-8192"),
+def get_study_map_agent():
+    return build_study_map_agent()
+
+def build_quiz_generation_agent():
+    return build_agent(
         name="Quiz Generation Agent",
         role="A specialized AI for creating accurate and engaging educational quizzes covering multiple related topics.",
         instructions=[
@@ -123,134 +231,772 @@ def get_quiz_generation_agent():
     )
 
 @st.cache_resource
-def get_curriculum_agent():
-    curriculum_schema_instruction = """
-    The output MUST be a JSON object ONLY, with the following structure. Do NOT include any other text or markdown.
-    {
-      "sections": [
-        {
-          "name": "Section Name",
-          "topics": [
-            "Topic 1",
-            "Topic 2"
-          ]
-        }
-      ]
-    }
-    """
-    return Agent(
-        model=Groq(id="llama3-8b-8192"),
-        name="Curriculum Agent",
-        role="An expert curriculum designer whose task is to break down a broad subject into logical sections and relevant topics within each section. The output must be a pure JSON object.",
+def get_quiz_generation_agent():
+    return build_quiz_generation_agent()
+
+def build_question_bank_agent():
+    return build_agent(
+        name="Question Bank Agent",
+        role="A specialized AI that writes banks of accurate multiple-choice questions as structured JSON.",
+        instructions=[
+            "Generate the requested number of distinct multiple-choice questions for the given topic and difficulty.",
+            "Each question has exactly four answer options and exactly one correct answer.",
+            "Give the options as plain text without 'A)' style prefixes; the correct answer is the letter A, B, C or D.",
+            "Provide a brief explanation for the correct answer.",
+            "Your entire response MUST be a valid JSON object. Do NOT include any conversational text or markdown outside the JSON structure.",
+            startup_report.lazy_import("question_bank").QUESTION_BATCH_SCHEMA_INSTRUCTION
+        ],
+        markdown=False
+    )
+
+@st.cache_resource
+def get_question_bank_agent():
+    return build_question_bank_agent()
+
+def build_curriculum_outline_agent():
+    return build_agent(
+        name="Curriculum Outline Agent",
+        role="An expert curriculum designer who breaks a broad subject down into logical, ordered sections. The output must be a pure JSON object.",
         instructions=[
             "Focus on core concepts and foundational knowledge for the given subject.",
-            "Provide at least 5 sections, with 4-6 relevant topics per section.",
-            "Ensure the topics within each section are cohesive.",
+            "List the sections in the order a learner should study them.",
+            "Provide at least 5 sections; broad subjects may need 20 or more.",
+            "Give section names only; the topics of each section are written separately.",
+            "Your entire response MUST be a valid JSON object. Do NOT include any conversational text, introductory phrases, or markdown outside the JSON structure.",
+            OUTLINE_SCHEMA_INSTRUCTION
+        ],
+        markdown=False
+    )
+
+@st.cache_resource
+def get_curriculum_outline_agent():
+    return build_curriculum_outline_agent()
+
+def build_curriculum_section_agent():
+    return build_agent(
+        name="Curriculum Section Agent",
+        role="An expert curriculum designer who writes the topics for one section of a curriculum. The output must be a pure JSON object.",
+        instructions=[
+            "Provide 4-6 relevant topics for the requested section, in the order they should be studied.",
+            "Ensure the topics within the section are cohesive and do not repeat the other sections.",
             "Your entire response MUST be a valid JSON object. Do NOT include any conversational text, introductory phrases, or markdown outside the JSON structure.",
-            curriculum_schema_instruction
+            SECTION_TOPICS_SCHEMA_INSTRUCTION
         ],
         markdown=False
     )
 
-study_map_agent = get_study_map_agent()
-quiz_generation_agent = get_quiz_generation_agent()
-curriculum_agent = get_curriculum_agent()
-
-def parse_single_quiz_question_markdown(markdown_text):
-    match = re.search(
-        r'^(?:### Question \d+:)?\s*(.*?)\n'
-        r'([A-D]\).*?)\n'
-        r'([A-D]\).*?)\n'
-        r'([A-D]\).*?)\n'
-        r'([A-D]\).*?)\n'
-        r'Correct Answer: ([A-D]\) .*?)\n'
-        r'Explanation: (.*)$',
-        markdown_text, re.DOTALL | re.MULTILINE
+@st.cache_resource
+def get_curriculum_section_agent():
+    return build_curriculum_section_agent()
+
+@st.cache_resource
+def get_built_resources():
+    # The stores below that have been built in this process, by name, so the
+    # sidebar can show their counts without loading one just to count it
+    return {}
+
+@st.cache_resource
+def get_question_bank():
+    # Shared so question difficulty is calibrated by every learner's answers
+    question_bank = startup_report.lazy_import("question_bank").QuestionBank()
+    get_telemetry().add_collector(lambda: [("question_bank_questions", {}, question_bank.size())])
+    get_built_resources()["question_bank"] = question_bank
+    return question_bank
+
+@st.cache_resource
+def get_subject_index():
+    # Subjects that already have a curriculum, for near-duplicate lookups
+    subject_index_module = startup_report.lazy_import("subject_index")
+    subject_index = subject_index_module.SubjectIndex(
+        os.getenv("SUBJECT_INDEX_PATH", subject_index_module.DEFAULT_SUBJECT_INDEX_PATH),
+        match_threshold=SUBJECT_MATCH_THRESHOLD,
     )
+    get_built_resources()["subject_index"] = subject_index
+    return subject_index
 
-    if match:
-        question_text = match.group(1).strip()
-        options = [
-            match.group(2).strip(),
-            match.group(3).strip(),
-            match.group(4).strip(),
-            match.group(5).strip()
-        ]
-        correct_answer_full = match.group(6).strip()
-        explanation = match.group(7).strip()
-
-        correct_answer_letter_match = re.match(r'([A-D])\)', correct_answer_full)
-        correct_answer_letter = correct_answer_letter_match.group(1) if correct_answer_letter_match else None
-
-        return {
-            "question": question_text,
-            "options": options,
-            "correct_answer_full": correct_answer_full,
-            "correct_answer_letter": correct_answer_letter,
-            "explanation": explanation
-        }
-    return None
+@st.cache_resource
+def get_content_pack_library():
+    content_pack = startup_report.lazy_import("content_pack")
+    return content_pack.ContentPackLibrary(os.getenv("CONTENT_PACK_DIR", content_pack.DEFAULT_PACK_DIR))
 
-def generate_adaptive_quiz_question(section_name, all_topics_in_section, difficulty_hint="normal"):
-    current_topic_index = st.session_state.quiz_difficulty_state[section_name].get('current_topic_index', 0)
-    
-    if not all_topics_in_section:
-        st.warning("No topics available in this section for quiz generation.")
+@st.cache_resource
+def load_pack_into_question_bank(pack_id):
+    # Once per process and pack; the questions keep the difficulty calibrated when exported
+    pack = get_content_pack_library().get(pack_id)
+    question_bank = get_question_bank()
+    return sum(question_bank.add(topic_name, "medium", pack.questions(topic_name)) for topic_name in pack.topic_names())
+
+@st.cache_resource
+def get_progress_store():
+    return ProgressStore(
+        os.getenv("PROGRESS_DB_PATH", DEFAULT_PROGRESS_DB_PATH),
+        max_learners=int(os.getenv("PROGRESS_MAX_LEARNERS", DEFAULT_MAX_LEARNERS)),
+    )
+
+@st.cache_resource
+def get_session_memory_registry():
+    registry = SessionMemoryRegistry(
+        budget_bytes=int(os.getenv("SESSION_MEMORY_BUDGET_BYTES", DEFAULT_SESSION_BUDGET_BYTES)),
+        spill_dir=os.getenv("SESSION_SPILL_DIR", DEFAULT_SPILL_DIR),
+    )
+    get_telemetry().add_collector(registry.gauges)
+    return registry
+
+@st.cache_resource
+def get_quiz_prefetch_executor():
+    return ThreadPoolExecutor(max_workers=QUIZ_PREFETCH_WORKERS, thread_name_prefix="quiz_prefetch")
+
+@st.cache_resource
+def get_llm_scheduler():
+    return LLMScheduler(
+        requests_per_minute=int(os.getenv("LLM_REQUESTS_PER_MINUTE", 30)),
+        tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", 30000)),
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 8)),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", 4)),
+    )
+
+@st.cache_resource
+def get_hedger():
+    hedger = Hedger(
+        hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE)),
+        max_hedge_ratio=float(os.getenv("LLM_HEDGE_MAX_RATIO", DEFAULT_MAX_HEDGE_RATIO)),
+    )
+    get_telemetry().add_collector(hedger.gauges)
+    return hedger
+
+def agent_token_estimate(agent, prompt):
+    return estimate_tokens(agent.role, *agent.instructions, prompt, completion_tokens=EXPECTED_COMPLETION_TOKENS.get(agent.name, 500))
+
+def record_agent_usage(agent, run_metrics):
+    # agno reports per-model-call lists, e.g. {'input_tokens': [812], 'output_tokens': [240], ...}
+    for metric_name, kind in (("input_tokens", "prompt"), ("output_tokens", "completion")):
+        token_count = sum(value for value in (run_metrics or {}).get(metric_name, []) if isinstance(value, (int, float)))
+        if token_count:
+            telemetry.inc("llm_tokens_total", token_count, agent=agent.name, kind=kind)
+
+def run_agent_instrumented(agent, prompt):
+    run_agent = agent_for_run(agent)
+    with telemetry.track("llm_request", agent=agent.name):
+        run_response = run_agent.run(prompt, stream=False)
+    # Usage of this run only, from the response it returned
+    record_agent_usage(agent, run_response.metrics)
+    return run_response.content
+
+def hedge_allowed():
+    # A hedge never jumps ahead of work already waiting for the scheduler (warm-up aside)
+    scheduler_metrics = llm_scheduler.metrics()
+    return scheduler_metrics['queue_depth'] == scheduler_metrics['queued_by_priority']['warmup']
+
+def hedged_attempts(agent, make_attempt):
+    # The primary on `agent`, then a hedge on its alternate (built on first use)
+    return [
+        make_attempt(lambda: agent, 0),
+        make_attempt(lambda: hedger.alternate(agent.name, lambda: build_hedge_agent(agent)), 1),
+    ]
+
+def run_agent_scheduled(agent, prompt, priority=PRIORITY_INTERACTIVE, key=None, validate=None):
+    estimated_tokens = agent_token_estimate(agent, prompt)
+    if priority != PRIORITY_INTERACTIVE:
+        # Only a learner waiting on the answer is worth a deadline and a duplicate request;
+        # prefetch, bulk and warm-up work runs once, at its own priority
+        return llm_scheduler.run(lambda: run_agent_instrumented(agent, prompt), priority=priority, key=key, estimated_tokens=estimated_tokens)
+
+    def make_attempt(get_agent, index):
+        # Only the primary coalesces with identical requests; a hedge must be a separate call
+        attempt_key = key if index == 0 else None
+        def attempt(context):
+            attempt_agent = get_agent()
+            future = llm_scheduler.submit(lambda: run_agent_instrumented(attempt_agent, prompt), priority, attempt_key, estimated_tokens)
+            if attempt_key is None:
+                # A coalesced request may be shared with other callers, so only a private one is withdrawn
+                context.on_cancel(future.cancel)
+            return future.result()
+        return attempt
+
+    return hedger.run(agent.name, hedged_attempts(agent, make_attempt), LLM_DEADLINE_SECONDS.get(agent.name), validate, hedge_allowed)
+
+@st.cache_resource
+def get_tts_executor():
+    return ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
+
+@st.cache_resource
+def get_tts_synthesizer():
+    # TTS_BACKEND=stub synthesizes silence locally, for offline runs and tests
+    return get_synthesizer(os.getenv("TTS_BACKEND", "gtts"), lang="en")
+
+@st.cache_resource
+def get_tts_audio_cache():
+    return TTSAudioCache(
+        directory=os.getenv("TTS_CACHE_DIR", DEFAULT_TTS_CACHE_DIR),
+        max_bytes=int(os.getenv("TTS_CACHE_MAX_BYTES", 100 * 1024 * 1024)),
+    )
+
+@st.cache_resource
+def get_content_cache():
+    return ContentCache(
+        path=os.getenv("CONTENT_CACHE_PATH", DEFAULT_CACHE_PATH),
+        ttl_seconds=int(os.getenv("CONTENT_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+        max_entries=int(os.getenv("CONTENT_CACHE_MAX_ENTRIES", 5000)),
+        max_bytes=int(os.getenv("CONTENT_CACHE_MAX_BYTES", 200 * 1024 * 1024)),
+    )
+
+def shared_resource_gauges(content_cache, tts_audio_cache, scheduler):
+    content_stats = content_cache.stats()
+    tts_stats = tts_audio_cache.stats()
+    tts_lookups = tts_stats['hits'] + tts_stats['misses']
+    scheduler_metrics = scheduler.metrics()
+    return [
+        ("content_cache_entries", {}, content_stats['entries']),
+        ("content_cache_bytes", {}, content_stats['bytes']),
+        ("content_cache_hit_ratio", {}, content_stats['hit_rate']),
+        ("tts_cache_bytes", {}, tts_stats['bytes']),
+        ("tts_cache_hit_ratio", {}, tts_stats['hits'] / tts_lookups if tts_lookups else 0.0),
+        ("llm_queue_depth", {}, scheduler_metrics['queue_depth']),
+        ("llm_active_requests", {}, scheduler_metrics['active']),
+        ("llm_queue_wait_p95_seconds", {}, scheduler_metrics['wait_p95_s']),
+    ]
+
+@st.cache_resource
+def get_telemetry():
+    # One registry per server process. METRICS_PORT serves /metrics (Prometheus)
+    # and /metrics.json; METRICS_JSON_PATH rewrites a JSON snapshot periodically.
+    telemetry = Telemetry()
+    content_cache, tts_audio_cache, scheduler = get_content_cache(), get_tts_audio_cache(), get_llm_scheduler()
+    telemetry.add_collector(lambda: shared_resource_gauges(content_cache, tts_audio_cache, scheduler))
+    telemetry.add_collector(get_startup_report().gauges)
+    progress_store = get_progress_store()
+    telemetry.add_collector(lambda: [
+        ("progress_answers_pending", {}, progress_store.pending()),
+        ("progress_answers_written", {}, progress_store.answers_written),
+        ("progress_learners_in_memory", {}, progress_store.learners_in_memory()),
+    ])
+    telemetry.endpoint_error = None
+    metrics_port = os.getenv("METRICS_PORT")
+    if metrics_port:
+        try:
+            start_metrics_server(telemetry, int(metrics_port), host=os.getenv("METRICS_HOST", "0.0.0.0"))
+        except OSError as e:
+            telemetry.endpoint_error = f"Metrics endpoint on port {metrics_port} not started: {e}"
+    metrics_json_path = os.getenv("METRICS_JSON_PATH")
+    if metrics_json_path:
+        start_json_dump(telemetry, metrics_json_path, float(os.getenv("METRICS_JSON_INTERVAL_SECONDS", 30)))
+    return telemetry
+
+def agent_cache_key(agent, prompt):
+    return ContentCache.make_key(agent.name, GROQ_MODEL_ID, [agent.role, *agent.instructions], prompt)
+
+def cache_lookup(content_cache, agent, cache_key, refresh):
+    if refresh:
+        telemetry.inc("content_cache_lookups_total", agent=agent.name, result="refresh")
         return None
+    cached_content = content_cache.get(cache_key)
+    telemetry.inc("content_cache_lookups_total", agent=agent.name, result="hit" if cached_content is not None else "miss")
+    return cached_content
+
+def run_agent_cached(agent, prompt, validate=None, content_cache=None, priority=PRIORITY_INTERACTIVE, refresh=False):
+    # Read-through cache shared by all sessions; only outputs that pass
+    # `validate` are stored so a malformed generation is never replayed.
+    # Worker threads pass content_cache in since they have no script context.
+    # refresh=True skips the lookup and overwrites the cached output.
+    if content_cache is None:
+        content_cache = get_content_cache()
+    cache_key = agent_cache_key(agent, prompt)
+    cached_content = cache_lookup(content_cache, agent, cache_key, refresh)
+    if cached_content is not None:
+        return cached_content
+
+    def is_usable(content):
+        return bool(content) and (validate is None or validate(content))
+
+    # Concurrent identical requests (same cache key) share one LLM call; an unusable one is hedged at once
+    content = run_agent_scheduled(agent, prompt, priority, key=cache_key, validate=is_usable)
+    if is_usable(content):
+        content_cache.put(cache_key, content, namespace=agent.name)
+    return content
+
+def stream_agent_cached(agent, prompt, on_delta, validate=None, content_cache=None, refresh=False):
+    # Same cache contract as run_agent_cached, but calls on_delta(delta, text_so_far)
+    # for every streamed chunk. A cache hit is delivered as a single delta.
+    if content_cache is None:
+        content_cache = get_content_cache()
+    cache_key = agent_cache_key(agent, prompt)
+    started_at = time.perf_counter()
+    cached_content = cache_lookup(content_cache, agent, cache_key, refresh)
+    if cached_content is not None:
+        on_delta(cached_content, cached_content)
+        elapsed = time.perf_counter() - started_at
+        return cached_content, {'first_token_s': elapsed, 'complete_s': elapsed, 'cached': True}
+
+    # The first attempt to stream a token claims the call: only its deltas reach
+    # on_delta, and the deadline and hedging cover the wait for that first token
+    def make_attempt(get_agent, _):
+        def attempt(context):
+            attempt_agent = agent_for_run(get_agent())
+            first_token_s = None
+            parts = []
+            # Streaming runs on the attempt's thread, so it only borrows a rate-limited slot
+            with llm_scheduler.slot(PRIORITY_INTERACTIVE, agent_token_estimate(attempt_agent, prompt)):
+                if context.cancelled.is_set():
+                    return None
+                with telemetry.track("llm_request", agent=attempt_agent.name):
+                    stream = attempt_agent.run(prompt, stream=True)
+                    for chunk in stream:
+                        delta = getattr(chunk, "content", None)
+                        if not isinstance(delta, str) or not delta:
+                            continue
+                        if first_token_s is None:
+                            if not context.claim():
+                                getattr(stream, "close", lambda: None)()
+                                return None
+                            first_token_s = time.perf_counter() - started_at
+                        parts.append(delta)
+                        on_delta(delta, "".join(parts))
+                # Streamed chunks carry no usage; this call's own agent keeps it on its run response
+                record_agent_usage(attempt_agent, getattr(attempt_agent.run_response, "metrics", None))
+            return "".join(parts), first_token_s
+        return attempt
+
+    content, first_token_s = hedger.run(
+        f"{agent.name} (first token)", hedged_attempts(agent, make_attempt), LLM_DEADLINE_SECONDS.get(agent.name),
+        validate=lambda outcome: outcome is not None and bool(outcome[0]), can_hedge=hedge_allowed
+    ) or ("", None)
+    complete_s = time.perf_counter() - started_at
+
+    if content and (validate is None or validate(content)):
+        content_cache.put(cache_key, content, namespace=agent.name)
+    return content, {'first_token_s': first_token_s, 'complete_s': complete_s, 'cached': False}
+
+def rerun_quiz_panel():
+    # Only the quiz panel fragment needs to redraw, but scope="fragment" is
+    # rejected while the fragment is being drawn as part of a full-app run.
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
 
+def record_rerun_timing(scope, started_at):
+    elapsed = time.perf_counter() - started_at
+    telemetry.observe("script_run_seconds", elapsed, scope=scope)
+    timings = st.session_state.rerun_timings.setdefault(scope, [])
+    timings.append(elapsed)
+    del timings[:-MAX_RERUN_TIMINGS]
+
+def record_generation_timing(kind, label, timing):
+    st.session_state.generation_timings.append({'kind': kind, 'label': label, **timing})
+    del st.session_state.generation_timings[:-MAX_GENERATION_TIMINGS]
+
+def study_map_prompt(topic_name):
+    return f"Generate a study map for the topic: '{topic_name}'"
+
+def curriculum_prompt(subject):
+    return f"Generate a curriculum for the subject: '{subject}'"
+
+def curriculum_cache_key(subject):
+    # Assembled curricula (outline plus every section) are cached as one entry per subject
+    return ContentCache.make_key("Curriculum", GROQ_MODEL_ID, [OUTLINE_SCHEMA_INSTRUCTION, SECTION_TOPICS_SCHEMA_INSTRUCTION], curriculum_prompt(subject))
+
+def is_valid_curriculum_json(content):
+    try:
+        curriculum_data = json.loads(content)
+    except json.JSONDecodeError:
+        return False
+    return isinstance(curriculum_data, dict) and "sections" in curriculum_data
+
+def cached_curriculum_sections(subject, content_cache):
+    # The curriculum already generated for exactly this subject, or None
+    cached_content = content_cache.get(curriculum_cache_key(subject))
+    if cached_content is None or not is_valid_curriculum_json(cached_content):
+        return None
+    return [s for s in json.loads(cached_content)["sections"] if is_valid_section(s)]
+
+def store_curriculum(subject, sections, content_cache, subject_index):
+    # Only complete curricula are cached and offered to similar subjects
+    content_cache.put(curriculum_cache_key(subject), json.dumps({"sections": sections}), namespace="Curriculum")
+    subject_index.add(subject)
+
+llm_scheduler = get_llm_scheduler()
+telemetry = get_telemetry()
+hedger = get_hedger()
+# Agents are built on first use through their get_*_agent() accessors
+
+# Generated content is held in size-bounded stores that compress or spill
+# cold entries, see session_memory.SessionMemory
+if 'session_memory' not in st.session_state:
+    st.session_state.session_memory = get_session_memory_registry().new_session()
+    st.session_state.study_map_output = st.session_state.session_memory.store("study_maps")
+    # Read Aloud audio per topic, as content-hash keys into the shared TTS cache
+    st.session_state.tts_audio_files = st.session_state.session_memory.store("tts_audio")
+    st.session_state.downloads = st.session_state.session_memory.store("downloads")
+
+if 'first_paint_s' not in st.session_state:
+    st.session_state.first_paint_s = first_paint_s
+    telemetry.observe("session_first_paint_seconds", first_paint_s)
+
+def get_quiz_agents():
+    # Resolved on the script thread; prefetch workers get the agents passed in
+    return get_question_bank_agent(), get_quiz_generation_agent()
+
+def plan_adaptive_quiz_question(all_topics_in_section, current_topic_index, difficulty_hint="normal"):
+    # Pure topic-index logic, safe to call from prefetch workers.
     if current_topic_index < 0:
         current_topic_index = 0
     if current_topic_index >= len(all_topics_in_section):
         current_topic_index = len(all_topics_in_section) - 1
 
     current_topic = all_topics_in_section[current_topic_index]
-    
-    st.session_state.quiz_difficulty_state[section_name]['current_topic_index'] = current_topic_index
-    st.session_state.quiz_difficulty_state[section_name]['current_topic'] = current_topic
+    target_index = current_topic_index
+    tier = "medium"
 
-    prompt_instructions = ""
     if difficulty_hint == "easier":
         prev_topic_index = max(0, current_topic_index - 1)
         target_topic = all_topics_in_section[prev_topic_index]
-        
+        tier = "easy"
+
         if prev_topic_index != current_topic_index:
-            st.session_state.quiz_difficulty_state[section_name]['current_topic_index'] = prev_topic_index
-            st.session_state.quiz_difficulty_state[section_name]['current_topic'] = target_topic
+            target_index = prev_topic_index
             prompt_instructions = f"Generate an EASIER question about the PREVIOUS or CURRENT related topic: '{target_topic}'. Focus on foundational concepts or simpler aspects of this topic."
         else:
             prompt_instructions = f"Generate an EASIER question about '{current_topic}'. Focus on foundational concepts or simpler aspects of this topic."
-            
+
     elif difficulty_hint == "harder":
         next_topic_index = min(current_topic_index + 1, len(all_topics_in_section) - 1)
         target_topic = all_topics_in_section[next_topic_index]
-        
+
         if next_topic_index != current_topic_index:
-            st.session_state.quiz_difficulty_state[section_name]['current_topic_index'] = next_topic_index
-            st.session_state.quiz_difficulty_state[section_name]['current_topic'] = target_topic
+            target_index = next_topic_index
             prompt_instructions = f"Generate a question about the NEXT related topic: '{target_topic}'. Focus on core concepts."
         else:
+            tier = "hard"
             prompt_instructions = f"Generate a HARDER question about '{current_topic}'. Introduce more complex or nuanced aspects."
     else:
         prompt_instructions = f"Generate a question about the topic: '{current_topic}'. Focus on a balanced difficulty."
 
-    st.toast(f"Generating question on '{st.session_state.quiz_difficulty_state[section_name]['current_topic']}' ({difficulty_hint})...")
-    
-    with st.spinner("Generating question..."):
-        try:
-            quiz_response = quiz_generation_agent.run(prompt_instructions)
-            return quiz_response.content
-        except Exception as e:
-            st.error(f"Error generating adaptive quiz question: {e}")
-            return None
+    return target_index, all_topics_in_section[target_index], tier, prompt_instructions
+
+def stream_quiz_question(quiz_generation_agent, prompt, priority=PRIORITY_INTERACTIVE):
+    # Parses the question while it streams and abandons a generation as soon as
+    # the parser rejects it, retrying up to QUIZ_GENERATION_ATTEMPTS times. Each
+    # generation is hedged, and all of them share the agent's deadline.
+    def make_attempt(get_agent, _):
+        def attempt(context):
+            attempt_agent = agent_for_run(get_agent())
+            parser = QuizStreamParser()
+            parse_seconds = 0.0
+            aborted = False
+            with llm_scheduler.slot(priority, agent_token_estimate(attempt_agent, prompt)):
+                if context.cancelled.is_set():
+                    return None
+                with telemetry.track("llm_request", agent=attempt_agent.name):
+                    stream = attempt_agent.run(prompt, stream=True)
+                    for chunk in stream:
+                        if context.cancelled.is_set():
+                            # The other attempt already delivered a question
+                            getattr(stream, "close", lambda: None)()
+                            return None
+                        delta = getattr(chunk, "content", None)
+                        if not isinstance(delta, str) or not delta:
+                            continue
+                        parse_started_at = time.perf_counter()
+                        accepted = parser.feed(delta)
+                        parse_seconds += time.perf_counter() - parse_started_at
+                        if not accepted or parser.done:
+                            aborted = not accepted
+                            break
+                    if aborted:
+                        getattr(stream, "close", lambda: None)()
+                    else:
+                        record_agent_usage(attempt_agent, getattr(attempt_agent.run_response, "metrics", None))
+            parse_started_at = time.perf_counter()
+            question_data = parser.finish()
+            telemetry.observe("quiz_parse_seconds", parse_seconds + time.perf_counter() - parse_started_at)
+            telemetry.inc("quiz_parse_total", result="ok" if question_data is not None else "aborted" if aborted else "failed")
+            return question_data
+        return attempt
+
+    deadline_s = LLM_DEADLINE_SECONDS.get(quiz_generation_agent.name)
+    deadline_at = time.monotonic() + deadline_s if deadline_s else None
+    for _ in range(QUIZ_GENERATION_ATTEMPTS):
+        remaining_s = deadline_at - time.monotonic() if deadline_at is not None else None
+        if remaining_s is not None and remaining_s <= 0:
+            raise DeadlineExceeded(f"{quiz_generation_agent.name} gave no valid question within {deadline_s:g}s")
+        question_data = hedger.run(
+            quiz_generation_agent.name, hedged_attempts(quiz_generation_agent, make_attempt), remaining_s,
+            validate=lambda question_data: question_data is not None, can_hedge=hedge_allowed
+        )
+        if question_data is not None:
+            return question_data
+    return None
+
+def produce_quiz_question(quiz_agents, topic, tier, prompt_instructions, question_bank=None, ability=0.0, seen_ids=frozenset(), priority=PRIORITY_INTERACTIVE):
+    # Runs on the script thread or a prefetch worker, so no session state in here.
+    # With a bank, `ability` picks the question and `tier` only shapes the single-question fallback.
+    question_bank_agent, quiz_generation_agent = quiz_agents
+    if question_bank is not None:
+        question_data = question_bank.select(topic, ability, seen_ids)
+        if question_data is None:
+            # Nothing unseen near the learner's level: generate a batch for that band
+            deadline_error = None
+            try:
+                ability_model = startup_report.lazy_import("ability_model")
+                question_bank.fill(
+                    lambda prompt: run_agent_scheduled(question_bank_agent, prompt, priority),
+                    topic, ability_model.tier_for_difficulty(ability_model.target_difficulty(ability)), QUESTION_BANK_BATCH_SIZE
+                )
+                telemetry.inc("question_batch_total", result="ok")
+            except DeadlineExceeded as e:
+                # Out of time already, so no single-question generation after it
+                telemetry.inc("question_batch_total", result="deadline")
+                deadline_error = e
+            except Exception:
+                # Fall through to a single-question generation
+                telemetry.inc("question_batch_total", result="failed")
+            question_data = question_bank.select(topic, ability, seen_ids, band_width=None)
+            if question_data is None and deadline_error is not None:
+                raise deadline_error
+        if question_data is not None:
+            return question_data
+
+    question_data = stream_quiz_question(quiz_generation_agent, prompt_instructions, priority)
+    if question_data is not None:
+        question_data.update({"topic": topic, "tier": tier, "source": "single"})
+    return question_data
+
+def active_question_bank():
+    if st.session_state.get("use_question_bank_toggle", True) or not llm_allowed():
+        return get_question_bank()
+    return None
+
+def active_content_pack():
+    pack_id = st.session_state.get("active_pack_id")
+    return get_content_pack_library().get(pack_id) if pack_id else None
+
+def llm_allowed():
+    # A content pack served in pack-only mode must not cost a single LLM call
+    return active_content_pack() is None or not st.session_state.get("pack_only_toggle", True)
+
+def question_difficulty(question_data):
+    # Bank questions carry a calibrated difficulty; single generations only their tier
+    return question_data.get("difficulty", startup_report.lazy_import("ability_model").TIER_DIFFICULTY.get(question_data.get("tier"), 0.0))
+
+def release_prefetched_question(future):
+    # A generation that already started (or finished) cannot be taken back;
+    # a question picked from the bank cost nothing and stays in it.
+    if future.cancel():
+        return
+    if future.done() and future.exception() is None:
+        question_data = future.result()
+        if question_data and question_data.get("source") == "bank":
+            return
+    st.session_state.quiz_prefetch_stats['wasted'] += 1
+
+def discard_quiz_prefetch(quiz_state, keep_hint=None):
+    prefetch = quiz_state.prefetch
+    if not prefetch:
+        return
+    for hint, (_, _, future) in list(prefetch['futures'].items()):
+        if hint == keep_hint:
+            continue
+        release_prefetched_question(future)
+        del prefetch['futures'][hint]
+    if not prefetch['futures']:
+        quiz_state.prefetch = None
+
+def start_quiz_prefetch(quiz_state, all_topics_in_section):
+    if not all_topics_in_section or not llm_allowed():
+        return
+    if quiz_state.question_count >= MAX_QUIZ_QUESTIONS:
+        return
+
+    prefetch_base = (quiz_state.question_count, quiz_state.current_topic_index, tuple(all_topics_in_section))
+    if quiz_state.prefetch and quiz_state.prefetch['base'] == prefetch_base:
+        return
+    discard_quiz_prefetch(quiz_state)
+
+    executor = get_quiz_prefetch_executor()
+    question_bank = active_question_bank()
+    quiz_agents = get_quiz_agents()
+    seen_ids = frozenset(quiz_state.seen_question_ids)
+    current_difficulty = question_difficulty(quiz_state.current_question or {})
+    ability_after_answer = startup_report.lazy_import("ability_model").ability_after_answer
+    futures = {}
+    for hint in ("harder", "easier"):
+        target_index, target_topic, tier, prompt_instructions = plan_adaptive_quiz_question(all_topics_in_section, quiz_state.current_topic_index, hint)
+        # The ability the learner will have once this answer is in ("harder" follows a correct one)
+        ability = ability_after_answer(quiz_state.ability, quiz_state.ability_answers, current_difficulty, hint == "harder")
+        future = executor.submit(produce_quiz_question, quiz_agents, target_topic, tier, prompt_instructions, question_bank, ability, seen_ids, PRIORITY_PREFETCH)
+        futures[hint] = (target_index, target_topic, future)
+    quiz_state.prefetch = {'base': prefetch_base, 'futures': futures}
+
+def take_quiz_prefetch(quiz_state, all_topics_in_section, difficulty_hint):
+    prefetch, quiz_state.prefetch = quiz_state.prefetch, None
+    if not prefetch:
+        return None
+
+    prefetch_base = (quiz_state.question_count, quiz_state.current_topic_index, tuple(all_topics_in_section))
+    entry = prefetch['futures'].pop(difficulty_hint, None)
+
+    for _, _, future in prefetch['futures'].values():
+        release_prefetched_question(future)
+    if entry is None:
+        return None
+    if prefetch['base'] != prefetch_base:
+        release_prefetched_question(entry[2])
+        return None
+    return entry
+
+def generate_adaptive_quiz_question(quiz_state, all_topics_in_section):
+    difficulty_hint = quiz_state.difficulty_hint
+
+    if not all_topics_in_section:
+        st.warning("No topics available in this section for quiz generation.")
+        return None
+
+    if difficulty_hint in ("harder", "easier") and llm_allowed():
+        prefetched = take_quiz_prefetch(quiz_state, all_topics_in_section, difficulty_hint)
+        if prefetched:
+            target_index, target_topic, future = prefetched
+            try:
+                with st.spinner("Loading next question..."):
+                    question_data = future.result()
+            except Exception as e:
+                # Fall back to a fresh generation below.
+                question_data = None
+                st.warning(f"Prefetched question failed, regenerating: {e}")
+            if question_data:
+                st.session_state.quiz_prefetch_stats['hits'] += 1
+                telemetry.inc("quiz_prefetch_total", result="hit")
+                quiz_state.current_topic_index = target_index
+                quiz_state.current_topic = target_topic
+                return question_data
+        st.session_state.quiz_prefetch_stats['misses'] += 1
+        telemetry.inc("quiz_prefetch_total", result="miss")
+
+    target_index, target_topic, tier, prompt_instructions = plan_adaptive_quiz_question(all_topics_in_section, quiz_state.current_topic_index, difficulty_hint)
+    quiz_state.current_topic_index = target_index
+    quiz_state.current_topic = target_topic
+
+    # A bank pick needs no LLM call, so it is served right away
+    question_bank = active_question_bank()
+    if question_bank is not None:
+        question_data = question_bank.select(target_topic, quiz_state.ability, quiz_state.seen_question_ids)
+        if question_data is not None:
+            return question_data
+
+    if not llm_allowed():
+        # Pack-only: any difficulty, and repeat questions once the topic's are all seen
+        question_data = (
+            question_bank.select(target_topic, quiz_state.ability, quiz_state.seen_question_ids, band_width=None)
+            or question_bank.select(target_topic, quiz_state.ability, band_width=None)
+        )
+        if question_data is None:
+            st.warning(f"The content pack has no quiz questions for '{target_topic}'.")
+        return question_data
+
+    st.toast(f"Generating question on '{target_topic}' ({difficulty_hint})...")
+    submit_job("quiz_question", f"quiz:{quiz_state.section_id}", {
+        'topic': target_topic,
+        'tier': tier,
+        'prompt_instructions': prompt_instructions,
+        'use_question_bank': question_bank is not None,
+        'ability': quiz_state.ability,
+        'seen_ids': sorted(quiz_state.seen_question_ids),
+    })
+    return None
+
+def show_quiz_question(quiz_state, question_data):
+    quiz_state.current_question = question_data
+    quiz_state.question_count += 1
+    quiz_state.question_shown_at = time.perf_counter()
+    if question_data.get("id"):
+        quiz_state.seen_question_ids.add(question_data["id"])
+
+def advance_quiz(quiz_state, all_topics_in_section):
+    # Without a ready question the panel shows the quiz job's progress until it lands
+    quiz_state.current_question = None
+    new_question_data = generate_adaptive_quiz_question(quiz_state, all_topics_in_section)
+    if new_question_data:
+        show_quiz_question(quiz_state, new_question_data)
+
+def make_section_id_key(section_name):
+    return section_name.replace(" ", "_").replace(":", "").replace("/", "").replace(".", "").replace("-", "_")
+
+def make_topic_id_key(section_id_key, topic_name, topic_index):
+    return f"{section_id_key}_{topic_name.replace(' ', '_').replace(':', '').replace('/', '').replace('.', '').replace('-', '_')}_{topic_index}"
+
+def replace_sections(sections):
+    for section_data in sections:
+        ensure_section_id(section_data)
+    st.session_state.sections = sections
+    st.session_state.study_plan_index.rebuild(sections)
+    st.session_state.pop("study_plan_page", None)
+    st.session_state.curriculum_partial = None
+    # Quiz progress belongs to the old curriculum's sections
+    for quiz_state in st.session_state.quiz_states:
+        discard_quiz_prefetch(quiz_state)
+    st.session_state.quiz_states = QuizStateRegistry()
+    st.session_state.active_quiz_section = None
+    # A new curriculum is no longer the content pack's
+    st.session_state.active_pack_id = None
+    if "pack" in st.query_params:
+        del st.query_params["pack"]
+
+def activate_content_pack(pack):
+    load_pack_into_question_bank(pack.pack_id)
+    replace_sections(pack.sections())
+    st.session_state.active_pack_id = pack.pack_id
+    # ?pack=<id> opens the same course for anyone on this server
+    st.query_params["pack"] = pack.pack_id
+
+def stored_study_map(topic_id_key, section_name, topic_index):
+    # This session's own generations win over the active content pack
+    study_map = st.session_state.study_map_output.get(topic_id_key)
+    if study_map is None:
+        pack = active_content_pack()
+        if pack is not None:
+            study_map = pack.study_map(section_name, topic_index)
+    return study_map
+
+def export_content_pack():
+    study_maps = {}
+    questions = {}
+    question_bank = get_question_bank()
+    for section_data in st.session_state.sections:
+        section_id_key = make_section_id_key(section_data['name'])
+        for topic_index, topic_name in enumerate(section_data['topics']):
+            study_map = stored_study_map(make_topic_id_key(section_id_key, topic_name, topic_index), section_data['name'], topic_index)
+            if study_map:
+                study_maps[(section_data['name'], topic_index)] = study_map
+            questions.setdefault(topic_name, question_bank.questions(topic_name))
+    pack = active_content_pack()
+    subject = pack.subject if pack is not None else st.session_state.get("main_subject_input", "")
+    return startup_report.lazy_import("content_pack").build_pack(subject, st.session_state.sections, study_maps, questions)
+
+def section_study_map_jobs(section_data):
+    section_id_key = make_section_id_key(section_data['name'])
+    return [(make_topic_id_key(section_id_key, topic_name, j), topic_name) for j, topic_name in enumerate(section_data['topics'])]
+
+def generate_study_maps_bulk(topic_jobs, label, target):
+    pending_jobs = [(topic_id_key, topic_name) for topic_id_key, topic_name in topic_jobs if topic_id_key not in st.session_state.study_map_output]
+    if not pending_jobs:
+        st.info(f"All study maps for {label} are already generated.")
+        return
+    submit_job("study_map_bulk", target, {
+        'label': label,
+        'topics': pending_jobs,
+        'concurrency': st.session_state.get("study_map_concurrency_input", STUDY_MAP_CONCURRENCY),
+    })
 
 def calculate_overall_grade():
-    if st.session_state.overall_total_attempted > 0:
-        overall_grade_val = (st.session_state.overall_total_correct / st.session_state.overall_total_attempted) * 100
-        st.session_state.overall_grade = f"{overall_grade_val:.1f}%"
+    # Read from the store's running rollup, so it survives refreshes and restarts
+    overall = get_progress_store().rollup(st.session_state.learner_id)
+    st.session_state.overall_total_correct = overall['correct']
+    st.session_state.overall_total_attempted = overall['attempted']
+    if overall['attempted'] > 0:
+        st.session_state.overall_grade = f"{overall['accuracy'] * 100:.1f}%"
     else:
         st.session_state.overall_grade = "N/A"
 
-def check_answer_and_adjust_difficulty(section_name, user_selected_option, current_q_data):
+def check_answer_and_adjust_difficulty(quiz_state, section_name, user_selected_option, current_q_data):
     is_correct = False
     feedback_message = ""
     
@@ -261,49 +1007,501 @@ def check_answer_and_adjust_difficulty(section_name, user_selected_option, curre
             if user_choice_letter == current_q_data['correct_answer_letter']:
                 is_correct = True
                 feedback_message = f"**Correct!** {current_q_data['explanation']}"
-                st.session_state.quiz_total_correct[section_name] += 1
-                st.session_state.overall_total_correct += 1
+                quiz_state.total_correct += 1
             else:
                 feedback_message = f"**Incorrect.** The correct answer was **{current_q_data['correct_answer_full']}**. {current_q_data['explanation']}"
-            st.session_state.quiz_total_attempted[section_name] += 1
-            st.session_state.overall_total_attempted += 1
+            quiz_state.total_attempted += 1
+            # Queued for the progress store's writer thread; nothing waits on disk here
+            get_progress_store().record_answer(
+                st.session_state.learner_id, section_name, quiz_state.current_topic, question_difficulty(current_q_data), is_correct,
+                latency_s=time.perf_counter() - quiz_state.question_shown_at, question_id=current_q_data.get("id")
+            )
+
+            if current_q_data.get("id"):
+                quiz_state.ability = get_question_bank().record_answer(current_q_data, quiz_state.ability, quiz_state.ability_answers, is_correct)
+            else:
+                quiz_state.ability = startup_report.lazy_import("ability_model").ability_after_answer(quiz_state.ability, quiz_state.ability_answers, question_difficulty(current_q_data), is_correct)
+            quiz_state.ability_answers += 1
         else:
             feedback_message = "Error: Question data missing for evaluation."
     else:
         feedback_message = "Please select an answer before checking."
 
-    st.session_state.quiz_question_feedback[section_name] = feedback_message
-    st.session_state.quiz_options_locked[section_name] = True # Lock options after checking
-
-    if is_correct:
-        st.session_state.quiz_difficulty_state[section_name]['difficulty_hint'] = "harder"
-    else:
-        st.session_state.quiz_difficulty_state[section_name]['difficulty_hint'] = "easier"
+    quiz_state.feedback = feedback_message
+    quiz_state.options_locked = True # Lock options after checking
+    quiz_state.difficulty_hint = "harder" if is_correct else "easier"
+    # Keep only the follow-up matching this answer
+    discard_quiz_prefetch(quiz_state, keep_hint=quiz_state.difficulty_hint)
 
-    if st.session_state.quiz_total_attempted[section_name] > 0:
-        grade = (st.session_state.quiz_total_correct[section_name] / st.session_state.quiz_total_attempted[section_name]) * 100
-        st.session_state.quiz_current_grade[section_name] = f"{grade:.1f}%"
-    else:
-        st.session_state.quiz_current_grade[section_name] = "N/A"
-    
     calculate_overall_grade()
 
-    st.rerun()
+    rerun_quiz_panel()
+
+# --- Background jobs ---
+# LLM and TTS work runs on the job queue's worker threads, so the script thread
+# only submits jobs and polls them. Handlers get shared resources passed in and
+# never touch st.*; finished jobs are applied to the session by
+# collect_finished_jobs() at the top of the next full run.
+
+def run_curriculum_job(payload, report_progress, outline_agent, section_agent, content_cache, subject_index):
+    # A short outline call names the sections, then every section's topics are
+    # generated concurrently; each finished section is reported as progress so
+    # the session can show it before the rest are done
+    subject = payload['subject']
+    refresh = payload.get('refresh', False)
+    started_at = time.perf_counter()
+    cached_sections = None if refresh else cached_curriculum_sections(subject, content_cache)
+    if cached_sections:
+        elapsed = time.perf_counter() - started_at
+        return {'subject': subject, 'timing': {'first_token_s': elapsed, 'complete_s': elapsed, 'cached': True}, 'warning': None, 'sections': cached_sections, 'outline_indices': None}
+
+    try:
+        section_names = generate_validated(
+            lambda prompt: run_agent_cached(outline_agent, prompt, validate=validator(parse_outline), content_cache=content_cache, refresh=refresh),
+            build_outline_prompt(subject), parse_outline, CURRICULUM_GENERATION_ATTEMPTS
+        )
+    except DeadlineExceeded as e:
+        # Out of time: the cached curriculum of the most similar subject, if there is one
+        match = subject_index.match(subject, payload.get('match_threshold'))
+        sections = cached_curriculum_sections(match.subject, content_cache) if match is not None else None
+        telemetry.inc("llm_deadline_fallback_total", kind="curriculum", result="cache" if sections else "none")
+        if not sections:
+            raise
+        return {'subject': subject, 'timing': None, 'sections': sections, 'outline_indices': None, 'warning': f"{e}; showing the cached curriculum for '{match.subject}' instead."}
+    except ValueError as e:
+        raise ValueError(f"The curriculum outline could not be generated: {e}") from e
+
+    ready = []
+    done_count = 0
+    first_section_s = None
+
+    def on_section(outline_index, section_data):
+        nonlocal done_count, first_section_s
+        done_count += 1
+        if section_data is not None:
+            ready.append([outline_index, section_data])
+            if first_section_s is None:
+                first_section_s = time.perf_counter() - started_at
+        report_progress({'done': done_count, 'total': len(section_names), 'unit': "sections", 'latest': section_names[outline_index], 'ready': ready})
+
+    report_progress({'done': 0, 'total': len(section_names), 'unit': "sections", 'ready': ready})
+    sections, failures = expand_sections(
+        lambda prompt: run_agent_cached(section_agent, prompt, validate=validator(parse_section_topics), content_cache=content_cache, refresh=refresh),
+        subject, section_names, on_section, CURRICULUM_SECTION_WORKERS, CURRICULUM_GENERATION_ATTEMPTS
+    )
+    if not sections:
+        raise ValueError(f"No section of the curriculum could be generated: {next(iter(failures.values()))}")
 
-def text_to_speech_and_play(text, key_id):
-    with st.spinner("Generating audio..."):
+    warning = None
+    if failures:
+        warning = f"Topics could not be generated for {len(failures)} of {len(section_names)} sections, left out: " + "; ".join(f"{name} ({error})" for name, error in failures.items())
+    else:
+        store_curriculum(subject, sections, content_cache, subject_index)
+    timing = {'first_token_s': first_section_s, 'complete_s': time.perf_counter() - started_at, 'cached': False}
+    return {'subject': subject, 'timing': timing, 'warning': warning, 'sections': sections, 'outline_indices': sorted(outline_index for outline_index, _ in ready)}
+
+def run_study_map_job(payload, report_progress, study_map_agent, content_cache):
+    topic_name = payload['topic_name']
+    prompt = study_map_prompt(topic_name)
+    if payload['stream']:
+        content, timing = stream_agent_cached(study_map_agent, prompt, lambda _, text_so_far: report_progress({'text': text_so_far}), content_cache=content_cache)
+        return {'topic_name': topic_name, 'content': content, 'timing': timing}
+    return {'topic_name': topic_name, 'content': run_agent_cached(study_map_agent, prompt, content_cache=content_cache), 'timing': None}
+
+def run_study_map_bulk_job(payload, report_progress, study_map_agent, content_cache):
+    pending_jobs = payload['topics']
+    study_maps = {}
+    failures = []
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=payload['concurrency'], thread_name_prefix="study_map_bulk") as executor:
+        futures = {
+            executor.submit(run_agent_cached, study_map_agent, study_map_prompt(topic_name), None, content_cache, PRIORITY_BULK): (topic_id_key, topic_name)
+            for topic_id_key, topic_name in pending_jobs
+        }
+        for done_count, future in enumerate(as_completed(futures), start=1):
+            topic_id_key, topic_name = futures[future]
+            try:
+                study_maps[topic_id_key] = future.result()
+            except Exception as e:
+                failures.append(f"{topic_name}: {e}")
+            report_progress({'done': done_count, 'total': len(pending_jobs), 'latest': topic_name})
+    return {'label': payload['label'], 'study_maps': study_maps, 'failures': failures, 'elapsed_s': time.perf_counter() - started_at}
+
+def run_quiz_question_job(payload, report_progress, quiz_agents, question_bank):
+    try:
+        question_data = produce_quiz_question(
+            quiz_agents, payload['topic'], payload['tier'], payload['prompt_instructions'],
+            question_bank if payload['use_question_bank'] else None, payload['ability'], frozenset(payload['seen_ids'])
+        )
+    except DeadlineExceeded:
+        # Out of time: the closest bank question at any difficulty, a repeat if all were seen
+        question_data = (
+            question_bank.select(payload['topic'], payload['ability'], frozenset(payload['seen_ids']), band_width=None)
+            or question_bank.select(payload['topic'], payload['ability'], band_width=None)
+        )
+        telemetry.inc("llm_deadline_fallback_total", kind="quiz_question", result="bank" if question_data is not None else "none")
+        if question_data is None:
+            raise
+    if question_data is None:
+        raise ValueError("the generated question could not be parsed")
+    return question_data
+
+def run_tts_job(payload, report_progress, tts_executor, tts_synthesizer, tts_audio_cache):
+    # Chunks are synthesized in parallel and cached by content hash. The keys of
+    # the parts ready so far (in playback order) go out as progress, so playback
+    # starts as soon as the first part is ready
+    chunks = split_into_chunks(payload['text'], TTS_CHUNK_CHARS)
+    with telemetry.track("tts"):
+        chunk_futures = submit_chunks(tts_executor, tts_synthesizer, tts_audio_cache, chunks)
+        chunk_keys = []
         try:
-            tts = gTTS(text=text, lang='en')
-            
-            audio_bytes_io = io.BytesIO()
-            tts.write_to_fp(audio_bytes_io)
-            audio_bytes_io.seek(0)
+            for future in chunk_futures:
+                chunk_key, _ = future.result()
+                chunk_keys.append(chunk_key)
+                report_progress({'done': len(chunk_keys), 'total': len(chunks), 'unit': "audio parts", 'chunk_keys': list(chunk_keys)})
+        except Exception:
+            for future in chunk_futures:
+                future.cancel()
+            raise
+    return {'chunk_keys': chunk_keys}
 
-            st.audio(audio_bytes_io.getvalue(), format="audio/mp3", loop=False, autoplay=True)
-            st.success("Audio generated and playing!")
-        except Exception as e:
-            st.error(f"Error generating audio: {e}")
+@st.cache_resource
+def get_job_queue():
+    # Handlers are registered by start_job_handlers
+    job_queue = JobQueue(os.getenv("JOB_DB_PATH", DEFAULT_JOB_DB_PATH), workers=JOB_WORKERS)
+    telemetry.add_collector(lambda: [("jobs", {"status": status}, count) for status, count in job_queue.stats().items()])
+    return job_queue
 
+@st.cache_resource
+def start_job_handlers():
+    # Called before this process's first job is submitted, or on a first run that finds jobs
+    # a previous process left unfinished, so a plain first run never loads the stores.
+    # Stores are resolved here, on the script thread, and handed to the handlers; the
+    # agents are built by the first job that needs them, as the getters' st.cache_resource
+    # cannot be called from a worker thread.
+    job_queue = get_job_queue()
+    content_cache = get_content_cache()
+    subject_index = get_subject_index()
+    question_bank = get_question_bank()
+    tts_executor, tts_synthesizer, tts_audio_cache = get_tts_executor(), get_tts_synthesizer(), get_tts_audio_cache()
+    outline_agent, section_agent = built_once(build_curriculum_outline_agent), built_once(build_curriculum_section_agent)
+    study_map_agent = built_once(build_study_map_agent)
+    quiz_agents = built_once(lambda: (build_question_bank_agent(), build_quiz_generation_agent()))
+    job_queue.register("curriculum", lambda payload, report_progress: run_curriculum_job(payload, report_progress, outline_agent(), section_agent(), content_cache, subject_index))
+    job_queue.register("study_map", lambda payload, report_progress: run_study_map_job(payload, report_progress, study_map_agent(), content_cache))
+    job_queue.register("study_map_bulk", lambda payload, report_progress: run_study_map_bulk_job(payload, report_progress, study_map_agent(), content_cache))
+    job_queue.register("quiz_question", lambda payload, report_progress: run_quiz_question_job(payload, report_progress, quiz_agents(), question_bank))
+    job_queue.register("tts", lambda payload, report_progress: run_tts_job(payload, report_progress, tts_executor, tts_synthesizer, tts_audio_cache))
+    job_queue.resume_pending()
+    return job_queue
+
+JOB_FAILURE_MESSAGES = {
+    "curriculum": "An unexpected error occurred while generating the curriculum: {error}",
+    "study_map": "Error generating study map: {error}",
+    "study_map_bulk": "Bulk study map generation failed: {error}",
+    "quiz_question": "Error generating adaptive quiz question: {error}",
+    "tts": "Error generating audio: {error}",
+}
+
+# --- Warm-up ---
+# Subjects entered, topics opened and quizzes started are counted as demand;
+# while the LLM is otherwise idle, the warm-up thread pre-generates the most
+# requested of them into the content cache and question bank, so the next
+# learner asking for them gets them without waiting (see warmup.Warmer).
+
+def warmup_idle():
+    # Nothing more urgent than warm-up for a while, and room left in the shared rate limits
+    if llm_scheduler.idle_seconds(PRIORITY_WARMUP) < WARMUP_IDLE_SECONDS:
+        return False
+    scheduler_metrics = llm_scheduler.metrics()
+    return min(scheduler_metrics['request_budget_available'], scheduler_metrics['token_budget_available']) >= WARMUP_MIN_HEADROOM
+
+def run_agent_warmup(agent, prompt, task, validate, content_cache):
+    # A cache hit costs nothing; a call is charged to the warm-up budget and sent at the lowest priority
+    if not content_cache.contains(agent_cache_key(agent, prompt)):
+        task.charge(agent_token_estimate(agent, prompt))
+    return run_agent_cached(agent, prompt, validate, content_cache, PRIORITY_WARMUP)
+
+def warm_curriculum(task, outline_agent, section_agent, content_cache, subject_index):
+    section_names = generate_validated(
+        lambda prompt: run_agent_warmup(outline_agent, prompt, task, validator(parse_outline), content_cache),
+        build_outline_prompt(task.label), parse_outline, CURRICULUM_GENERATION_ATTEMPTS
+    )
+    # One section at a time, so warm-up never holds more than one LLM slot
+    sections, failures = expand_sections(
+        lambda prompt: run_agent_warmup(section_agent, prompt, task, validator(parse_section_topics), content_cache),
+        task.label, section_names, workers=1, max_attempts=CURRICULUM_GENERATION_ATTEMPTS
+    )
+    if failures:
+        raise ValueError(f"topics could not be generated for {len(failures)} of {len(section_names)} sections")
+    store_curriculum(task.label, sections, content_cache, subject_index)
+
+def curriculum_warmup_related(subject, content_cache):
+    # What a learner opens first in a new curriculum: the first section's study maps and quiz
+    sections = cached_curriculum_sections(subject, content_cache)
+    first_topics = sections[0]['topics'][:WARMUP_TOPICS_PER_SUBJECT] if sections else []
+    return [("study_map", topic_name) for topic_name in first_topics] + [("quiz_questions", topic_name) for topic_name in first_topics[:1]]
+
+def warm_quiz_questions(task, question_bank_agent, question_bank):
+    # The batch a new learner's first question on the topic is picked from
+    def run_prompt(prompt):
+        task.charge(agent_token_estimate(question_bank_agent, prompt))
+        return run_agent_scheduled(question_bank_agent, prompt, PRIORITY_WARMUP)
+    ability_model = startup_report.lazy_import("ability_model")
+    question_bank.fill(run_prompt, task.label, ability_model.tier_for_difficulty(ability_model.target_difficulty(0.0)), QUESTION_BANK_BATCH_SIZE)
+
+@st.cache_resource
+def get_warmer():
+    # Handlers are registered by start_warmer, on the first demand in this process
+    warmer = Warmer(
+        DemandTracker(os.getenv("WARMUP_DB_PATH", DEFAULT_WARMUP_DB_PATH)),
+        is_idle=warmup_idle,
+        requests_per_minute=int(os.getenv("WARMUP_REQUESTS_PER_MINUTE", 6)),
+        tokens_per_minute=int(os.getenv("WARMUP_TOKENS_PER_MINUTE", 6000)),
+        top_n=int(os.getenv("WARMUP_TOP_N", DEFAULT_TOP_N)),
+        min_demand=float(os.getenv("WARMUP_MIN_DEMAND", DEFAULT_MIN_DEMAND)),
+    )
+    telemetry.add_collector(warmer.gauges)
+    return warmer
+
+@st.cache_resource
+def start_warmer():
+    # Called on the first demand in this process rather than on every first run, so a
+    # fresh server's first page never waits for the stores. The stores are resolved
+    # here on the script thread; the agents are built on the warm-up thread when its
+    # first task needs them, so agno is never imported by a script run for warm-up.
+    content_cache, subject_index, question_bank = get_content_cache(), get_subject_index(), get_question_bank()
+    outline_agent, section_agent = built_once(build_curriculum_outline_agent), built_once(build_curriculum_section_agent)
+    study_map_agent, question_bank_agent = built_once(build_study_map_agent), built_once(build_question_bank_agent)
+    warmer.register(
+        "curriculum",
+        lambda subject: content_cache.contains(curriculum_cache_key(subject)),
+        lambda task: warm_curriculum(task, outline_agent(), section_agent(), content_cache, subject_index),
+        related=lambda subject: curriculum_warmup_related(subject, content_cache),
+    )
+    warmer.register(
+        "study_map",
+        lambda topic_name: content_cache.contains(agent_cache_key(study_map_agent(), study_map_prompt(topic_name))),
+        lambda task: run_agent_warmup(study_map_agent(), study_map_prompt(task.label), task, None, content_cache),
+    )
+    warmer.register(
+        "quiz_questions",
+        lambda topic_name: question_bank.size(topic_name) >= QUESTION_BANK_BATCH_SIZE,
+        lambda task: warm_quiz_questions(task, question_bank_agent(), question_bank),
+    )
+    if WARMUP_ENABLED:
+        warmer.start()
+    return True
+
+def record_demand(kind, label):
+    if label and label.strip():
+        start_warmer()
+        warmer.record(kind, label)
+
+def record_topic_opened(topic_id_key, topic_name):
+    if st.session_state.get(f"topic_open_{topic_id_key}"):
+        record_demand("study_map", topic_name)
+
+warmer = get_warmer()
+
+def sync_job_query_params():
+    # Pending job ids ride along in the URL so a refreshed page picks them up again
+    pending_job_ids = ",".join(st.session_state.jobs.values())
+    if pending_job_ids:
+        st.query_params["jobs"] = pending_job_ids
+    elif "jobs" in st.query_params:
+        del st.query_params["jobs"]
+
+def submit_job(kind, target, payload):
+    st.session_state.jobs[target] = start_job_handlers().submit(kind, payload, target)
+    sync_job_query_params()
+
+def restore_jobs_from_query_params():
+    job_queue = get_job_queue()
+    job_ids = [job_id for job_id in st.query_params.get("jobs", "").split(",") if job_id]
+    jobs = {}
+    for job_id in job_ids:
+        job = job_queue.get(job_id)
+        if job is not None and job['target']:
+            jobs[job['target']] = job_id
+    return jobs
+
+def add_job_notice(level, message):
+    st.session_state.job_notices.append((level, message))
+
+def apply_curriculum_sections(job_id, indexed_sections):
+    # Sections land in outline order as their topics arrive; the first one replaces the old curriculum
+    partial = st.session_state.get("curriculum_partial")
+    if partial is None or partial['job_id'] != job_id:
+        replace_sections([])
+        partial = st.session_state.curriculum_partial = {'job_id': job_id, 'applied': []}
+    for outline_index, section_data in indexed_sections:
+        if outline_index in partial['applied']:
+            continue
+        position = bisect_left(partial['applied'], outline_index)
+        partial['applied'].insert(position, outline_index)
+        ensure_section_id(section_data)
+        st.session_state.sections.insert(position, section_data)
+    st.session_state.study_plan_index.sync(st.session_state.sections)
+
+def curriculum_sections_pending(job):
+    partial = st.session_state.get("curriculum_partial")
+    applied_count = len(partial['applied']) if partial and partial['job_id'] == job['id'] else 0
+    return len((job['progress'] or {}).get('ready', [])) > applied_count
+
+def apply_curriculum_progress(job):
+    if curriculum_sections_pending(job):
+        apply_curriculum_sections(job['id'], job['progress']['ready'])
+
+def apply_curriculum_job(job):
+    result = job['result']
+    if result.get('outline_indices') is None:
+        # Cached or fallback curricula arrive whole
+        replace_sections(result['sections'])
+    else:
+        apply_curriculum_sections(job['id'], zip(result['outline_indices'], result['sections']))
+    if result['timing']:
+        record_generation_timing("curriculum", result['subject'], result['timing'])
+    if result['warning']:
+        add_job_notice("warning", result['warning'])
+    add_job_notice("success", f"Curriculum generated for '{result['subject']}'!")
+
+def apply_study_map_job(job):
+    result = job['result']
+    st.session_state.study_map_output[job['target'].split(":", 1)[1]] = result['content']
+    if result['timing']:
+        record_generation_timing("study_map", result['topic_name'], result['timing'])
+
+def apply_study_map_bulk_job(job):
+    result = job['result']
+    st.session_state.study_map_output.update(result['study_maps'])
+    record_generation_timing("study_map_bulk", result['label'], {'first_token_s': None, 'complete_s': result['elapsed_s'], 'cached': False})
+    if result['failures']:
+        add_job_notice("error", "Some study maps could not be generated:\n" + "\n".join(f"- {failure}" for failure in result['failures']))
+    else:
+        add_job_notice("success", f"Generated {len(result['study_maps'])} study maps for {result['label']} in {result['elapsed_s']:.1f}s.")
+
+def apply_quiz_question_job(job):
+    quiz_state = st.session_state.quiz_states.find(job['target'].split(":", 1)[1])
+    # The quiz may have been restarted or finished while the question was generated
+    if quiz_state is None or st.session_state.active_quiz_section != quiz_state.section_id or quiz_state.current_question is not None:
+        return
+    show_quiz_question(quiz_state, job['result'])
+
+def apply_tts_job(job):
+    topic_id_key = job['target'].split(":", 1)[1]
+    st.session_state.tts_audio_files[topic_id_key] = job['result']['chunk_keys']
+    st.session_state.tts_autoplay = topic_id_key
+
+JOB_RESULT_APPLIERS = {
+    "curriculum": apply_curriculum_job,
+    "study_map": apply_study_map_job,
+    "study_map_bulk": apply_study_map_bulk_job,
+    "quiz_question": apply_quiz_question_job,
+    "tts": apply_tts_job,
+}
+
+# Applied on every full run while the job is still going
+JOB_PROGRESS_APPLIERS = {
+    "curriculum": apply_curriculum_progress,
+}
+
+def collect_finished_jobs():
+    job_queue = get_job_queue()
+    collected = False
+    for target, job_id in list(st.session_state.jobs.items()):
+        job = job_queue.get(job_id)
+        if job is None:
+            # Purged or from another database; nothing left to wait for
+            del st.session_state.jobs[target]
+            collected = True
+        elif job['status'] in FINISHED_JOB_STATUSES:
+            del st.session_state.jobs[target]
+            collected = True
+            if job['status'] == JOB_FAILED:
+                add_job_notice("error", JOB_FAILURE_MESSAGES[job['kind']].format(error=job['error']))
+            else:
+                JOB_RESULT_APPLIERS[job['kind']](job)
+        elif job['kind'] in JOB_PROGRESS_APPLIERS:
+            JOB_PROGRESS_APPLIERS[job['kind']](job)
+    if collected:
+        sync_job_query_params()
+
+# Job targets with a progress display in this run; the rest are watched by render_hidden_job_watcher
+rendered_job_targets = set()
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_job_progress(target, label):
+    rendered_job_targets.add(target)
+    job_id = st.session_state.jobs.get(target)
+    job = get_job_queue().get(job_id) if job_id else None
+    if job is None or job['status'] in FINISHED_JOB_STATUSES:
+        # Results are applied by the full run
+        st.rerun()
+    if job['kind'] == "curriculum" and curriculum_sections_pending(job):
+        # So are curriculum sections that finished ahead of the rest
+        st.rerun()
+    progress = job['progress'] or {}
+    if progress.get('chunk_keys'):
+        # Read Aloud plays the first parts while the rest are synthesized. Drawn first,
+        # so the finished player takes the same place and does not restart the audio
+        play_tts_audio(progress['chunk_keys'], progress['total'])
+    st.caption(f"{label} (waiting for a worker)..." if job['status'] == JOB_QUEUED else f"{label}...")
+    if 'done' in progress:
+        latest = f" (latest: {progress['latest']})" if progress.get('latest') else ""
+        st.progress(progress['done'] / progress['total'], text=f"{progress['done']}/{progress['total']} {progress.get('unit', 'done')}{latest}")
+    for section_summary in progress.get('sections', []):
+        st.markdown(f"✅ **{section_summary}**")
+    if progress.get('text'):
+        st.markdown(progress['text'], unsafe_allow_html=True)
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_hidden_job_watcher(targets):
+    # Jobs for topics that are closed or on another page still need a rerun to land
+    job_queue = get_job_queue()
+    for target in targets:
+        job_id = st.session_state.jobs.get(target)
+        job = job_queue.get(job_id) if job_id else None
+        if job is None or job['status'] in FINISHED_JOB_STATUSES:
+            st.rerun()
+    st.caption(f"⏳ {len(targets)} generation(s) running for topics not shown here...")
+
+def play_tts_audio(chunk_keys, part_count=None):
+    # part_count is the number of parts once all are ready; fewer keys while they are synthesized
+    part_count = part_count or len(chunk_keys)
+    tts_audio_cache = get_tts_audio_cache()
+    for chunk_index, chunk_key in enumerate(chunk_keys):
+        audio_bytes = tts_audio_cache.get(chunk_key)
+        if audio_bytes is None:
+            st.warning("This audio is no longer cached; click Read Aloud again.")
+            return
+        if part_count > 1:
+            st.caption(f"Part {chunk_index + 1} of {part_count}")
+        st.audio(audio_bytes, format="audio/mp3", loop=False, autoplay=chunk_index == 0)
+    if len(chunk_keys) == part_count:
+        st.success("Audio generated and playing!")
+
+if 'jobs' not in st.session_state:
+    # Pending jobs by target ("curriculum", "study_map:<topic>", "quiz:<section id>", ...)
+    st.session_state.jobs = restore_jobs_from_query_params()
+if 'job_notices' not in st.session_state:
+    st.session_state.job_notices = []
+
+job_stats = get_job_queue().stats()
+if job_stats[JOB_QUEUED] or job_stats[JOB_RUNNING]:
+    # A no-op once this process has started its handlers
+    start_job_handlers()
+collect_finished_jobs()
+
+if 'active_pack_id' not in st.session_state:
+    st.session_state.active_pack_id = None
+    shared_pack = get_content_pack_library().get(st.query_params["pack"]) if "pack" in st.query_params else None
+    if shared_pack is not None:
+        activate_content_pack(shared_pack)
+
+for notice_level, notice_message in st.session_state.job_notices:
+    getattr(st, notice_level)(notice_message)
+st.session_state.job_notices = []
 
 st.markdown("<h2 style='text-align: center;'>Generate Full Study Curriculum</h2>", unsafe_allow_html=True)
 
@@ -312,10 +1510,12 @@ with col1:
     main_study_subject = st.text_input(
         "Enter a main study subject (e.g., 'Java Programming', 'World History'):", 
         key="main_subject_input",
-        value=st.session_state.voice_input_subject 
+        value=st.session_state.voice_input_subject,
+        on_change=lambda: record_demand("curriculum", st.session_state.main_subject_input)
     )
 with col2:
     st.write("Or speak it:")
+    speech_to_text = startup_report.lazy_import("streamlit_mic_recorder").speech_to_text
     voice_transcript = speech_to_text(
         start_prompt="Start recording",
         stop_prompt="Stop recording",
@@ -325,46 +1525,278 @@ with col2:
     )
     if voice_transcript:
         st.session_state.voice_input_subject = voice_transcript
+        record_demand("curriculum", voice_transcript)
         st.rerun()
 
-if st.button("Generate Curriculum", key="generate_curriculum_btn"):
-    if main_study_subject:
-        with st.spinner(f"Generating curriculum for '{main_study_subject}'... This might take a moment."):
-            try:
-                curriculum_raw_content = curriculum_agent.run(f"Generate a curriculum for the subject: '{main_study_subject}'").content
-                curriculum_data = json.loads(curriculum_raw_content)
+stream_generation = st.toggle("Show content as it is generated", value=True, key="stream_generation_toggle")
+force_regenerate = st.checkbox(
+    "Force regeneration",
+    key="force_regenerate_curriculum",
+    help="Generate a fresh curriculum even if this or a very similar subject already has one."
+)
+
+def serve_similar_curriculum(subject):
+    # "java programing" or "Programming in Java" reuse the cached "Java Programming" curriculum
+    started_at = time.perf_counter()
+    match = get_subject_index().match(subject, st.session_state.get("subject_match_threshold_input"))
+    telemetry.observe("subject_match_seconds", time.perf_counter() - started_at)
+    if match is None:
+        telemetry.inc("subject_match_total", result="miss")
+        return False
+    sections = cached_curriculum_sections(match.subject, get_content_cache())
+    if sections is None:
+        # Evicted from the content cache since it was indexed
+        telemetry.inc("subject_match_total", result="expired")
+        return False
+    telemetry.inc("subject_match_total", result="hit")
+    replace_sections(sections)
+    elapsed = time.perf_counter() - started_at
+    record_generation_timing("curriculum", match.subject, {'first_token_s': elapsed, 'complete_s': elapsed, 'cached': True})
+    if match.subject == subject:
+        st.success(f"Loaded the cached curriculum for '{subject}'.")
+    else:
+        st.success(f"Reused the curriculum for '{match.subject}' ({match.score:.0%} similar to '{subject}'). Tick 'Force regeneration' for a fresh one.")
+    return True
 
-                if isinstance(curriculum_data, dict) and "sections" in curriculum_data:
-                    st.session_state.sections = curriculum_data["sections"]
-                    st.success(f"Curriculum generated for '{main_study_subject}'!")
-                    st.toast("Curriculum generated successfully!")
-                else:
-                    st.error("Failed to parse curriculum from agent. Response was not in expected JSON format or missing 'sections' key.")
-                    st.json(curriculum_data)
-            except json.JSONDecodeError as e:
-                st.error(f"Error decoding JSON from Curriculum Agent. The AI might not have returned pure JSON. Details: {e}")
-                st.text(f"Raw content received: \n{curriculum_raw_content}")
-            except Exception as e:
-                st.error(f"An unexpected error occurred while generating curriculum with Curriculum Agent: {e}")
+if st.button("Generate Curriculum", key="generate_curriculum_btn", disabled=not llm_allowed(), help=None if llm_allowed() else "Serving a content pack without LLM calls; turn that off in the sidebar to generate."):
+    if main_study_subject:
+        if force_regenerate or not serve_similar_curriculum(main_study_subject):
+            submit_job("curriculum", "curriculum", {
+                'subject': main_study_subject,
+                'refresh': force_regenerate,
+                # For the deadline fallback to a similar subject's curriculum
+                'match_threshold': st.session_state.get("subject_match_threshold_input"),
+            })
     else:
         st.warning("Please enter a main study subject to generate a curriculum.")
+if "curriculum" in st.session_state.jobs:
+    render_job_progress("curriculum", "Generating curriculum")
 
 st.markdown("---")
 
-with st.sidebar:
+@st.fragment(run_every=SIDEBAR_REFRESH_SECONDS)
+def render_overall_performance():
+    fragment_started_at = time.perf_counter()
+    calculate_overall_grade()
     st.header("Overall Performance")
     overall_grade_display = st.session_state.overall_grade
     st.markdown(f"**Overall Grade:** <span style='font-size: 2em; font-weight: bold;'>{overall_grade_display}</span>", unsafe_allow_html=True)
     st.markdown(f"**Total Correct:** {st.session_state.overall_total_correct}")
     st.markdown(f"**Total Attempted:** {st.session_state.overall_total_attempted}")
     st.info("This grade reflects your performance across all adaptive quizzes.")
+    progress_store = get_progress_store()
+    st.caption(f"Saved answers: {progress_store.answers_written} written in {progress_store.batches_written} batches, {progress_store.pending()} pending")
+    session_usage = st.session_state.session_memory.usage()
+    server_usage = get_session_memory_registry().usage()
+    st.caption(
+        f"Session memory: {session_usage['memory_bytes'] / 1024:.0f} of {session_usage['budget_bytes'] / 1024:.0f} KiB "
+        f"({session_usage['hot_bytes'] / 1024:.0f} KiB plain, {session_usage['compressed_bytes'] / 1024:.0f} KiB compressed), "
+        f"{session_usage['spilled_bytes'] / 1024:.0f} KiB spilled to disk; "
+        f"server: {server_usage['sessions']} sessions, {server_usage['memory_bytes'] / 1024 / 1024:.1f} MiB in memory"
+    )
+    prefetch_stats = st.session_state.quiz_prefetch_stats
+    st.caption(f"Question prefetch: {prefetch_stats['hits']} hits, {prefetch_stats['misses']} misses, {prefetch_stats['wasted']} wasted")
+    cache_stats = get_content_cache().stats()
+    st.caption(f"Content cache: {cache_stats['entries']} entries, {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
+    scheduler_metrics = llm_scheduler.metrics()
+    st.caption(
+        f"LLM queue: {scheduler_metrics['queue_depth']} waiting, {scheduler_metrics['active']} running, "
+        f"wait avg {scheduler_metrics['wait_avg_s']:.2f}s / p95 {scheduler_metrics['wait_p95_s']:.2f}s, "
+        f"{scheduler_metrics['retries']} retries, {scheduler_metrics['coalesced']} coalesced"
+    )
+    hedge_stats = hedger.stats()
+    hedge_totals = {outcome: sum(name_stats[outcome] for name_stats in hedge_stats['by_name'].values()) for outcome in ("hedge_wins", "hedges_skipped", "deadlines_exceeded")}
+    st.caption(
+        f"Hedged LLM calls: {hedge_stats['hedges']} hedges for {hedge_stats['calls']} calls "
+        f"({hedge_stats['extra_request_ratio']:.0%} extra requests), {hedge_totals['hedge_wins']} won by the hedge, "
+        f"{hedge_totals['hedges_skipped']} skipped, {hedge_totals['deadlines_exceeded']} past the deadline"
+    )
+    warmup_stats = warmer.stats()
+    warmup_activity = {
+        "stopped": "off" if not WARMUP_ENABLED else "starts with the first demand",
+        "waiting": "waiting for the LLM to be idle",
+        "over_budget": "budget spent for now",
+        "warming": f"generating {warmup_stats['current'][0].replace('_', ' ')} '{warmup_stats['current'][1]}'" if warmup_stats['current'] else "generating",
+        "covered": "all covered",
+    }[warmup_stats['state']]
+    warmup_coverage = f"{warmup_stats['warm']} of {warmup_stats['items']} popular items ready ({warmup_stats['coverage']:.0%})" if warmup_stats['items'] else "no popular content yet"
+    st.caption(
+        f"Warm-up: {warmup_coverage}, {warmup_stats['warmed']} generated with {warmup_stats['requests']} LLM calls "
+        f"(~{warmup_stats['tokens']} tokens), {warmup_activity}"
+    )
+    if st.session_state.generation_timings:
+        last_timing = st.session_state.generation_timings[-1]
+        first_token_s = last_timing['first_token_s']
+        first_token_text = f"{first_token_s:.2f}s" if first_token_s is not None else "n/a"
+        st.caption(f"Last {last_timing['kind'].replace('_', ' ')} ({last_timing['label']}): first token {first_token_text}, complete {last_timing['complete_s']:.2f}s")
+    rerun_summaries = [
+        f"{scope.replace('_', ' ')} {timings[-1] * 1000:.0f} ms (avg {sum(timings) / len(timings) * 1000:.0f} ms)"
+        for scope, timings in st.session_state.rerun_timings.items() if timings
+    ]
+    if rerun_summaries:
+        st.caption("Last rerun: " + ", ".join(rerun_summaries))
+    record_rerun_timing("performance_panel", fragment_started_at)
+
+with st.sidebar:
+    render_overall_performance()
+
+def format_rate(numerator, denominator):
+    return f"{numerator / denominator:.0%}" if denominator else "n/a"
+
+@st.fragment(run_every=SIDEBAR_REFRESH_SECONDS)
+def render_telemetry_panel():
+    with st.expander("Telemetry (admin)", expanded=False):
+        if telemetry.endpoint_error:
+            st.warning(telemetry.endpoint_error)
+        latency_rows = [
+            {
+                "metric": row['metric'].removesuffix("_seconds"),
+                "labels": ", ".join(f"{name}={value}" for name, value in row['labels'].items()),
+                "count": row['count'],
+                "p50 ms": round(row['p50_s'] * 1000, 1),
+                "p95 ms": round(row['p95_s'] * 1000, 1),
+            }
+            for row in telemetry.latency_summary() if row['count']
+        ]
+        if latency_rows:
+            st.dataframe(latency_rows, hide_index=True, use_container_width=True)
+        else:
+            st.caption("No measurements yet.")
+
+        llm_requests = telemetry.counter_value("llm_request_total")
+        llm_errors = llm_requests - telemetry.counter_value("llm_request_total", outcome="ok")
+        quiz_parses = telemetry.counter_value("quiz_parse_total")
+        quiz_parse_failures = quiz_parses - telemetry.counter_value("quiz_parse_total", result="ok")
+        question_batches = telemetry.counter_value("question_batch_total")
+        cache_lookups = telemetry.counter_value("content_cache_lookups_total")
+        st.caption(
+            f"LLM calls: {llm_requests:.0f} ({format_rate(llm_errors, llm_requests)} errors), "
+            f"tokens {telemetry.counter_value('llm_tokens_total', kind='prompt'):.0f} prompt / "
+            f"{telemetry.counter_value('llm_tokens_total', kind='completion'):.0f} completion"
+        )
+        st.caption(
+            f"Quiz parse failures: {format_rate(quiz_parse_failures, quiz_parses)} of {quiz_parses:.0f} generations "
+            f"({telemetry.counter_value('quiz_parse_total', result='aborted'):.0f} aborted early), "
+            f"{format_rate(telemetry.counter_value('question_batch_total', result='failed'), question_batches)} of {question_batches:.0f} bank batches; "
+            f"content cache hit rate: {format_rate(telemetry.counter_value('content_cache_lookups_total', result='hit'), cache_lookups)}"
+        )
+
+        warmup_plan = warmer.plan()
+        if warmup_plan:
+            st.markdown("**Warm-up (most requested content)**")
+            st.dataframe(
+                [{"kind": row['kind'], "item": row['label'], "demand": round(row['demand'], 1), "ready": row['warm']} for row in warmup_plan],
+                hide_index=True,
+                use_container_width=True
+            )
+        if warmer.last_error:
+            st.caption(f"Last warm-up error: {warmer.last_error}")
+
+        st.markdown("**Startup (this server process)**")
+        st.dataframe(
+            [{"what": f"{row['kind']}: {row['name']}", "ms": round(row['seconds'] * 1000, 1)} for row in startup_report.rows()],
+            hide_index=True,
+            use_container_width=True
+        )
+
+if SHOW_TELEMETRY_PANEL:
+    with st.sidebar:
+        render_telemetry_panel()
+
+st.sidebar.toggle(
+    "Pick quiz questions from the shared, calibrated question bank",
+    value=True,
+    key="use_question_bank_toggle",
+    help=f"Questions are matched to your estimated ability; {QUESTION_BANK_BATCH_SIZE} new ones are generated in one call only when none are left near your level."
+)
+st.sidebar.slider(
+    "Similar subject threshold",
+    min_value=0.5,
+    max_value=1.0,
+    value=SUBJECT_MATCH_THRESHOLD,
+    step=0.05,
+    key="subject_match_threshold_input",
+    help="A subject at least this similar (character n-gram TF-IDF cosine) to one that already has a curriculum reuses it instead of generating a new one."
+)
+# Counts of the stores this process has loaded; a plain first run loads none of them
+built_resources = get_built_resources()
+if "subject_index" in built_resources:
+    st.sidebar.caption(f"Subject index: {len(built_resources['subject_index'])} subjects with a cached curriculum")
+if "question_bank" in built_resources:
+    question_bank = built_resources["question_bank"]
+    st.sidebar.caption(f"Question bank: {question_bank.size()} questions across {question_bank.topic_count()} topics, {question_bank.batches_generated} batches generated, {question_bank.questions_served} served")
+job_stats = get_job_queue().stats()
+st.sidebar.caption(f"Background jobs: {job_stats['queued']} queued, {job_stats['running']} running, {job_stats['done']} done, {job_stats['failed']} failed")
+
+st.sidebar.number_input(
+    "Parallel study map generations",
+    min_value=1,
+    max_value=16,
+    value=STUDY_MAP_CONCURRENCY,
+    key="study_map_concurrency_input",
+    help="How many study maps 'Generate All Study Maps' requests at once."
+)
+
+st.sidebar.markdown("---")
+st.sidebar.header("Content Packs")
+active_pack = active_content_pack()
+if active_pack is not None:
+    pack_stats = active_pack.stats()
+    st.sidebar.caption(
+        f"Serving pack '{active_pack.subject or active_pack.pack_id}': {pack_stats['topics']} topics, "
+        f"{pack_stats['study_maps']} study maps, {pack_stats['questions']} questions ({pack_stats['bytes'] / 1024:.0f} KiB, memory-mapped). "
+        f"Share it with ?pack={active_pack.pack_id}"
+    )
+    st.sidebar.toggle("Serve only from this pack (no LLM calls)", value=True, key="pack_only_toggle")
+    if st.sidebar.button("Stop using this pack", key="stop_pack_btn"):
+        st.session_state.active_pack_id = None
+        del st.query_params["pack"]
+        st.rerun()
+
+if st.session_state.sections:
+    if st.sidebar.button("Prepare content pack for download", key="prepare_pack_btn"):
+        st.session_state.downloads["content_pack"] = export_content_pack()
+    if "content_pack" in st.session_state.downloads:
+        st.sidebar.download_button(
+            "Download content pack",
+            data=st.session_state.downloads["content_pack"],
+            file_name=f"{re.sub(r'[^A-Za-z0-9]+', '_', st.session_state.get('main_subject_input') or 'study').strip('_') or 'study'}.arrow",
+            mime="application/vnd.apache.arrow.file",
+            key="download_pack_btn",
+            on_click="ignore"
+        )
+
+uploaded_pack = st.sidebar.file_uploader("Import a content pack", type=["arrow"], key="pack_uploader")
+if uploaded_pack is not None and uploaded_pack.file_id != st.session_state.get("imported_pack_file_id"):
+    st.session_state.imported_pack_file_id = uploaded_pack.file_id
+    try:
+        activate_content_pack(get_content_pack_library().import_pack(uploaded_pack.getvalue()))
+        st.rerun()
+    except ValueError as e:
+        st.sidebar.error(f"Could not import content pack: {e}")
+
+# Listing opens every pack file, so it waits until asked for
+if st.sidebar.toggle("Browse packs on this server", key="browse_packs_toggle"):
+    content_pack_library = get_content_pack_library()
+    available_pack_ids = [pack_id for pack_id in content_pack_library.available() if active_pack is None or pack_id != active_pack.pack_id]
+    if available_pack_ids:
+        selected_pack_id = st.sidebar.selectbox(
+            "Packs on this server",
+            available_pack_ids,
+            format_func=lambda pack_id: f"{content_pack_library.get(pack_id).subject or 'Untitled'} ({pack_id})",
+            key="select_pack"
+        )
+        if st.sidebar.button("Open pack", key="open_pack_btn"):
+            activate_content_pack(content_pack_library.get(selected_pack_id))
+            st.rerun()
+    else:
+        st.sidebar.caption("No other packs on this server yet.")
 
 st.sidebar.markdown("---")
 st.sidebar.header("Manage Study Content (Manual)")
 new_section_name = st.sidebar.text_input("New Section Name", key="new_section_input")
 if st.sidebar.button("Add New Section", key="add_section_btn"):
-    if new_section_name and new_section_name not in [s['name'] for s in st.session_state.sections]:
-        st.session_state.sections.append({"name": new_section_name, "topics": []})
+    if new_section_name and st.session_state.study_plan_index.add_section({"id": new_section_id(), "name": new_section_name, "topics": []}):
         st.sidebar.success(f"Section '{new_section_name}' added!")
     elif new_section_name:
         st.sidebar.warning("Section with this name already exists.")
@@ -374,20 +1806,15 @@ if st.sidebar.button("Add New Section", key="add_section_btn"):
 st.sidebar.markdown("---")
 st.sidebar.header("Add Topics to Sections (Manual)")
 if st.session_state.sections:
-    section_names = [s['name'] for s in st.session_state.sections]
-    selected_section_for_topic = st.sidebar.selectbox("Select a Section", section_names, key="select_section_for_topic")
+    selected_section_for_topic = st.sidebar.selectbox("Select a Section", st.session_state.study_plan_index.section_names(), key="select_section_for_topic")
     new_topic_name = st.sidebar.text_input("New Topic Name", key="new_topic_input")
 
     if st.sidebar.button("Add Topic to Selected Section", key="add_topic_btn"):
         if new_topic_name and selected_section_for_topic:
-            for section in st.session_state.sections:
-                if section['name'] == selected_section_for_topic:
-                    if new_topic_name not in section['topics']:
-                        section['topics'].append(new_topic_name)
-                        st.sidebar.success(f"Topic '{new_topic_name}' added to '{selected_section_for_topic}'.")
-                    else:
-                        st.sidebar.warning("Topic already exists in this section.")
-                    break
+            if st.session_state.study_plan_index.add_topic(selected_section_for_topic, new_topic_name):
+                st.sidebar.success(f"Topic '{new_topic_name}' added to '{selected_section_for_topic}'.")
+            else:
+                st.sidebar.warning("Topic already exists in this section.")
         else:
             st.sidebar.warning("Please enter a topic name and select a section.")
 else:
@@ -395,185 +1822,222 @@ else:
 
 st.sidebar.markdown("---")
 
+def jump_to_topic(position, topic_id_key, topic_name):
+    st.session_state.study_plan_page = position // SECTIONS_PER_PAGE + 1
+    st.session_state[f"topic_open_{topic_id_key}"] = True
+    record_demand("study_map", topic_name)
+
 st.markdown("<h2>Your Study Plan</h2>", unsafe_allow_html=True)
 
+visible_sections = []
 if not st.session_state.sections:
     st.info("Start by generating a curriculum above, or manually adding a new section from the sidebar!")
+else:
+    if st.button("Generate All Study Maps for the Curriculum", key="study_map_all_btn", disabled=not llm_allowed()):
+        generate_study_maps_bulk(
+            [job for section_data in st.session_state.sections for job in section_study_map_jobs(section_data)],
+            "the whole curriculum",
+            "study_map_bulk:all"
+        )
+    if "study_map_bulk:all" in st.session_state.jobs:
+        render_job_progress("study_map_bulk:all", "Generating study maps for the whole curriculum")
+
+    topic_query = st.text_input("Jump to a topic", key="topic_search_input", placeholder="Search topics...")
+    if topic_query:
+        topic_matches = st.session_state.study_plan_index.search(topic_query, TOPIC_SEARCH_RESULTS)
+        if not topic_matches:
+            st.caption("No matching topics.")
+        for position, topic_index in topic_matches:
+            match_section = st.session_state.sections[position]
+            match_topic = match_section['topics'][topic_index]
+            st.button(
+                f"{match_section['name']} › {match_topic}",
+                key=f"jump_to_topic_{position}_{topic_index}",
+                on_click=jump_to_topic,
+                args=(position, make_topic_id_key(make_section_id_key(match_section['name']), match_topic, topic_index), match_topic)
+            )
+
+    # Only the current page's sections build any widgets
+    section_count = len(st.session_state.sections)
+    page_count = -(-section_count // SECTIONS_PER_PAGE)
+    if st.session_state.get("study_plan_page", 1) > page_count:
+        st.session_state.study_plan_page = 1
+    if page_count > 1:
+        st.number_input("Page", min_value=1, max_value=page_count, step=1, key="study_plan_page")
+    page_start = (st.session_state.get("study_plan_page", 1) - 1) * SECTIONS_PER_PAGE
+    st.caption(f"Sections {page_start + 1}–{min(page_start + SECTIONS_PER_PAGE, section_count)} of {section_count} ({page_count} page{'s' if page_count > 1 else ''})")
+    visible_sections = st.session_state.sections[page_start:page_start + SECTIONS_PER_PAGE]
+
+def clean_study_map_for_tts(study_map_markdown):
+    # Clean up markdown for better TTS pronunciation
+    tts_text = re.sub(r'##\s*', '', study_map_markdown)
+    tts_text = re.sub(r'\*\*(.*?)\*\*', r'\1', tts_text)
+    tts_text = re.sub(r'\*', '', tts_text)
+    tts_text = re.sub(r'\(Terms:.*?\)', '', tts_text)
+    return tts_text
+
+@st.fragment
+def render_topic(topic_id_key, topic_name, section_name, topic_index):
+    # A closed topic is one toggle; its buttons and study map are only built while it is open
+    if not st.toggle(f"Topic: {topic_name}", key=f"topic_open_{topic_id_key}", on_change=record_topic_opened, args=(topic_id_key, topic_name)):
+        for target, label in ((f"study_map:{topic_id_key}", f"Generating study map for topic: {topic_name}"), (f"tts:{topic_id_key}", "Generating audio")):
+            if target in st.session_state.jobs:
+                render_job_progress(target, label)
+        return
 
-for i, section_data in enumerate(st.session_state.sections):
+    with st.container(border=True):
+        col_study_map_btn, col_tts_btn = st.columns([0.7, 0.3])
+        study_map = stored_study_map(topic_id_key, section_name, topic_index)
+
+        with col_study_map_btn:
+            if st.button(f"Generate Study Map for '{topic_name}'", key=f"study_map_btn_{topic_id_key}", disabled=not llm_allowed()):
+                submit_job("study_map", f"study_map:{topic_id_key}", {'topic_name': topic_name, 'stream': stream_generation})
+            if f"study_map:{topic_id_key}" in st.session_state.jobs:
+                render_job_progress(f"study_map:{topic_id_key}", f"Generating study map for topic: {topic_name}")
+
+        if study_map is not None:
+            with col_tts_btn:
+                if st.button("🔊 Read Aloud", key=f"tts_btn_{topic_id_key}"):
+                    tts_text = clean_study_map_for_tts(study_map)
+                    if split_into_chunks(tts_text, TTS_CHUNK_CHARS):
+                        submit_job("tts", f"tts:{topic_id_key}", {'text': tts_text})
+                    else:
+                        st.warning("Nothing to read aloud.")
+                if f"tts:{topic_id_key}" in st.session_state.jobs:
+                    render_job_progress(f"tts:{topic_id_key}", "Generating audio")
+                elif st.session_state.tts_autoplay == topic_id_key:
+                    play_tts_audio(st.session_state.tts_audio_files[topic_id_key])
+                    st.session_state.tts_autoplay = None
+
+            st.markdown("---")
+            st.markdown(f"**Study Map for {topic_name}:**")
+            st.markdown(study_map, unsafe_allow_html=True)
+
+@st.fragment
+def render_quiz_panel(section_data):
+    # Check Answer / Next Question only rerun this fragment; starting or
+    # restarting a quiz changes active_quiz_section, which other sections'
+    # panels depend on, so those still rerun the whole app.
+    fragment_started_at = time.perf_counter()
     section_name = section_data['name']
     topics_in_section = section_data['topics']
-    section_id_key = section_name.replace(" ", "_").replace(":", "").replace("/", "").replace(".", "").replace("-", "_")
+    quiz_state = st.session_state.quiz_states.get(section_data)
+    section_id = quiz_state.section_id
+
+    if st.session_state.active_quiz_section == section_id and not quiz_state.submitted:
+        current_q_data = quiz_state.current_question
+
+        if current_q_data:
+            st.markdown("---")
+            st.markdown(f"**Question {quiz_state.question_count} of {MAX_QUIZ_QUESTIONS}**")
+            st.markdown(f"**Current Topic:** {quiz_state.current_topic}")
+            st.caption(f"Estimated ability {quiz_state.ability:+.2f} · question difficulty {question_difficulty(current_q_data):+.2f} (logits)")
+
+            st.markdown(f"**Question:** {current_q_data['question']}")
+
+            # Start generating both possible follow-ups while the learner thinks
+            if not quiz_state.options_locked:
+                start_quiz_prefetch(quiz_state, topics_in_section)
+
+            # Only allow selection if options are not locked
+            user_selected_option = st.radio(
+                "Select your answer:",
+                options=current_q_data['options'],
+                key=f"adaptive_quiz_q_radio_{section_id}",
+                index=None,
+                disabled=quiz_state.options_locked # Disable when locked
+            )
+            
+            # Only show check answer button if options are not locked
+            if not quiz_state.options_locked:
+                if st.button("Check Answer", key=f"check_answer_btn_{section_id}"):
+                    check_answer_and_adjust_difficulty(quiz_state, section_name, user_selected_option, current_q_data)
+
+            if quiz_state.feedback:
+                st.markdown(quiz_state.feedback, unsafe_allow_html=True)
+                
+                if quiz_state.question_count < MAX_QUIZ_QUESTIONS:
+                    next_button_label = "Next Question"
+                else:
+                    next_button_label = "Finish Quiz"
+
+                # Only show next/finish button after an answer has been checked (options are locked)
+                if quiz_state.options_locked:
+                    if st.button(next_button_label, key=f"next_adaptive_q_btn_{section_id}"):
+                        quiz_state.feedback = ""
+                        quiz_state.options_locked = False # Unlock for next question
+                        
+                        if quiz_state.question_count < MAX_QUIZ_QUESTIONS:
+                            advance_quiz(quiz_state, topics_in_section)
+                        else:
+                            quiz_state.submitted = True
+                            st.session_state.active_quiz_section = None
+                            discard_quiz_prefetch(quiz_state)
+                        calculate_overall_grade()
+                        rerun_quiz_panel()
+        elif f"quiz:{section_id}" in st.session_state.jobs:
+            render_job_progress(f"quiz:{section_id}", "Generating question")
+        else:
+            st.info("No current question. Click 'Start Adaptive Quiz' above to begin.")
+    elif quiz_state.submitted:
+        st.success(f"Adaptive Quiz Session for '{section_name}' Completed!")
+        st.markdown(f"**Final Score for this quiz:** {quiz_state.total_correct} / {quiz_state.total_attempted}")
+        st.markdown(f"**Final Grade for this quiz:** <span style='font-size: 1.5em; font-weight: bold;'>{quiz_state.grade}</span>", unsafe_allow_html=True)
+        section_history = get_progress_store().rollup(st.session_state.learner_id, section_scope(section_name))
+        st.caption(f"All quizzes in this section: {section_history['correct']} / {section_history['attempted']} correct, {section_history['mean_latency_s']:.1f}s per answer on average")
+        st.info("You can restart the quiz to try again with new questions.")
+
+        if st.button(f"Restart Adaptive Quiz for '{section_name}'", key=f"restart_adaptive_quiz_{section_id}"):
+            discard_quiz_prefetch(quiz_state)
+            st.session_state.quiz_states.reset(section_data)
+            st.session_state.active_quiz_section = None
+            calculate_overall_grade()
+            st.rerun()
+
+    # Panels without a quiz draw nothing; timing them would only water down the quiz panel figures
+    if st.session_state.active_quiz_section == section_id or quiz_state.submitted:
+        record_rerun_timing("quiz_panel", fragment_started_at)
+
+for section_data in visible_sections:
+    section_name = section_data['name']
+    topics_in_section = section_data['topics']
+    section_id_key = make_section_id_key(section_name)
+    section_id = ensure_section_id(section_data)
 
     with st.container(border=True):
         st.markdown(f"<h3>Section: {section_name}</h3>", unsafe_allow_html=True)
 
-        if section_name not in st.session_state.quiz_difficulty_state:
-            st.session_state.quiz_difficulty_state[section_name] = {
-                'current_topic_index': 0,
-                'difficulty_hint': "normal",
-                'current_topic': topics_in_section[0] if topics_in_section else "general knowledge"
-            }
-        
-        if section_name not in st.session_state.quiz_total_correct:
-            st.session_state.quiz_total_correct[section_name] = 0
-        if section_name not in st.session_state.quiz_total_attempted:
-            st.session_state.quiz_total_attempted[section_name] = 0
-        if section_name not in st.session_state.quiz_question_count:
-            st.session_state.quiz_question_count[section_name] = 0
-        if section_name not in st.session_state.quiz_current_grade:
-            st.session_state.quiz_current_grade[section_name] = "N/A"
-        # Initialize quiz_options_locked for this section
-        if section_name not in st.session_state.quiz_options_locked:
-            st.session_state.quiz_options_locked[section_name] = False
-
-
-        if st.button(f"Start Adaptive Quiz for '{section_name}'", key=f"start_quiz_btn_{section_id_key}"):
+        if st.button(f"Start Adaptive Quiz for '{section_name}'", key=f"start_quiz_btn_{section_id}"):
             if topics_in_section:
-                st.session_state[f'quiz_loading_{section_id_key}'] = True
-                st.session_state.quiz_submitted[section_name] = False
-                st.session_state.quiz_total_correct[section_name] = 0
-                st.session_state.quiz_total_attempted[section_name] = 0
-                st.session_state.quiz_question_feedback[section_name] = ""
-                st.session_state.quiz_difficulty_state[section_name]['current_topic_index'] = 0
-                st.session_state.quiz_difficulty_state[section_name]['difficulty_hint'] = "normal"
-                st.session_state.quiz_question_count[section_name] = 0
-                st.session_state.quiz_current_grade[section_name] = "N/A"
-                st.session_state.active_quiz_section = section_name
-                st.session_state.quiz_options_locked[section_name] = False # Unlock options for new quiz
-
-                if topics_in_section:
-                    new_question_markdown = generate_adaptive_quiz_question(
-                        section_name, 
-                        topics_in_section, 
-                        st.session_state.quiz_difficulty_state[section_name]['difficulty_hint']
-                    )
-                    st.session_state.quiz_output[section_name] = new_question_markdown
-                    st.session_state.current_quiz_question_data[section_name] = parse_single_quiz_question_markdown(new_question_markdown)
-                    if new_question_markdown:
-                        st.session_state.quiz_question_count[section_name] += 1
-                else:
-                    st.warning("Cannot start quiz: No topics found in this section.")
-                    st.session_state.quiz_output.pop(section_name, None)
-                    st.session_state.current_quiz_question_data.pop(section_name, None)
+                # The first question is on the section's first topic
+                record_demand("quiz_questions", topics_in_section[0])
+                previous_state = st.session_state.quiz_states.find(section_id)
+                if previous_state is not None:
+                    discard_quiz_prefetch(previous_state)
+                quiz_state = st.session_state.quiz_states.reset(section_data)
+                st.session_state.active_quiz_section = section_id
+                advance_quiz(quiz_state, topics_in_section)
             else:
                 st.warning(f"Please add some topics to section '{section_name}' before starting an adaptive quiz.")
-            st.session_state[f'quiz_loading_{section_id_key}'] = False
             st.rerun()
 
         st.markdown("<h4>Topics:</h4>", unsafe_allow_html=True)
         if not topics_in_section:
             st.info("No topics added to this section yet.")
+        else:
+            if st.button(f"Generate All Study Maps for '{section_name}'", key=f"study_map_section_btn_{section_id_key}", disabled=not llm_allowed()):
+                generate_study_maps_bulk(section_study_map_jobs(section_data), f"'{section_name}'", f"study_map_bulk:{section_id_key}")
+            if f"study_map_bulk:{section_id_key}" in st.session_state.jobs:
+                render_job_progress(f"study_map_bulk:{section_id_key}", f"Generating study maps for '{section_name}'")
 
         for j, topic_name in enumerate(topics_in_section):
-            topic_id_key = f"{section_id_key}_{topic_name.replace(' ', '_').replace(':', '').replace('/', '').replace('.', '').replace('-', '_')}_{j}"
+            render_topic(make_topic_id_key(section_id_key, topic_name, j), topic_name, section_name, j)
 
-            with st.expander(f"Topic: {topic_name}", expanded=False):
-                col_study_map_btn, col_tts_btn = st.columns([0.7, 0.3])
-                
-                with col_study_map_btn:
-                    if st.button(f"Generate Study Map for '{topic_name}'", key=f"study_map_btn_{topic_id_key}"):
-                        st.session_state[f'study_map_loading_{topic_id_key}'] = True
-                        with st.spinner(f"Generating study map for topic: {topic_name}..."):
-                            try:
-                                study_map_response = study_map_agent.run(f"Generate a study map for the topic: '{topic_name}'")
-                                st.session_state.study_map_output[topic_id_key] = study_map_response.content
-                            except Exception as e:
-                                st.error(f"Error generating study map for topic '{topic_name}': {e}")
-                            st.session_state[f'study_map_loading_{topic_id_key}'] = False
-
-                if topic_id_key in st.session_state.study_map_output:
-                    with col_tts_btn:
-                        if st.button("🔊 Read Aloud", key=f"tts_btn_{topic_id_key}"):
-                            tts_text = st.session_state.study_map_output[topic_id_key]
-                            # Clean up markdown for better TTS pronunciation
-                            tts_text = re.sub(r'##\s*', '', tts_text)
-                            tts_text = re.sub(r'\*\*(.*?)\*\*', r'\1', tts_text)
-                            tts_text = re.sub(r'\*', '', tts_text)
-                            tts_text = re.sub(r'\(Terms:.*?\)', '', tts_text)
-
-                            text_to_speech_and_play(tts_text, topic_id_key)
-
-                    st.markdown("---")
-                    st.markdown(f"**Study Map for {topic_name}:**")
-                    st.markdown(st.session_state.study_map_output[topic_id_key], unsafe_allow_html=True)
-
-        if st.session_state.active_quiz_section == section_name and not st.session_state.quiz_submitted[section_name]:
-            current_q_data = st.session_state.current_quiz_question_data.get(section_name)
-
-            if current_q_data:
-                st.markdown("---")
-                st.markdown(f"**Question {st.session_state.quiz_question_count[section_name]} of {MAX_QUIZ_QUESTIONS}**")
-                st.markdown(f"**Current Topic:** {st.session_state.quiz_difficulty_state[section_name]['current_topic']}")
-
-                st.markdown(f"**Question:** {current_q_data['question']}")
-
-                # Only allow selection if options are not locked
-                user_selected_option = st.radio(
-                    "Select your answer:",
-                    options=current_q_data['options'],
-                    key=f"adaptive_quiz_q_radio_{section_id_key}",
-                    index=None,
-                    disabled=st.session_state.quiz_options_locked[section_name] # Disable when locked
-                )
-                
-                # Only show check answer button if options are not locked
-                if not st.session_state.quiz_options_locked[section_name]:
-                    if st.button("Check Answer", key=f"check_answer_btn_{section_id_key}"):
-                        check_answer_and_adjust_difficulty(section_name, user_selected_option, current_q_data)
-
-                if st.session_state.quiz_question_feedback.get(section_name):
-                    st.markdown(st.session_state.quiz_question_feedback[section_name], unsafe_allow_html=True)
-                    
-                    if st.session_state.quiz_question_count[section_name] < MAX_QUIZ_QUESTIONS:
-                        next_button_label = "Next Question"
-                    else:
-                        next_button_label = "Finish Quiz"
-
-                    # Only show next/finish button after an answer has been checked (options are locked)
-                    if st.session_state.quiz_options_locked[section_name]:
-                        if st.button(next_button_label, key=f"next_adaptive_q_btn_{section_id_key}"):
-                            st.session_state.quiz_question_feedback[section_name] = ""
-                            st.session_state.quiz_options_locked[section_name] = False # Unlock for next question
-                            
-                            if st.session_state.quiz_question_count[section_name] < MAX_QUIZ_QUESTIONS:
-                                new_question_markdown = generate_adaptive_quiz_question(
-                                    section_name,
-                                    topics_in_section,
-                                    st.session_state.quiz_difficulty_state[section_name]['difficulty_hint']
-                                )
-                                st.session_state.quiz_output[section_name] = new_question_markdown
-                                st.session_state.current_quiz_question_data[section_name] = parse_single_quiz_question_markdown(new_question_markdown)
-                                if new_question_markdown:
-                                    st.session_state.quiz_question_count[section_name] += 1
-                                calculate_overall_grade()
-                                st.rerun()
-                            else:
-                                st.session_state.quiz_submitted[section_name] = True
-                                st.session_state.active_quiz_section = None
-                                calculate_overall_grade()
-                                st.rerun()
-            else:
-                st.info("No current question. Click 'Start Adaptive Quiz' above to begin.")
-        elif st.session_state.quiz_submitted.get(section_name):
-            st.success(f"Adaptive Quiz Session for '{section_name}' Completed!")
-            final_grade = st.session_state.quiz_current_grade.get(section_name, "N/A")
-            st.markdown(f"**Final Score for this quiz:** {st.session_state.quiz_total_correct[section_name]} / {st.session_state.quiz_total_attempted[section_name]}")
-            st.markdown(f"**Final Grade for this quiz:** <span style='font-size: 1.5em; font-weight: bold;'>{final_grade}</span>", unsafe_allow_html=True)
-            st.info("You can restart the quiz to try again with new questions.")
-
-            if st.button(f"Restart Adaptive Quiz for '{section_name}'", key=f"restart_adaptive_quiz_{section_id_key}"):
-                st.session_state.quiz_output.pop(section_name, None)
-                st.session_state.current_quiz_question_data.pop(section_name, None)
-                st.session_state.quiz_question_feedback.pop(section_name, None)
-                st.session_state.quiz_submitted[section_name] = False
-                st.session_state.quiz_total_correct[section_name] = 0
-                st.session_state.quiz_total_attempted[section_name] = 0
-                st.session_state.quiz_question_count[section_name] = 0
-                st.session_state.quiz_difficulty_state[section_name]['current_topic_index'] = 0
-                st.session_state.quiz_difficulty_state[section_name]['difficulty_hint'] = "normal"
-                st.session_state.quiz_current_grade[section_name] = "N/A"
-                st.session_state.active_quiz_section = None
-                st.session_state.quiz_options_locked[section_name] = False
-                calculate_overall_grade()
-                st.rerun()
\ No newline at end of file
+        render_quiz_panel(section_data)
+
+hidden_job_targets = [target for target in st.session_state.jobs if target not in rendered_job_targets]
+if hidden_job_targets:
+    render_hidden_job_watcher(hidden_job_targets)
+
+record_rerun_timing("full_script", script_started_at)
+startup_report.record_phase("first_full_run", time.perf_counter() - script_started_at)
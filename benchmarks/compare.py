@@ -0,0 +1,52 @@
+"""Compare two benchmark JSON reports produced by benchmarks.run.
+
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 0.10]
+
+Exits with status 1 when any shared benchmark's p50 regressed by more than
+the threshold.
+"""
+import argparse
+import json
+import sys
+
+
+def load_results(path):
+    with open(path) as report_file:
+        return json.load(report_file)["results"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative p50 slowdown (default 0.10)")
+    parser.add_argument("--metric", default="p50_s", help="Statistic to compare (default p50_s)")
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.baseline)
+    candidate = load_results(args.candidate)
+    regressions = []
+
+    print(f"{'benchmark':50} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for name in sorted(set(baseline) | set(candidate)):
+        if name not in baseline or name not in candidate:
+            side = "candidate" if name in candidate else "baseline"
+            print(f"{name:50} {'(only in ' + side + ')':>35}")
+            continue
+        before = baseline[name][args.metric]
+        after = candidate[name][args.metric]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:50} {before * 1000:10.3f}ms {after * 1000:10.3f}ms {change:+8.1%}{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
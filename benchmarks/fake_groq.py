@@ -0,0 +1,181 @@
+"""Deterministic local stand-in for the Groq chat completions API.
+
+``install()`` swaps ``agno.models.groq.Groq`` for ``FakeGroq`` before app.py
+is executed, so every agent built by ``get_*_agent`` talks to this module
+instead of the network. Latency and output size are configurable.
+"""
+import itertools
+import json
+import threading
+import time
+from dataclasses import dataclass
+
+from agno.models.groq import Groq
+from groq.types.chat import ChatCompletion, ChatCompletionChunk
+
+
+@dataclass
+class FakeBackendConfig:
+    latency_s: float = 0.05
+    # Multiplies the amount of generated content (topics, sections, study-map concepts)
+    output_scale: int = 1
+    stream_chunk_chars: int = 16
+    sections: int = 5
+    topics_per_section: int = 4
+    # When set, responses also take len(text) / output_chars_per_s, like a model generating tokens
+    output_chars_per_s: float = 0.0
+
+
+config = FakeBackendConfig()
+_counter_lock = threading.Lock()
+call_counts = {}
+# Every batch gets fresh question texts, as a real model's would differ between calls
+_batch_numbers = itertools.count(1)
+
+
+def _count(kind):
+    with _counter_lock:
+        call_counts[kind] = call_counts.get(kind, 0) + 1
+
+
+def fake_curriculum_outline():
+    return json.dumps({"sections": [f"Section {i + 1}" for i in range(config.sections)]})
+
+
+def fake_curriculum_section(prompt):
+    section_name = prompt.split("'")[1] if "'" in prompt else "Section"
+    return json.dumps({"topics": [f"{section_name} topic {j + 1}" for j in range(config.topics_per_section * config.output_scale)]})
+
+
+def fake_study_map(prompt):
+    concepts = []
+    for i in range(3 * config.output_scale):
+        concepts.append(
+            f"## Key Concept {i + 1}: Idea {i + 1}\n"
+            f"* **Sub-topic {i + 1}.1**: A brief explanation of the idea. (Terms: Term{i}a, Term{i}b)\n"
+            f"* **Sub-topic {i + 1}.2**: Another brief explanation. (Terms: Term{i}c)\n"
+        )
+    return f"Study map for {prompt}\n\n" + "\n".join(concepts)
+
+
+def fake_quiz_question(question_number=1):
+    return (
+        f"### Question {question_number}:\n"
+        "Which option is correct?\n"
+        "A) The first option\n"
+        "B) The second option\n"
+        "C) The third option\n"
+        "D) The fourth option\n"
+        "Correct Answer: C) The third option\n"
+        "Explanation: The third option is correct by construction.\n"
+    )
+
+
+def fake_question_batch(count=5):
+    batch_number = next(_batch_numbers)
+    return json.dumps({
+        "questions": [
+            {
+                "question": f"Bank question {batch_number}.{k + 1}?",
+                "options": ["First", "Second", "Third", "Fourth"],
+                "correct_answer": "C",
+                "explanation": "The third option is correct by construction.",
+            }
+            for k in range(count)
+        ]
+    })
+
+
+def respond(messages):
+    system = " ".join(str(message.get("content", "")) for message in messages if message.get("role") == "system")
+    user = " ".join(str(message.get("content", "")) for message in messages if message.get("role") == "user")
+    if "topics for one section" in system:
+        _count("curriculum_section")
+        return fake_curriculum_section(user)
+    if "curriculum designer" in system:
+        _count("curriculum")
+        return fake_curriculum_outline()
+    if "banks of accurate multiple-choice" in system:
+        _count("question_bank")
+        return fake_question_batch()
+    if "educational quizzes" in system:
+        _count("quiz_question")
+        return fake_quiz_question()
+    _count("study_map")
+    return fake_study_map(user)
+
+
+def _usage(text):
+    return {"prompt_tokens": 100, "completion_tokens": len(text) // 4, "total_tokens": 100 + len(text) // 4}
+
+
+def _completion(text):
+    return ChatCompletion.model_validate({
+        "id": "fake",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "fake",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+        "usage": _usage(text),
+    })
+
+
+def _chunk(text, usage=None):
+    return ChatCompletionChunk.model_validate({
+        "id": "fake",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "fake",
+        "x_groq": {"id": "fake", "usage": usage, "error": None},
+        "choices": [{"index": 0, "delta": {"role": "assistant", "content": text}}],
+    })
+
+
+def _latency(text):
+    return config.latency_s + (len(text) / config.output_chars_per_s if config.output_chars_per_s else 0.0)
+
+
+class _FakeCompletions:
+    def create(self, messages=None, stream=False, **kwargs):
+        text = respond(messages or [])
+        if not stream:
+            time.sleep(_latency(text))
+            return _completion(text)
+
+        pieces = [text[i:i + config.stream_chunk_chars] for i in range(0, len(text), config.stream_chunk_chars)]
+
+        def generate():
+            # Like Groq, token usage arrives with the final chunk
+            for index, piece in enumerate(pieces):
+                time.sleep(_latency(text) / len(pieces))
+                yield _chunk(piece, _usage(text) if index == len(pieces) - 1 else None)
+
+        return generate()
+
+
+class _FakeChat:
+    def __init__(self):
+        self.completions = _FakeCompletions()
+
+
+class FakeGroqClient:
+    def __init__(self):
+        self.chat = _FakeChat()
+
+    def is_closed(self):
+        return False
+
+
+class FakeGroq(Groq):
+    def get_client(self):
+        return FakeGroqClient()
+
+
+def install(latency_s=None, output_scale=None):
+    import agno.models.groq
+
+    if latency_s is not None:
+        config.latency_s = latency_s
+    if output_scale is not None:
+        config.output_scale = output_scale
+    agno.models.groq.Groq = FakeGroq
@@ -0,0 +1,543 @@
+"""Benchmark the app's hot paths against the fake Groq backend.
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.compare old.json new.json
+
+Every agent call goes to benchmarks.fake_groq, so results only depend on
+this codebase and the configured fake latency, not on the network.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+RERUN_TOPIC_COUNTS = (5, 50, 500)
+TOPICS_PER_SECTION = 5
+ADVERSARIAL_OPTION_LINES = 24
+LARGE_SAMPLE_LINES = 20000
+STREAM_CHUNK_CHARS = 16
+JOB_POLL_SECONDS = 0.01
+LARGE_CURRICULUM_SECTIONS = 24
+# Imported by the app only when a feature needs them; a plain first run must not load any
+DEFERRED_APP_MODULES = ("agno", "groq", "question_bank", "subject_index", "content_pack", "ability_model")
+# Reported for the first run too; Streamlit's custom components import pyarrow (and numpy) themselves
+REPORTED_FIRST_RUN_MODULES = DEFERRED_APP_MODULES + ("numpy", "pyarrow")
+# Roughly 500 tokens/s
+FAKE_OUTPUT_CHARS_PER_S = 2000
+
+
+# Extra entries for the report's meta section, filled in by the benchmarks
+report_meta = {}
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_s": statistics.fmean(ordered),
+        "p50_s": ordered[len(ordered) // 2],
+        "p95_s": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "min_s": ordered[0],
+        "max_s": ordered[-1],
+    }
+
+
+def time_calls(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started_at)
+    return samples
+
+
+def quiz_markdown_samples():
+    from benchmarks.fake_groq import fake_quiz_question
+
+    well_formed = fake_quiz_question()
+    return {
+        "well_formed": well_formed,
+        "lowercase_answer_label": well_formed.replace("Correct Answer:", "Correct answer:"),
+        "missing_option_space": well_formed.replace("C) The third", "C)The third"),
+        "missing_explanation": well_formed.split("Explanation:")[0],
+        "long_preamble": "Sure! Here is your question.\n" * 200 + well_formed,
+        # Option-like lines and no answer line: the nested lazy .*? groups backtrack
+        # super-polynomially here (24 lines ~ tens of ms, 40 lines > 1 s), so keep it small
+        "adversarial_no_answer": "\n".join(f"{'ABCD'[i % 4]}) option {i}" for i in range(ADVERSARIAL_OPTION_LINES)) + "\n",
+    }
+
+
+def large_quiz_markdown_samples():
+    # Far too slow for the regex parser (quadratic or worse), so only the incremental one runs these
+    return {
+        "large_adversarial_no_answer": "Which option is correct?\n" + "\n".join(f"{'ABCD'[i % 4]}) option {i}" for i in range(LARGE_SAMPLE_LINES)) + "\n",
+        "large_no_options": "Sure! Here is your question.\n" * LARGE_SAMPLE_LINES,
+    }
+
+
+def stream_parse(markdown_text):
+    # Feeds the text the way a streamed generation arrives; returns how much was read before stopping
+    from quiz_parsing import QuizStreamParser
+
+    parser = QuizStreamParser()
+    consumed = 0
+    while consumed < len(markdown_text):
+        chunk = markdown_text[consumed:consumed + STREAM_CHUNK_CHARS]
+        consumed += len(chunk)
+        if not parser.feed(chunk) or parser.done:
+            break
+    parser.finish()
+    return consumed
+
+
+def bench_parser(repeat):
+    from benchmarks.fake_groq import fake_quiz_question
+    from quiz_parsing import parse_single_quiz_question_markdown, parse_single_quiz_question_markdown_regex
+
+    samples = quiz_markdown_samples()
+    samples["large_explanation"] = fake_quiz_question() + "More detail on why this option is correct.\n" * LARGE_SAMPLE_LINES
+    large_samples = large_quiz_markdown_samples()
+    results = {}
+    for name, markdown_text in {**samples, **large_samples}.items():
+        results[f"parse_quiz_markdown.{name}"] = summarize(time_calls(lambda: parse_single_quiz_question_markdown(markdown_text), repeat))
+        if name not in large_samples:
+            results[f"parse_quiz_markdown_regex.{name}"] = summarize(time_calls(lambda: parse_single_quiz_question_markdown_regex(markdown_text), repeat))
+        # Malformed output is abandoned after a fraction of the text
+        results[f"parse_quiz_stream.{name}"] = summarize(time_calls(lambda: stream_parse(markdown_text), repeat))
+        results[f"parse_quiz_stream.{name}"]["read_fraction"] = stream_parse(markdown_text) / len(markdown_text)
+    return results
+
+
+def new_app_test(sections=None):
+    from streamlit.testing.v1 import AppTest
+
+    app_test = AppTest.from_file(APP_PATH, default_timeout=600)
+    if sections is not None:
+        app_test.session_state["sections"] = sections
+    return app_test
+
+
+def make_sections(topic_count):
+    sections = []
+    for i in range(0, topic_count, TOPICS_PER_SECTION):
+        sections.append({
+            "name": f"Section {i // TOPICS_PER_SECTION + 1}",
+            "topics": [f"Topic {j + 1}" for j in range(i, min(i + TOPICS_PER_SECTION, topic_count))],
+        })
+    return sections
+
+
+def open_first_topic(app_test):
+    next(toggle for toggle in app_test.toggle if toggle.key and toggle.key.startswith("topic_open_")).set_value(True).run()
+
+
+def find_button(app_test, prefix):
+    return next(button for button in app_test.button if button.key and button.key.startswith(prefix))
+
+
+def assert_clean(app_test):
+    if app_test.exception:
+        raise RuntimeError(app_test.exception[0].message)
+
+
+def wait_for_jobs(app_test):
+    # Generations run as background jobs; a full run collects the finished ones
+    while app_test.session_state["jobs"]:
+        time.sleep(JOB_POLL_SECONDS)
+        app_test.run()
+        assert_clean(app_test)
+
+
+def bench_quiz_flow(repeat):
+    from quiz_state import ensure_section_id
+
+    flow_samples = []
+    question_samples = []
+    for _ in range(repeat):
+        sections = make_sections(TOPICS_PER_SECTION)
+        for section_data in sections:
+            ensure_section_id(section_data)
+        app_test = new_app_test(sections)
+        app_test.run()
+        assert_clean(app_test)
+
+        flow_started_at = time.perf_counter()
+        find_button(app_test, "start_quiz_btn_").click().run()
+        assert_clean(app_test)
+        wait_for_jobs(app_test)
+        # AppTest can keep a fragment's stale widgets after it redraws smaller, so go by quiz state
+        while app_test.session_state["active_quiz_section"] is not None:
+            radios = [radio for radio in app_test.radio if radio.key and radio.key.startswith("adaptive_quiz_q_radio_")]
+            radios[0].set_value(radios[0].options[2])
+            find_button(app_test, "check_answer_btn_").click().run()
+            assert_clean(app_test)
+            question_started_at = time.perf_counter()
+            find_button(app_test, "next_adaptive_q_btn_").click().run()
+            assert_clean(app_test)
+            wait_for_jobs(app_test)
+            question_samples.append(time.perf_counter() - question_started_at)
+        flow_samples.append(time.perf_counter() - flow_started_at)
+    return {
+        "quiz_flow.full_session": summarize(flow_samples),
+        "quiz_flow.next_question": summarize(question_samples),
+    }
+
+
+def bench_curriculum(repeat):
+    app_test = new_app_test()
+    app_test.run()
+    samples = []
+    for i in range(repeat):
+        # A fresh subject each time so the content cache cannot answer
+        app_test.text_input(key="main_subject_input").set_value(f"Benchmark subject {time.time_ns()} {i}")
+        started_at = time.perf_counter()
+        app_test.button(key="generate_curriculum_btn").click().run()
+        assert_clean(app_test)
+        wait_for_jobs(app_test)
+        samples.append(time.perf_counter() - started_at)
+    results = {"curriculum.generate": summarize(samples)}
+
+    # A large subject where output length, not round trips, dominates
+    from benchmarks import fake_groq
+    saved_config = (fake_groq.config.sections, fake_groq.config.output_chars_per_s)
+    fake_groq.config.sections, fake_groq.config.output_chars_per_s = LARGE_CURRICULUM_SECTIONS, FAKE_OUTPUT_CHARS_PER_S
+    try:
+        samples = []
+        for i in range(repeat):
+            app_test.text_input(key="main_subject_input").set_value(f"Large benchmark subject {time.time_ns()} {i}")
+            started_at = time.perf_counter()
+            app_test.button(key="generate_curriculum_btn").click().run()
+            assert_clean(app_test)
+            wait_for_jobs(app_test)
+            samples.append(time.perf_counter() - started_at)
+            assert len(app_test.session_state["sections"]) == LARGE_CURRICULUM_SECTIONS
+    finally:
+        fake_groq.config.sections, fake_groq.config.output_chars_per_s = saved_config
+    results["curriculum.generate_large"] = summarize(samples)
+    return results
+
+
+def bench_study_map(repeat):
+    samples = []
+    for i in range(repeat):
+        app_test = new_app_test([{"name": "Section 1", "topics": [f"Study map topic {time.time_ns()} {i}"]}])
+        app_test.run()
+        open_first_topic(app_test)
+        started_at = time.perf_counter()
+        find_button(app_test, "study_map_btn_").click().run()
+        assert_clean(app_test)
+        wait_for_jobs(app_test)
+        samples.append(time.perf_counter() - started_at)
+    return {"study_map.generate": summarize(samples)}
+
+
+def bench_reruns(repeat):
+    results = {}
+    for topic_count in RERUN_TOPIC_COUNTS:
+        app_test = new_app_test(make_sections(topic_count))
+        app_test.run()
+        assert_clean(app_test)
+        results[f"rerun.full_script.{topic_count}_topics"] = summarize(time_calls(app_test.run, repeat))
+        results.update(bench_quiz_answer_rerun(topic_count, repeat))
+    return results
+
+
+def bench_quiz_answer_rerun(topic_count, repeat):
+    # Picking an answer reruns only render_quiz_panel in a browser. AppTest always reruns
+    # the whole script, so the fragment's cost is the quiz_panel time the app records for
+    # the panel's body within that run, next to the full run as the baseline.
+    from quiz_state import ensure_section_id
+
+    sections = make_sections(topic_count)
+    for section_data in sections:
+        ensure_section_id(section_data)
+    app_test = new_app_test(sections)
+    app_test.run()
+    find_button(app_test, "start_quiz_btn_").click().run()
+    assert_clean(app_test)
+    wait_for_jobs(app_test)
+    full_samples = []
+    fragment_samples = []
+    for i in range(repeat):
+        radio = next(radio for radio in app_test.radio if radio.key and radio.key.startswith("adaptive_quiz_q_radio_"))
+        radio.set_value(radio.options[i % len(radio.options)])
+        started_at = time.perf_counter()
+        app_test.run()
+        full_samples.append(time.perf_counter() - started_at)
+        assert_clean(app_test)
+        fragment_samples.append(app_test.session_state["rerun_timings"]["quiz_panel"][-1])
+    return {
+        f"rerun.quiz_answer.full_script.{topic_count}_topics": summarize(full_samples),
+        f"rerun.quiz_answer.fragment.{topic_count}_topics": summarize(fragment_samples),
+    }
+
+
+COLD_START_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {repo_root!r})
+from streamlit.testing.v1 import AppTest
+app_test = AppTest.from_file({app_path!r}, default_timeout=600)
+started_at = time.perf_counter()
+app_test.run()
+first_run_s = time.perf_counter() - started_at
+imported = [module_name for module_name in {reported_modules!r} if module_name in sys.modules]
+print(json.dumps({{"first_run_s": first_run_s, "first_paint_s": app_test.session_state["first_paint_s"], "imported": imported}}))
+"""
+
+
+def bench_cold_start(repeat):
+    # A fresh interpreter per sample, without the fake backend (it would import agno up front).
+    # first_run is the whole first script run, first_paint the time to the header.
+    script = COLD_START_SCRIPT.format(repo_root=REPO_ROOT, app_path=APP_PATH, reported_modules=REPORTED_FIRST_RUN_MODULES)
+    first_run_samples = []
+    first_paint_samples = []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True, cwd=REPO_ROOT)
+        sample = json.loads(completed.stdout.strip().splitlines()[-1])
+        deferred_imported = [module_name for module_name in sample["imported"] if module_name in DEFERRED_APP_MODULES]
+        if deferred_imported:
+            raise RuntimeError(f"the first run imported {', '.join(deferred_imported)}")
+        first_run_samples.append(sample["first_run_s"])
+        first_paint_samples.append(sample["first_paint_s"])
+    report_meta["cold_start_first_run_imports"] = sample["imported"]
+    return {
+        "cold_start.first_run": summarize(first_run_samples),
+        "cold_start.first_paint": summarize(first_paint_samples),
+    }
+
+
+def bench_question_selection(repeat):
+    from question_bank import QuestionBank
+
+    results = {}
+    for question_count in (100, 10000):
+        question_bank = QuestionBank()
+        questions = [
+            {"question": f"Question {i}?", "options": ["A) a", "B) b", "C) c", "D) d"], "correct_answer_full": "C) c",
+             "correct_answer_letter": "C", "explanation": "", "topic": "Topic", "tier": None, "source": "bank"}
+            for i in range(question_count)
+        ]
+        for tier_index, tier in enumerate(("easy", "medium", "hard")):
+            question_bank.add("Topic", tier, questions[tier_index::3])
+        seen_ids = frozenset([question_bank.select("Topic", 0.0, band_width=None)["id"]])
+        results[f"question_select.{question_count}_questions"] = summarize(
+            time_calls(lambda: question_bank.select("Topic", 0.3, seen_ids), repeat)
+        )
+    return results
+
+
+def synthetic_subjects(count, seed=7):
+    import random
+    import string
+
+    rng = random.Random(seed)
+    words = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))) for _ in range(max(50, count // 10))]
+    return [" ".join(rng.sample(words, rng.randint(1, 4))).title() for _ in range(count)]
+
+
+def bench_subject_match(repeat):
+    from subject_index import SubjectIndex
+
+    results = {}
+    for subject_count in (1000, 30000):
+        subjects = synthetic_subjects(subject_count)
+        subject_index = SubjectIndex(path=None)
+        results[f"subject_match.build_{subject_count}_subjects"] = summarize(time_calls(lambda: SubjectIndex(path=None).add_many(subjects), 1))
+        subject_index.add_many(subjects)
+        # Misspelled versions of indexed subjects: the noisy voice-transcript case
+        queries = [subject[:-2] + subject[-1] for subject in subjects[:repeat]]
+        query_iter = iter(queries * 2)
+        results[f"subject_match.lookup_{subject_count}_subjects"] = summarize(time_calls(lambda: subject_index.match(next(query_iter)), len(queries)))
+        results[f"subject_match.add_one_{subject_count}_subjects"] = summarize(time_calls(lambda: subject_index.add(f"Brand New Subject {time.time_ns()}"), 5))
+    return results
+
+
+def bench_content_pack(repeat):
+    from benchmarks.fake_groq import fake_quiz_question, fake_study_map
+    from content_pack import ContentPack, build_pack
+    from quiz_parsing import parse_single_quiz_question_markdown
+
+    # A large course: 100 sections x 5 topics, a study map and 10 questions per topic
+    sections = make_sections(500)
+    study_map = fake_study_map("Benchmark topic")
+    question_data = {**parse_single_quiz_question_markdown(fake_quiz_question()), "tier": "medium", "difficulty": 0.0}
+    study_maps = {(section_data["name"], topic_index): study_map for section_data in sections for topic_index in range(len(section_data["topics"]))}
+    questions = {topic_name: [question_data] * 10 for section_data in sections for topic_name in section_data["topics"]}
+
+    data = build_pack("Benchmark course", sections, study_maps, questions)
+    pack_path = os.path.join(tempfile.mkdtemp(prefix="study_assistant_pack_"), "bench.arrow")
+    with open(pack_path, "wb") as pack_file:
+        pack_file.write(data)
+    pack = ContentPack.open(pack_path)
+    results = {
+        "content_pack.build_500_topics": summarize(time_calls(lambda: build_pack("Benchmark course", sections, study_maps, questions), max(1, repeat // 20))),
+        "content_pack.open_500_topics": summarize(time_calls(lambda: ContentPack.open(pack_path), max(1, repeat // 20))),
+        "content_pack.study_map_lookup": summarize(time_calls(lambda: pack.study_map("Section 50", 3), repeat)),
+        "content_pack.topic_questions": summarize(time_calls(lambda: pack.questions("Topic 250"), repeat)),
+    }
+    results["content_pack.open_500_topics"]["pack_bytes"] = len(data)
+    return results
+
+
+def bench_progress_store(repeat):
+    import threading
+
+    from progress_store import ProgressStore
+
+    # What "Check Answer" pays, then many sessions recording at once
+    progress_store = ProgressStore(os.environ["PROGRESS_DB_PATH"])
+    record = lambda learner_id: progress_store.record_answer(learner_id, "Section", "Topic", 0.0, True, latency_s=1.0)
+    results = {"progress_store.record_answer": summarize(time_calls(lambda: record("bench"), repeat))}
+
+    session_count = 32
+
+    def answer_many(learner_id):
+        for _ in range(repeat):
+            record(learner_id)
+
+    started_at = time.perf_counter()
+    threads = [threading.Thread(target=answer_many, args=(f"learner-{i}",)) for i in range(session_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    progress_store.flush(timeout=60)
+    elapsed = time.perf_counter() - started_at
+    results[f"progress_store.{session_count}_sessions_until_durable"] = summarize([elapsed])
+    results[f"progress_store.{session_count}_sessions_until_durable"]["answers_per_s"] = session_count * repeat / elapsed
+    return results
+
+
+def bench_session_memory(repeat):
+    from benchmarks.fake_groq import fake_study_map
+    from session_memory import SessionMemoryRegistry
+
+    # A long session: 2000 study maps through a 256 KiB budget
+    registry = SessionMemoryRegistry(budget_bytes=256 * 1024, spill_dir=os.environ["SESSION_SPILL_DIR"])
+    study_maps = registry.new_session().store("study_maps")
+    contents = [fake_study_map(f"Topic {i}") for i in range(2000)]
+
+    def put_next():
+        study_maps[len(study_maps)] = contents[len(study_maps)]
+
+    results = {"session_memory.put": summarize(time_calls(put_next, len(contents)))}
+    # The oldest entries have been compressed or spilled by now
+    cold_keys = iter(range(repeat))
+    results["session_memory.get_cold"] = summarize(time_calls(lambda: study_maps[next(cold_keys) % len(contents)], repeat))
+    hot_key = len(contents) - 1
+    results["session_memory.get_hot"] = summarize(time_calls(lambda: study_maps[hot_key], repeat))
+    usage = registry.usage()
+    results["session_memory.put"].update({
+        "raw_bytes": sum(len(content.encode("utf-8")) for content in contents),
+        "memory_bytes": usage["memory_bytes"],
+        "spilled_bytes": usage["spilled_bytes"],
+    })
+    return results
+
+
+def bench_hedging(repeat):
+    import random
+    from hedging import Hedger
+
+    def backend(context):
+        # A heavy tail: 1 request in 20 takes 30x the usual ~5 ms; a cancelled one stops early
+        context.cancelled.wait(0.15 if rng.random() < 0.05 else rng.uniform(0.004, 0.006))
+        return "ok"
+
+    results = {}
+    for name, attempt_count in (("hedging.unhedged", 1), ("hedging.hedged", 2)):
+        rng = random.Random(7)
+        hedger = Hedger()
+        results[name] = summarize(time_calls(lambda: hedger.run("bench", [backend] * attempt_count, deadline_s=1.0), repeat))
+        results[name]["extra_request_ratio"] = hedger.stats()["extra_request_ratio"]
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+BENCHMARKS = {
+    "parser": lambda args: bench_parser(args.parser_repeat),
+    "quiz_flow": lambda args: bench_quiz_flow(args.repeat),
+    "curriculum": lambda args: bench_curriculum(args.repeat),
+    "study_map": lambda args: bench_study_map(args.repeat),
+    "rerun": lambda args: bench_reruns(args.repeat),
+    "cold_start": lambda args: bench_cold_start(args.repeat),
+    "question_select": lambda args: bench_question_selection(args.parser_repeat),
+    "progress_store": lambda args: bench_progress_store(args.parser_repeat),
+    "subject_match": lambda args: bench_subject_match(args.parser_repeat),
+    "content_pack": lambda args: bench_content_pack(args.parser_repeat),
+    "session_memory": lambda args: bench_session_memory(args.parser_repeat),
+    "hedging": lambda args: bench_hedging(args.parser_repeat),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Write JSON results here (default: stdout)")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="Run only these benchmarks (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions for app-level benchmarks")
+    parser.add_argument("--parser-repeat", type=int, default=200, help="Repetitions for parser benchmarks")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM latency per call in seconds")
+    parser.add_argument("--output-scale", type=int, default=1, help="Multiplier for fake LLM output size")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, REPO_ROOT)
+    # Isolated caches and effectively unlimited rate limits so runs are comparable
+    work_dir = tempfile.mkdtemp(prefix="study_assistant_bench_")
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ["CONTENT_CACHE_PATH"] = os.path.join(work_dir, "content_cache.sqlite3")
+    os.environ["TTS_CACHE_DIR"] = os.path.join(work_dir, "tts")
+    os.environ["JOB_DB_PATH"] = os.path.join(work_dir, "jobs.sqlite3")
+    os.environ["PROGRESS_DB_PATH"] = os.path.join(work_dir, "progress.sqlite3")
+    os.environ["SESSION_SPILL_DIR"] = os.path.join(work_dir, "session_spill")
+    os.environ["WARMUP_DB_PATH"] = os.path.join(work_dir, "warmup.sqlite3")
+    # Background pre-generation would make timings depend on what earlier benchmarks asked for
+    os.environ["WARMUP_ENABLED"] = "0"
+    os.environ["TTS_BACKEND"] = "stub"
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = "1000000"
+    os.environ["LLM_TOKENS_PER_MINUTE"] = "1000000000"
+
+    from benchmarks import fake_groq
+
+    fake_groq.install(latency_s=args.latency, output_scale=args.output_scale)
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        results.update(BENCHMARKS[name](args))
+
+    report = {
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fake_latency_s": args.latency,
+            "fake_output_scale": args.output_scale,
+            "repeat": args.repeat,
+            "llm_calls": dict(fake_groq.call_counts),
+            **report_meta,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
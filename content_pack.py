@@ -0,0 +1,198 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PACK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "packs")
+PACK_FORMAT_VERSION = "1"
+PACK_SUFFIX = ".arrow"
+
+QUESTION_TYPE = pa.struct([
+    ("question", pa.string()),
+    ("options", pa.list_(pa.string())),
+    ("correct_answer_letter", pa.string()),
+    ("correct_answer_full", pa.string()),
+    ("explanation", pa.string()),
+    ("tier", pa.string()),
+    ("difficulty", pa.float64()),
+])
+
+# One row per topic, in curriculum order; a section without topics gets one row with a null topic
+PACK_SCHEMA = pa.schema([
+    ("section", pa.dictionary(pa.int32(), pa.string())),
+    ("topic", pa.string()),
+    ("study_map", pa.string()),
+    ("questions", pa.list_(QUESTION_TYPE)),
+])
+
+
+def build_pack(subject, sections, study_maps, questions):
+    """Serialize a curriculum into content pack bytes (Arrow IPC file, uncompressed so it can be memory-mapped).
+
+    ``study_maps`` maps (section name, topic index) to markdown and
+    ``questions`` maps a topic name to quiz question dicts.
+    """
+    section_column, topic_column, study_map_column, questions_column = [], [], [], []
+    packed_topics = set()
+    for section_data in sections:
+        topics = section_data['topics'] or [None]
+        for topic_index, topic_name in enumerate(topics):
+            section_column.append(section_data['name'])
+            topic_column.append(topic_name)
+            study_map_column.append(study_maps.get((section_data['name'], topic_index)) if topic_name is not None else None)
+            # Questions belong to the topic name; a topic repeated in another section carries none
+            topic_questions = [] if topic_name is None or topic_name in packed_topics else questions.get(topic_name, [])
+            packed_topics.add(topic_name)
+            questions_column.append([{field.name: question_data.get(field.name) for field in QUESTION_TYPE} for question_data in topic_questions])
+
+    table = pa.table(
+        [
+            pa.array(section_column, pa.string()).dictionary_encode(),
+            pa.array(topic_column, pa.string()),
+            pa.array(study_map_column, pa.string()),
+            pa.array(questions_column, pa.list_(QUESTION_TYPE)),
+        ],
+        schema=PACK_SCHEMA.with_metadata({
+            "format_version": PACK_FORMAT_VERSION,
+            "subject": subject or "",
+            "created_at": str(time.time()),
+        }),
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def pack_id_for(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+class ContentPack:
+    """A read-only content pack backed by a memory-mapped Arrow file.
+
+    The table's buffers point into the mapping, so every session serving
+    the pack shares the page cache's single copy; study maps and questions
+    are only materialized as Python objects when a topic asks for them.
+    """
+
+    def __init__(self, pack_id, table, size_bytes):
+        metadata = {key.decode(): value.decode() for key, value in (table.schema.metadata or {}).items()}
+        if metadata.get("format_version") != PACK_FORMAT_VERSION:
+            raise ValueError(f"unsupported content pack format {metadata.get('format_version')!r}")
+        if table.schema.remove_metadata() != PACK_SCHEMA:
+            raise ValueError("not a content pack: unexpected columns")
+        self.pack_id = pack_id
+        self.subject = metadata.get("subject", "")
+        self.created_at = float(metadata.get("created_at", 0.0))
+        self.size_bytes = size_bytes
+        self.table = table
+        self._study_maps = table.column("study_map")
+        self._questions = table.column("questions")
+
+        # Small per-topic row index; the content itself stays in the mapping
+        self._sections = []
+        self._row_by_topic = {}
+        self._rows_by_topic_name = {}
+        for row, (section_name, topic_name) in enumerate(zip(table.column("section").to_pylist(), table.column("topic").to_pylist())):
+            if not self._sections or self._sections[-1]['name'] != section_name:
+                self._sections.append({"name": section_name, "topics": []})
+            if topic_name is not None:
+                self._row_by_topic[(section_name, len(self._sections[-1]['topics']))] = row
+                self._rows_by_topic_name.setdefault(topic_name, []).append(row)
+                self._sections[-1]['topics'].append(topic_name)
+
+    @classmethod
+    def open(cls, path, pack_id=None):
+        source = pa.memory_map(path, "r")
+        table = pa.ipc.open_file(source).read_all()
+        return cls(pack_id or os.path.basename(path).removesuffix(PACK_SUFFIX), table, os.path.getsize(path))
+
+    @classmethod
+    def from_bytes(cls, data):
+        try:
+            table = pa.ipc.open_file(pa.BufferReader(data)).read_all()
+        except pa.ArrowException as e:
+            raise ValueError(f"not a content pack: {e}") from e
+        return cls(pack_id_for(data), table, len(data))
+
+    def sections(self):
+        # Fresh copies: callers attach ids and may add topics to their own curriculum
+        return [{"name": section_data['name'], "topics": list(section_data['topics'])} for section_data in self._sections]
+
+    def study_map(self, section_name, topic_index):
+        row = self._row_by_topic.get((section_name, topic_index))
+        return self._study_maps[row].as_py() if row is not None else None
+
+    def questions(self, topic_name):
+        return [question_data for row in self._rows_by_topic_name.get(topic_name, []) for question_data in self._questions[row].as_py()]
+
+    def topic_names(self):
+        return list(self._rows_by_topic_name)
+
+    def stats(self):
+        return {
+            "topics": len(self._row_by_topic),
+            "study_maps": len(self._study_maps) - self._study_maps.null_count,
+            "questions": pc.sum(pc.list_value_length(self._questions)).as_py() or 0,
+            "bytes": self.size_bytes,
+        }
+
+
+class ContentPackLibrary:
+    """Content packs stored in one directory, opened once per process and shared.
+
+    A file that cannot be opened (truncated, corrupt or of another format
+    version) is logged once and left out, so it never breaks the others.
+    """
+
+    def __init__(self, directory=DEFAULT_PACK_DIR):
+        self.directory = directory
+        self._packs = {}
+        # pack id -> why its file could not be opened
+        self._unreadable = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def import_pack(self, data):
+        # Validates before anything is written; the id is the content hash, so re-imports are no-ops
+        pack = ContentPack.from_bytes(data)
+        path = os.path.join(self.directory, pack.pack_id + PACK_SUFFIX)
+        # Written when missing, or over a damaged copy under the same id
+        if self.get(pack.pack_id) is None:
+            with self._lock:
+                self._unreadable.pop(pack.pack_id, None)
+            temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(temp_path, "wb") as pack_file:
+                pack_file.write(data)
+            os.replace(temp_path, path)
+        return self.get(pack.pack_id)
+
+    def get(self, pack_id):
+        with self._lock:
+            pack = self._packs.get(pack_id)
+            if pack is None:
+                path = os.path.join(self.directory, pack_id + PACK_SUFFIX)
+                if os.path.dirname(os.path.abspath(path)) != os.path.abspath(self.directory) or not os.path.exists(path):
+                    return None
+                if pack_id in self._unreadable:
+                    return None
+                try:
+                    pack = self._packs[pack_id] = ContentPack.open(path, pack_id)
+                except (OSError, ValueError, pa.ArrowException) as e:
+                    logger.warning("Skipping content pack %s: %s", path, e)
+                    self._unreadable[pack_id] = str(e)
+                    return None
+            return pack
+
+    def available(self):
+        # Only packs that open, so a listing never offers a broken one
+        pack_ids = sorted(name.removesuffix(PACK_SUFFIX) for name in os.listdir(self.directory) if name.endswith(PACK_SUFFIX))
+        return [pack_id for pack_id in pack_ids if self.get(pack_id) is not None]
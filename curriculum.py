@@ -0,0 +1,132 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from quiz_parsing import extract_json_object
+
+MAX_SECTIONS = 40
+MAX_TOPICS_PER_SECTION = 12
+
+OUTLINE_SCHEMA_INSTRUCTION = """
+The output MUST be a JSON object ONLY, with the following structure. Do NOT include any other text or markdown.
+{
+  "sections": ["First Section Name", "Second Section Name"]
+}
+"""
+
+SECTION_TOPICS_SCHEMA_INSTRUCTION = """
+The output MUST be a JSON object ONLY, with the following structure. Do NOT include any other text or markdown.
+{
+  "topics": ["Topic 1", "Topic 2"]
+}
+"""
+
+
+def is_valid_section(section):
+    return (
+        isinstance(section, dict)
+        and isinstance(section.get("name"), str)
+        and bool(section["name"].strip())
+        and isinstance(section.get("topics"), list)
+    )
+
+
+def _unique_names(values, limit):
+    # Non-empty strings, first occurrence kept, compared case-insensitively
+    names = []
+    seen = set()
+    for value in values:
+        if not isinstance(value, str) or not value.strip() or value.strip().casefold() in seen:
+            continue
+        seen.add(value.strip().casefold())
+        names.append(value.strip())
+    return names[:limit]
+
+
+def _load_list(text, field):
+    payload = json.loads(extract_json_object(text))
+    values = payload.get(field) if isinstance(payload, dict) else None
+    if not isinstance(values, list):
+        raise ValueError(f"response has no '{field}' list")
+    return values
+
+
+def parse_outline(text):
+    """Section names of an outline response; raises ValueError when there are none."""
+    # Older prompts and some models give whole section objects; their names are enough
+    values = [value.get("name") if isinstance(value, dict) else value for value in _load_list(text, "sections")]
+    section_names = _unique_names(values, MAX_SECTIONS)
+    if not section_names:
+        raise ValueError("the outline has no section names")
+    return section_names
+
+
+def parse_section_topics(text):
+    """Topic names of a section response; raises ValueError when there are none."""
+    topics = _unique_names(_load_list(text, "topics"), MAX_TOPICS_PER_SECTION)
+    if not topics:
+        raise ValueError("the section has no topics")
+    return topics
+
+
+def validator(parse):
+    # ``parse`` as a yes/no check on a raw response
+    def validate(text):
+        try:
+            parse(text)
+        except ValueError:
+            return False
+        return True
+    return validate
+
+
+def build_outline_prompt(subject):
+    return f"List the sections of a curriculum for the subject: '{subject}'"
+
+
+def build_section_prompt(subject, section_name, section_names):
+    others = "; ".join(name for name in section_names if name != section_name)
+    return (
+        f"Write the topics for the section '{section_name}' of a curriculum on '{subject}'. "
+        f"The other sections, covered separately, are: {others}."
+    )
+
+
+def generate_validated(run_prompt, prompt, parse, max_attempts=3):
+    # run_prompt(prompt) -> response text; a rejected response is retried with the reason attached
+    last_error = None
+    for _ in range(max_attempts):
+        attempt_prompt = prompt
+        if last_error is not None:
+            attempt_prompt += f" Your previous answer was rejected ({last_error}). Reply with the JSON object only."
+        try:
+            return parse(run_prompt(attempt_prompt) or "")
+        except ValueError as e:
+            # json.JSONDecodeError is a ValueError too
+            last_error = str(e).splitlines()[0]
+    raise ValueError(last_error)
+
+
+def expand_sections(run_prompt, subject, section_names, on_section=None, workers=8, max_attempts=3):
+    """Topics for every outlined section, generated concurrently.
+
+    Each section is validated and retried on its own, so a bad one costs only
+    that section. ``on_section(index, section)`` is called on this thread as
+    each section completes, with ``section`` None for one that failed.
+    Returns (sections in outline order, {section name: error}).
+    """
+    results = [None] * len(section_names)
+    failures = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(section_names))), thread_name_prefix="curriculum_section") as executor:
+        futures = {
+            executor.submit(generate_validated, run_prompt, build_section_prompt(subject, section_name, section_names), parse_section_topics, max_attempts): index
+            for index, section_name in enumerate(section_names)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = {"name": section_names[index], "topics": future.result()}
+            except Exception as e:
+                failures[section_names[index]] = str(e)
+            if on_section is not None:
+                on_section(index, results[index])
+    return [section for section in results if section is not None], failures
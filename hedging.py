@@ -0,0 +1,301 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from telemetry import percentile
+
+DEFAULT_HEDGE_PERCENTILE = 0.9
+DEFAULT_MAX_HEDGE_RATIO = 0.1
+# Hedges allowed on top of the ratio, so the first slow calls after a start can still be hedged
+HEDGE_BURST = 2
+MIN_LATENCY_SAMPLES = 10
+LATENCY_WINDOW = 200
+# Until enough latencies are known, the hedge goes out halfway to the deadline
+UNLEARNED_HEDGE_FRACTION = 0.5
+MAX_HEDGE_FRACTION = 0.9
+
+
+class DeadlineExceeded(TimeoutError):
+    """No attempt produced a result within the call's deadline."""
+
+
+class AttemptContext:
+    """Handed to every attempt: its index (0 is the primary) and its cancellation flag.
+
+    Attempts that cannot be interrupted simply run on and have their result
+    discarded; streaming attempts should check ``cancelled`` between chunks.
+    """
+
+    def __init__(self, index, call):
+        self.index = index
+        self.cancelled = threading.Event()
+        self._call = call
+        self._cancel_callbacks = []
+
+    def claim(self):
+        """Claim the call for this attempt (e.g. on its first streamed token).
+
+        The other attempts are cancelled and no hedge is sent any more; returns
+        False when another attempt claimed or won first.
+        """
+        return self._call.claim(self)
+
+    def on_cancel(self, callback):
+        with self._call.condition:
+            if not self.cancelled.is_set():
+                self._cancel_callbacks.append(callback)
+                return
+        callback()
+
+    def _cancel(self):
+        # Called with the call's condition held
+        if self.cancelled.is_set():
+            return
+        self.cancelled.set()
+        for callback in self._cancel_callbacks:
+            callback()
+
+
+class _Attempt:
+    __slots__ = ("context", "started_at", "finished", "result", "error", "latency_s")
+
+    def __init__(self, context):
+        self.context = context
+        self.started_at = time.monotonic()
+        self.finished = False
+        self.result = None
+        self.error = None
+        self.latency_s = None
+
+
+class _Call:
+    def __init__(self, validate):
+        self.validate = validate
+        self.condition = threading.Condition()
+        self.attempts = []
+        self.claimed = None
+        self.winner = None
+
+    def claim(self, context):
+        with self.condition:
+            if self.winner is not None or (self.claimed is not None and self.claimed is not context):
+                return False
+            if self.claimed is None:
+                self.claimed = context
+                attempt = self.attempts[context.index]
+                attempt.latency_s = time.monotonic() - attempt.started_at
+                for other in self.attempts:
+                    if other.context is not context:
+                        other.context._cancel()
+                self.condition.notify_all()
+            return True
+
+    def finish(self, context, result=None, error=None):
+        with self.condition:
+            attempt = self.attempts[context.index]
+            attempt.finished = True
+            attempt.result = result
+            attempt.error = error
+            if attempt.latency_s is None:
+                attempt.latency_s = time.monotonic() - attempt.started_at
+            if self.winner is None and not context.cancelled.is_set() and error is None and (self.validate is None or self.validate(result)):
+                self.winner = attempt
+            self.condition.notify_all()
+
+    def cancel_all(self):
+        with self.condition:
+            for attempt in self.attempts:
+                if attempt is not self.winner and not attempt.finished:
+                    attempt.context._cancel()
+
+
+class _NameStats:
+    __slots__ = ("latencies", "calls", "hedges", "hedge_wins", "hedges_skipped", "deadlines_exceeded")
+
+    def __init__(self):
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+        self.deadlines_exceeded = 0
+
+
+class Hedger:
+    """Runs a call's attempts against a deadline, hedging slow primaries.
+
+    The primary attempt starts at once. If it has neither finished nor
+    claimed the call by the ``percentile`` of that name's recent primary
+    latencies, the next attempt (typically the same request on an alternate
+    model) is started as a hedge; an invalid primary result sends it at once.
+    The first valid result wins and the other attempts are cancelled. Hedges
+    are capped at ``max_hedge_ratio`` of all calls (plus a small burst), so
+    the extra request volume stays bounded.
+    """
+
+    def __init__(self, hedge_percentile=DEFAULT_HEDGE_PERCENTILE, max_hedge_ratio=DEFAULT_MAX_HEDGE_RATIO, max_workers=32):
+        self.hedge_percentile = hedge_percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self._stats = {}
+        self._alternates = {}
+        self._calls = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm_hedge")
+
+    def alternate(self, key, factory):
+        """The alternate built by ``factory`` for ``key``, built once per process."""
+        with self._lock:
+            if key not in self._alternates:
+                self._alternates[key] = factory()
+            return self._alternates[key]
+
+    def hedge_delay(self, name, deadline_s=None):
+        with self._lock:
+            latencies = sorted(self._stats_for(name).latencies)
+        if len(latencies) >= MIN_LATENCY_SAMPLES:
+            delay = percentile(latencies, self.hedge_percentile)
+        elif deadline_s:
+            delay = deadline_s * UNLEARNED_HEDGE_FRACTION
+        else:
+            return None
+        return min(delay, deadline_s * MAX_HEDGE_FRACTION) if deadline_s else delay
+
+    def run(self, name, attempts, deadline_s=None, validate=None, can_hedge=None):
+        """Result of the first valid attempt.
+
+        ``attempts`` are callables taking an AttemptContext. Raises
+        DeadlineExceeded if nothing valid finished (or claimed the call) within
+        ``deadline_s``; a claimed attempt is waited for without a deadline.
+        When every attempt fails, the last error is raised, or the last
+        invalid result returned.
+        """
+        call = _Call(validate)
+        started_at = time.monotonic()
+        deadline_at = started_at + deadline_s if deadline_s else None
+        hedge_delay = self.hedge_delay(name, deadline_s) if len(attempts) > 1 else None
+        hedge_at = started_at + hedge_delay if hedge_delay is not None else None
+        with self._lock:
+            stats = self._stats_for(name)
+            stats.calls += 1
+            self._calls += 1
+
+        try:
+            with call.condition:
+                self._launch(call, attempts[0])
+                while True:
+                    if call.winner is not None:
+                        break
+                    if call.claimed is not None:
+                        claimed = call.attempts[call.claimed.index]
+                        if claimed.finished:
+                            break
+                        call.condition.wait()
+                        continue
+                    running = [attempt for attempt in call.attempts if not attempt.finished]
+                    now = time.monotonic()
+                    if len(call.attempts) < len(attempts) and hedge_at is not None and (now >= hedge_at or not running):
+                        if self._allow_hedge(stats, can_hedge):
+                            self._launch(call, attempts[len(call.attempts)])
+                            continue
+                        hedge_at = None
+                    if not running:
+                        break
+                    if deadline_at is not None and now >= deadline_at:
+                        with self._lock:
+                            stats.deadlines_exceeded += 1
+                        raise DeadlineExceeded(f"{name} gave no result within {deadline_s:g}s")
+                    wake_at = min((t for t in (deadline_at, hedge_at) if t is not None), default=None)
+                    call.condition.wait(None if wake_at is None else max(0.0, wake_at - now))
+        finally:
+            call.cancel_all()
+            self._record(stats, call, started_at)
+
+        outcome = call.winner
+        if outcome is None and call.claimed is not None:
+            outcome = call.attempts[call.claimed.index]
+        if outcome is None:
+            finished = [attempt for attempt in call.attempts if attempt.error is None]
+            if finished:
+                return finished[-1].result
+            raise call.attempts[-1].error
+        if outcome.error is not None:
+            raise outcome.error
+        return outcome.result
+
+    def _launch(self, call, fn):
+        # Called with the call's condition held
+        context = AttemptContext(len(call.attempts), call)
+        call.attempts.append(_Attempt(context))
+        self._executor.submit(self._run_attempt, call, context, fn)
+
+    def _run_attempt(self, call, context, fn):
+        try:
+            result = fn(context)
+        except BaseException as e:
+            call.finish(context, error=e)
+        else:
+            call.finish(context, result=result)
+
+    def _allow_hedge(self, stats, can_hedge):
+        if can_hedge is not None and not can_hedge():
+            allowed = False
+        else:
+            with self._lock:
+                allowed = self._hedges < self.max_hedge_ratio * self._calls + HEDGE_BURST
+                if allowed:
+                    self._hedges += 1
+                    stats.hedges += 1
+        if not allowed:
+            with self._lock:
+                stats.hedges_skipped += 1
+        return allowed
+
+    def _record(self, stats, call, started_at):
+        with call.condition:
+            primary = call.attempts[0]
+            # A primary that was still running counts with its elapsed time, a lower bound,
+            # so hedging never hides the slow tail from the percentile
+            latency_s = primary.latency_s if primary.latency_s is not None else time.monotonic() - started_at
+            outcome = call.winner or (call.attempts[call.claimed.index] if call.claimed is not None else None)
+            hedge_won = outcome is not None and outcome is not primary
+        with self._lock:
+            stats.latencies.append(latency_s)
+            if hedge_won:
+                stats.hedge_wins += 1
+
+    def _stats_for(self, name):
+        # Called with self._lock held
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = _NameStats()
+        return stats
+
+    def stats(self):
+        with self._lock:
+            by_name = {
+                name: {
+                    "calls": stats.calls,
+                    "hedges": stats.hedges,
+                    "hedge_wins": stats.hedge_wins,
+                    "hedges_skipped": stats.hedges_skipped,
+                    "deadlines_exceeded": stats.deadlines_exceeded,
+                    "latency_p50_s": percentile(sorted(stats.latencies), 0.5),
+                }
+                for name, stats in self._stats.items()
+            }
+            return {
+                "calls": self._calls,
+                "hedges": self._hedges,
+                "extra_request_ratio": self._hedges / self._calls if self._calls else 0.0,
+                "by_name": by_name,
+            }
+
+    def gauges(self):
+        stats = self.stats()
+        gauges = [("llm_hedge_extra_request_ratio", {}, stats["extra_request_ratio"])]
+        for name, name_stats in stats["by_name"].items():
+            for outcome in ("calls", "hedges", "hedge_wins", "hedges_skipped", "deadlines_exceeded"):
+                gauges.append(("llm_hedged_calls", {"agent": name, "outcome": outcome}, name_stats[outcome]))
+        return gauges
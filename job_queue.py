@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_JOB_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "jobs.sqlite3")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+FINISHED_JOB_STATUSES = (JOB_DONE, JOB_FAILED)
+PURGE_EVERY_SUBMITS = 200
+
+
+class JobQueue:
+    """Generation jobs recorded in SQLite and run by a local thread pool.
+
+    A handler registered for a job kind is called as ``handler(payload, report_progress)``
+    on a worker thread and returns a JSON-serializable result. Payloads,
+    progress and results live in the database, so a job can be looked up by
+    id from any session (e.g. after a browser refresh) while it runs and
+    after it has finished.
+    """
+
+    def __init__(self, path=DEFAULT_JOB_DB_PATH, workers=4, retention_seconds=24 * 3600, progress_interval=0.25):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self.progress_interval = progress_interval
+        self._handlers = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jobs")
+        self._progress_written_at = {}
+        self._submitted = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " target TEXT,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " progress TEXT,"
+            " result TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+        self._conn.commit()
+
+    def register(self, kind, handler):
+        self._handlers[kind] = handler
+
+    def submit(self, kind, payload, target=None):
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, target, payload, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, target, json.dumps(payload), JOB_QUEUED, time.time()),
+            )
+            self._conn.commit()
+            self._submitted += 1
+            if self._submitted % PURGE_EVERY_SUBMITS == 0:
+                self._purge()
+        self._executor.submit(self._run, job_id, kind, payload)
+        return job_id
+
+    def resume_pending(self):
+        # Jobs a previous process accepted but never finished are run again here.
+        # Assumes one server process per database file.
+        with self._lock:
+            self._purge()
+            rows = self._conn.execute("SELECT id, kind, payload FROM jobs WHERE status IN (?, ?)", (JOB_QUEUED, JOB_RUNNING)).fetchall()
+        for job_id, kind, payload in rows:
+            if kind in self._handlers:
+                self._executor.submit(self._run, job_id, kind, json.loads(payload))
+            else:
+                self._finish(job_id, JOB_FAILED, error=f"No handler registered for job kind '{kind}'")
+        return len(rows)
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, target, status, progress, result, error, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, kind, target, status, progress, result, error, created_at, started_at, finished_at = row
+        return {
+            "id": job_id,
+            "kind": kind,
+            "target": target,
+            "status": status,
+            "progress": json.loads(progress) if progress is not None else None,
+            "result": json.loads(result) if result is not None else None,
+            "error": error,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+        }
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in (JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED)}
+
+    def _run(self, job_id, kind, payload):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?", (JOB_RUNNING, time.time(), job_id))
+            self._conn.commit()
+        try:
+            result = self._handlers[kind](payload, lambda progress: self._report_progress(job_id, progress))
+        except Exception as e:
+            self._finish(job_id, JOB_FAILED, error=str(e) or type(e).__name__)
+        else:
+            self._finish(job_id, JOB_DONE, result=result)
+
+    def _report_progress(self, job_id, progress):
+        # Throttled: streamed generations report on every chunk
+        now = time.monotonic()
+        with self._lock:
+            if now - self._progress_written_at.get(job_id, 0.0) < self.progress_interval:
+                return
+            self._progress_written_at[job_id] = now
+            self._conn.execute("UPDATE jobs SET progress = ? WHERE id = ?", (json.dumps(progress), job_id))
+            self._conn.commit()
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self._lock:
+            self._progress_written_at.pop(job_id, None)
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def _purge(self):
+        # Called with the lock held
+        if self.retention_seconds:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (*FINISHED_JOB_STATUSES, time.time() - self.retention_seconds),
+            )
+            self._conn.commit()
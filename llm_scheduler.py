@@ -0,0 +1,284 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_PREFETCH = 1
+PRIORITY_BULK = 2
+# Speculative pre-generation, only sent while nothing else is waiting
+PRIORITY_WARMUP = 3
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_PREFETCH: "prefetch", PRIORITY_BULK: "bulk", PRIORITY_WARMUP: "warmup"}
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def is_retryable_error(error):
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if status_code is not None:
+        try:
+            return int(status_code) in RETRYABLE_STATUS_CODES
+        except (TypeError, ValueError):
+            return False
+    return isinstance(error, (TimeoutError, ConnectionError)) or "Timeout" in type(error).__name__ or "Connection" in type(error).__name__
+
+
+def estimate_tokens(*texts, completion_tokens=0):
+    # Rough 4-characters-per-token estimate, good enough for budgeting
+    return sum(len(text) for text in texts if text) // 4 + completion_tokens
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay_for(self, amount, now):
+        # Seconds until `amount` is available; amounts above capacity are clamped so they can still run
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def available(self, now):
+        # Share of the capacity available right now
+        self._refill(now)
+        return max(0.0, self.tokens / self.capacity) if self.capacity else 0.0
+
+
+class _Job:
+    __slots__ = ("key", "fn", "priority", "tokens", "future", "submitted_at", "attempts", "not_before", "gate")
+
+    def __init__(self, key, fn, priority, tokens, gate=None):
+        self.key = key
+        self.fn = fn
+        self.priority = priority
+        self.tokens = tokens
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+        self.attempts = 0
+        self.not_before = 0.0
+        self.gate = gate
+
+
+class LLMScheduler:
+    """Process-wide gate in front of every LLM call.
+
+    Requests are queued by priority, released under requests/min and
+    tokens/min budgets, retried with jittered exponential backoff on
+    rate-limit and server errors, and identical in-flight requests (same
+    ``key``) share a single call. Cancelling a queued request's future
+    withdraws it.
+    """
+
+    def __init__(self, requests_per_minute=30, tokens_per_minute=30000, max_concurrency=8, max_retries=4, base_backoff=1.0, max_backoff=30.0):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._queue = []
+        self._delayed = []
+        self._inflight = {}
+        self._sequence = itertools.count()
+        self._active = 0
+        self._active_by_priority = {}
+        # When work of each priority was last queued, running or finished, see idle_seconds
+        self._started_at = time.monotonic()
+        self._busy_at = {}
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm_scheduler")
+
+        self._wait_times = deque(maxlen=1000)
+        self._counters = {"submitted": 0, "coalesced": 0, "completed": 0, "failed": 0, "retries": 0, "cancelled": 0}
+
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="llm_scheduler_dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, fn, priority=PRIORITY_INTERACTIVE, key=None, estimated_tokens=0):
+        with self._condition:
+            if key is not None and key in self._inflight:
+                self._counters["coalesced"] += 1
+                return self._inflight[key].future
+            job = _Job(key, fn, priority, estimated_tokens)
+            if key is not None:
+                self._inflight[key] = job
+            self._counters["submitted"] += 1
+            self._push(job)
+        return job.future
+
+    def run(self, fn, priority=PRIORITY_INTERACTIVE, key=None, estimated_tokens=0):
+        return self.submit(fn, priority, key, estimated_tokens).result()
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_INTERACTIVE, estimated_tokens=0):
+        """Hold one rate-limited concurrency slot, for calls that must run on the caller's thread (streaming)."""
+        gate = threading.Event()
+        job = _Job(None, None, priority, estimated_tokens, gate=gate)
+        with self._condition:
+            self._counters["submitted"] += 1
+            self._push(job)
+        gate.wait()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self._release_slot(job, failed)
+
+    def _push(self, job):
+        heapq.heappush(self._queue, (job.priority, next(self._sequence), job))
+        self._busy_at[job.priority] = time.monotonic()
+        self._condition.notify_all()
+
+    def _set_active(self, job, delta):
+        # Called with the condition held
+        self._active += delta
+        self._active_by_priority[job.priority] = self._active_by_priority.get(job.priority, 0) + delta
+        self._busy_at[job.priority] = time.monotonic()
+
+    def _dispatch_loop(self):
+        while True:
+            with self._condition:
+                job = self._next_ready_job()
+                if job is None:
+                    continue
+                # A request cancelled by its caller since the check above is dropped too; once running it can no longer be
+                if job.gate is None and job.attempts == 0 and not job.future.set_running_or_notify_cancel():
+                    self._drop_cancelled(job)
+                    continue
+                self._set_active(job, 1)
+            self._wait_times.append(time.monotonic() - job.submitted_at)
+            if job.gate is not None:
+                job.gate.set()
+            else:
+                self._executor.submit(self._execute, job)
+
+    def _next_ready_job(self):
+        # Called with the condition held; waits at most until something may have changed
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, job = heapq.heappop(self._delayed)
+            heapq.heappush(self._queue, (job.priority, next(self._sequence), job))
+
+        timeout = None
+        if self._delayed:
+            timeout = self._delayed[0][0] - now
+        if not self._queue or self._active >= self.max_concurrency:
+            self._condition.wait(timeout)
+            return None
+
+        job = self._queue[0][2]
+        if job.future.cancelled():
+            # Withdrawn while queued: dropped before it spends any budget
+            heapq.heappop(self._queue)
+            self._drop_cancelled(job)
+            return None
+        delay = max(self.request_bucket.delay_for(1, now), self.token_bucket.delay_for(job.tokens, now))
+        if delay > 0:
+            # Re-evaluated after the wait, so a higher-priority arrival still goes first
+            self._condition.wait(delay if timeout is None else min(delay, timeout))
+            return None
+
+        heapq.heappop(self._queue)
+        self.request_bucket.consume(1)
+        self.token_bucket.consume(job.tokens)
+        return job
+
+    def _drop_cancelled(self, job):
+        # Called with the condition held
+        if job.key is not None and self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+        self._counters["cancelled"] += 1
+
+    def _execute(self, job):
+        try:
+            result = job.fn()
+        except Exception as e:
+            if job.attempts < self.max_retries and is_retryable_error(e):
+                job.attempts += 1
+                backoff = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** job.attempts))
+                with self._condition:
+                    self._counters["retries"] += 1
+                    job.not_before = time.monotonic() + backoff
+                    heapq.heappush(self._delayed, (job.not_before, next(self._sequence), job))
+                    self._set_active(job, -1)
+                    self._condition.notify_all()
+                return
+            self._finish(job, error=e)
+        else:
+            self._finish(job, result=result)
+
+    def _finish(self, job, result=None, error=None):
+        with self._condition:
+            if job.key is not None and self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            self._counters["failed" if error is not None else "completed"] += 1
+            self._set_active(job, -1)
+            self._condition.notify_all()
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+
+    def _release_slot(self, job, failed):
+        with self._condition:
+            self._counters["failed" if failed else "completed"] += 1
+            self._set_active(job, -1)
+            self._condition.notify_all()
+
+    def idle_seconds(self, priority=PRIORITY_WARMUP):
+        """Seconds since the last request more urgent than ``priority`` was queued, running or finished.
+
+        0 while any such request is waiting (including a retry backoff) or running.
+        """
+        with self._condition:
+            urgent_jobs = itertools.chain((job for _, _, job in self._queue), (job for _, _, job in self._delayed))
+            if any(job.priority < priority for job in urgent_jobs) or any(count for job_priority, count in self._active_by_priority.items() if job_priority < priority):
+                return 0.0
+            busy_at = max((at for job_priority, at in self._busy_at.items() if job_priority < priority), default=self._started_at)
+        return time.monotonic() - busy_at
+
+    def metrics(self):
+        with self._condition:
+            now = time.monotonic()
+            queued_by_priority = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _, _ in self._queue:
+                name = PRIORITY_NAMES.get(priority, str(priority))
+                queued_by_priority[name] = queued_by_priority.get(name, 0) + 1
+            metrics = {
+                "queue_depth": len(self._queue),
+                "retry_backlog": len(self._delayed),
+                "active": self._active,
+                "active_by_priority": {PRIORITY_NAMES.get(priority, str(priority)): count for priority, count in self._active_by_priority.items()},
+                # Share of the requests/min and tokens/min budgets left right now
+                "request_budget_available": self.request_bucket.available(now),
+                "token_budget_available": self.token_bucket.available(now),
+                "queued_by_priority": queued_by_priority,
+                **self._counters,
+            }
+        wait_times = sorted(self._wait_times)
+        if wait_times:
+            metrics["wait_avg_s"] = sum(wait_times) / len(wait_times)
+            metrics["wait_p95_s"] = wait_times[min(len(wait_times) - 1, int(len(wait_times) * 0.95))]
+        else:
+            metrics["wait_avg_s"] = metrics["wait_p95_s"] = 0.0
+        return metrics
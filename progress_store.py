@@ -0,0 +1,257 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_PROGRESS_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "progress.sqlite3")
+
+OVERALL_SCOPE = "overall"
+MAX_BATCH_ANSWERS = 500
+# Learners whose rollups stay in memory; the rest are reloaded from SQLite when they come back
+DEFAULT_MAX_LEARNERS = 1000
+# Pause before retrying a batch that failed to commit, doubled per failure in a row up to the max
+RETRY_BACKOFF_S = 0.5
+MAX_RETRY_BACKOFF_S = 30.0
+
+
+def section_scope(section_name):
+    return f"section:{section_name}"
+
+
+def topic_scope(topic):
+    return f"topic:{topic}"
+
+
+def _add_answer(rollups, section, topic, correct, latency_s):
+    # Counts one answer into {scope: [attempted, correct, latency_total_s]}
+    for scope in (OVERALL_SCOPE, section_scope(section), topic_scope(topic)):
+        rollup = rollups.setdefault(scope, [0, 0, 0.0])
+        rollup[0] += 1
+        rollup[1] += correct
+        rollup[2] += latency_s or 0.0
+
+
+class ProgressStore:
+    """Every answered quiz question, per learner, in SQLite with running rollups.
+
+    ``record_answer`` only enqueues the answer; one writer thread drains the
+    queue in batches, inserting the answers and upserting the matching
+    rollup rows in a single transaction. Sessions therefore never wait on a
+    database lock, and grades are read from the rollups instead of
+    rescanning answers. The in-memory rollups count committed answers only;
+    queued ones are kept as separate deltas that ``rollup`` adds in, so a
+    grade includes them at once. A batch that fails to commit is kept and
+    retried with backoff. Rollups are loaded when a learner is first seen
+    and kept for the ``max_learners`` most recently active ones; a learner
+    with answers still queued is never dropped, so a reload from SQLite
+    always sees everything.
+    """
+
+    def __init__(self, path=DEFAULT_PROGRESS_DB_PATH, flush_interval=0.5, max_learners=DEFAULT_MAX_LEARNERS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_learners = max_learners
+        self.answers_written = 0
+        self.batches_written = 0
+        self.write_errors = 0
+        self._queue = queue.SimpleQueue()
+        # learner_id -> {scope: [attempted, correct, latency_total_s]} of committed answers, least recently used first
+        self._learners = OrderedDict()
+        # learner_id -> the same for answers queued but not yet committed
+        self._unwritten = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY,"
+            " learner_id TEXT NOT NULL,"
+            " section TEXT NOT NULL,"
+            " topic TEXT NOT NULL,"
+            " question_id TEXT,"
+            " difficulty REAL NOT NULL,"
+            " correct INTEGER NOT NULL,"
+            " latency_s REAL,"
+            " answered_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_learner ON answers (learner_id, answered_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rollups ("
+            " learner_id TEXT NOT NULL,"
+            " scope TEXT NOT NULL,"
+            " attempted INTEGER NOT NULL,"
+            " correct INTEGER NOT NULL,"
+            " latency_total_s REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (learner_id, scope))"
+        )
+        self._conn.commit()
+
+        self._writer = threading.Thread(target=self._write_forever, name="progress_writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def record_answer(self, learner_id, section, topic, difficulty, correct, latency_s=None, question_id=None):
+        while True:
+            rollups = self._learner_rollups(learner_id)
+            with self._lock:
+                if self._learners.get(learner_id) is not rollups:
+                    # Dropped from memory since it was loaded; load it again
+                    continue
+                _add_answer(self._unwritten.setdefault(learner_id, {}), section, topic, int(correct), latency_s)
+                break
+        self._queue.put((learner_id, section, topic, question_id, float(difficulty), int(correct), latency_s, time.time()))
+
+    def rollup(self, learner_id, scope=OVERALL_SCOPE):
+        rollups = self._learner_rollups(learner_id)
+        with self._lock:
+            attempted, correct, latency_total_s = rollups.get(scope, (0, 0, 0.0))
+            queued = self._unwritten.get(learner_id, {}).get(scope)
+            if queued is not None:
+                attempted, correct, latency_total_s = attempted + queued[0], correct + queued[1], latency_total_s + queued[2]
+        return {
+            "attempted": attempted,
+            "correct": correct,
+            "accuracy": correct / attempted if attempted else None,
+            "mean_latency_s": latency_total_s / attempted if attempted else None,
+        }
+
+    def recent_answers(self, learner_id, limit=20):
+        # Only what the writer has committed so far
+        rows = self._read(
+            "SELECT section, topic, question_id, difficulty, correct, latency_s, answered_at FROM answers"
+            " WHERE learner_id = ? ORDER BY answered_at DESC LIMIT ?",
+            (learner_id, limit),
+        )
+        return [
+            {"section": section, "topic": topic, "question_id": question_id, "difficulty": difficulty,
+             "correct": bool(correct), "latency_s": latency_s, "answered_at": answered_at}
+            for section, topic, question_id, difficulty, correct, latency_s, answered_at in rows
+        ]
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def learners_in_memory(self):
+        with self._lock:
+            return len(self._learners)
+
+    def flush(self, timeout=5.0):
+        # Blocks until every answer recorded so far is committed (or the timeout passes)
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _learner_rollups(self, learner_id):
+        # The learner's rollups by scope, loaded from SQLite if they are not in memory
+        with self._lock:
+            rollups = self._learners.get(learner_id)
+            if rollups is not None:
+                self._learners.move_to_end(learner_id)
+                return rollups
+        rows = self._read("SELECT scope, attempted, correct, latency_total_s FROM rollups WHERE learner_id = ?", (learner_id,))
+        with self._lock:
+            rollups = self._learners.get(learner_id)
+            if rollups is None:
+                rollups = self._learners[learner_id] = {scope: [attempted, correct, latency_total_s] for scope, attempted, correct, latency_total_s in rows}
+                self._evict()
+            return rollups
+
+    def _evict(self):
+        # Called with the lock held
+        while len(self._learners) > self.max_learners:
+            learner_id = next((learner_id for learner_id in self._learners if learner_id not in self._unwritten), None)
+            if learner_id is None:
+                # Everyone has answers in flight; the writer catches up shortly
+                return
+            del self._learners[learner_id]
+
+    def _read(self, sql, params):
+        # Readers get their own short-lived connection; WAL lets them run beside the writer
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def _write_forever(self):
+        batch = []
+        failures = 0
+        while True:
+            if not batch:
+                batch.append(self._queue.get())
+            self._drain_into(batch)
+            if len(batch) < MAX_BATCH_ANSWERS:
+                # Not backlogged: let a burst of answers gather into one transaction
+                time.sleep(self.flush_interval)
+                self._drain_into(batch)
+            answers = [item for item in batch if not isinstance(item, threading.Event)]
+            if answers:
+                rollup_deltas = {}
+                for learner_id, section, topic, _, _, correct, latency_s, _ in answers:
+                    _add_answer(rollup_deltas.setdefault(learner_id, {}), section, topic, correct, latency_s)
+                try:
+                    self._write_batch(answers, rollup_deltas)
+                except sqlite3.Error:
+                    # Kept, with any flush waiting on it, and retried with the answers queued since
+                    self.write_errors += 1
+                    failures += 1
+                    time.sleep(min(RETRY_BACKOFF_S * 2 ** (failures - 1), MAX_RETRY_BACKOFF_S))
+                    continue
+                failures = 0
+                self._apply_written(rollup_deltas)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            batch = []
+
+    def _apply_written(self, rollup_deltas):
+        # Moves a committed batch from the queued deltas into the learners' rollups
+        with self._lock:
+            for learner_id, deltas in rollup_deltas.items():
+                unwritten = self._unwritten[learner_id]
+                rollups = self._learners.get(learner_id)
+                for scope, delta in deltas.items():
+                    queued = unwritten[scope]
+                    for i, value in enumerate(delta):
+                        queued[i] -= value
+                        if rollups is not None:
+                            rollups.setdefault(scope, [0, 0, 0.0])[i] += value
+                if unwritten[OVERALL_SCOPE][0] <= 0:
+                    del self._unwritten[learner_id]
+            self._evict()
+
+    def _drain_into(self, batch):
+        while len(batch) < MAX_BATCH_ANSWERS:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return
+
+    def _write_batch(self, answers, rollup_deltas):
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO answers (learner_id, section, topic, question_id, difficulty, correct, latency_s, answered_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                answers,
+            )
+            self._conn.executemany(
+                "INSERT INTO rollups (learner_id, scope, attempted, correct, latency_total_s, updated_at) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (learner_id, scope) DO UPDATE SET"
+                " attempted = attempted + excluded.attempted,"
+                " correct = correct + excluded.correct,"
+                " latency_total_s = latency_total_s + excluded.latency_total_s,"
+                " updated_at = excluded.updated_at",
+                [(learner_id, scope, *delta, now) for learner_id, deltas in rollup_deltas.items() for scope, delta in deltas.items()],
+            )
+        self.answers_written += len(answers)
+        self.batches_written += 1
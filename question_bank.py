@@ -0,0 +1,216 @@
+import hashlib
+import json
+import threading
+
+import numpy as np
+
+from quiz_parsing import extract_json_object
+from ability_model import TIER_DIFFICULTY, ability_after_answer, elo_update, pick_question_index, target_difficulty
+
+OPTION_LETTERS = ("A", "B", "C", "D")
+DIFFICULTY_TIERS = ("easy", "medium", "hard")
+# How far (in logits) a stored question may be from the learner's target difficulty
+DIFFICULTY_BAND_WIDTH = 0.75
+_BANK_BAND_WIDTH = object()
+
+QUESTION_BATCH_SCHEMA_INSTRUCTION = """
+The output MUST be a JSON object ONLY, with the following structure. Do NOT include any other text or markdown.
+{
+  "questions": [
+    {
+      "question": "Question text",
+      "options": ["First option", "Second option", "Third option", "Fourth option"],
+      "correct_answer": "C",
+      "explanation": "Why the correct option is right."
+    }
+  ]
+}
+"""
+
+
+def question_id(topic, question_text):
+    return hashlib.sha1(f"{topic}\0{' '.join(question_text.split()).lower()}".encode("utf-8")).hexdigest()[:16]
+
+
+def to_quiz_question_data(bank_question, topic=None, tier=None):
+    # Same shape as parse_single_quiz_question_markdown, plus where it came from
+    options = [f"{letter}) {text}" for letter, text in zip(OPTION_LETTERS, bank_question.options)]
+    correct_index = OPTION_LETTERS.index(bank_question.correct_answer)
+    return {
+        "question": bank_question.question.strip(),
+        "options": options,
+        "correct_answer_full": options[correct_index],
+        "correct_answer_letter": bank_question.correct_answer,
+        "explanation": bank_question.explanation.strip(),
+        "topic": topic,
+        "tier": tier,
+        "source": "bank",
+    }
+
+
+def build_question_batch_prompt(topic, tier, count):
+    return (
+        f"Generate {count} distinct multiple-choice questions about the topic: '{topic}'. "
+        f"Difficulty: {tier.upper()}. Each question needs exactly four options and one correct answer letter."
+    )
+
+
+def parse_question_batch(text):
+    """Return (valid questions, number of rejected items) for a batch response.
+
+    Raises ValueError when the response is not a usable batch at all.
+    """
+    payload = json.loads(extract_json_object(text))
+    raw_questions = payload.get("questions") if isinstance(payload, dict) else None
+    if not isinstance(raw_questions, list):
+        raise ValueError("response has no 'questions' list")
+
+    # pydantic is only needed once a batch actually comes back
+    from question_schema import BankQuestion, QuestionBatch, ValidationError
+
+    questions = []
+    rejected = 0
+    for raw_question in raw_questions:
+        try:
+            questions.append(BankQuestion.model_validate(raw_question))
+        except ValidationError:
+            rejected += 1
+    if not questions:
+        # Run the whole-batch validation to surface a readable error for the retry
+        QuestionBatch.model_validate(payload)
+    return questions, rejected
+
+
+def generate_question_batch(run_prompt, topic, tier, count, max_attempts=3):
+    # run_prompt(prompt) -> response text, so callers decide how the LLM is reached
+    prompt = build_question_batch_prompt(topic, tier, count)
+    last_error = None
+    for _ in range(max_attempts):
+        attempt_prompt = prompt
+        if last_error is not None:
+            attempt_prompt += f" Your previous answer was rejected ({last_error}). Reply with the JSON object only."
+        try:
+            questions, _ = parse_question_batch(run_prompt(attempt_prompt) or "")
+            return questions
+        except ValueError as e:
+            # json.JSONDecodeError and pydantic's ValidationError are ValueErrors too
+            last_error = str(e).splitlines()[0]
+    raise ValueError(f"Could not generate a valid question batch for '{topic}' ({tier}): {last_error}")
+
+
+class _TopicQuestions:
+    __slots__ = ("questions", "difficulty", "answers", "index_by_id")
+
+    def __init__(self, capacity=16):
+        self.questions = []
+        # Parallel arrays over self.questions, grown by doubling
+        self.difficulty = np.zeros(capacity)
+        self.answers = np.zeros(capacity, dtype=np.int64)
+        self.index_by_id = {}
+
+    def append(self, question_data, difficulty):
+        index = len(self.questions)
+        if index == len(self.difficulty):
+            self.difficulty = np.concatenate([self.difficulty, np.zeros(index)])
+            self.answers = np.concatenate([self.answers, np.zeros(index, dtype=np.int64)])
+        self.questions.append(question_data)
+        self.difficulty[index] = difficulty
+        self.index_by_id[question_data["id"]] = index
+
+
+class QuestionBank:
+    """Calibrated multiple-choice questions per topic, shared by every session.
+
+    Questions are not used up: each learner skips the ids it has already seen,
+    and every answer moves the question's difficulty estimate (ability_model).
+    Safe to share with worker threads.
+    """
+
+    def __init__(self, band_width=DIFFICULTY_BAND_WIDTH):
+        self.band_width = band_width
+        self._topics = {}
+        self._lock = threading.Lock()
+        self.batches_generated = 0
+        self.questions_served = 0
+
+    def add(self, topic, tier, questions):
+        # A question that carries a "difficulty" (e.g. from a content pack) keeps its calibration.
+        # Every stored question names its topic and source, so answers find it again and count as bank serves
+        added = 0
+        with self._lock:
+            pool = self._topics.setdefault(topic, _TopicQuestions())
+            for question_data in questions:
+                question_data = {
+                    **question_data,
+                    "topic": topic,
+                    "tier": question_data.get("tier") or tier,
+                    "source": "bank",
+                    "id": question_id(topic, question_data["question"]),
+                }
+                if question_data["id"] in pool.index_by_id:
+                    continue
+                difficulty = question_data.pop("difficulty", None)
+                pool.append(question_data, TIER_DIFFICULTY[tier] if difficulty is None else difficulty)
+                added += 1
+        return added
+
+    def questions(self, topic):
+        # Copies with their current difficulty estimates, for export
+        with self._lock:
+            pool = self._topics.get(topic)
+            if pool is None:
+                return []
+            return [{**question_data, "difficulty": float(pool.difficulty[index])} for index, question_data in enumerate(pool.questions)]
+
+    def select(self, topic, ability, seen_ids=frozenset(), band_width=_BANK_BAND_WIDTH):
+        """The unseen question whose difficulty best matches ``ability``, or None when the band is empty.
+
+        Pass ``band_width=None`` to take the closest unseen question at any difficulty.
+        """
+        if band_width is _BANK_BAND_WIDTH:
+            band_width = self.band_width
+        with self._lock:
+            pool = self._topics.get(topic)
+            if pool is None:
+                return None
+            count = len(pool.questions)
+            available = np.ones(count, dtype=bool)
+            for seen_id in seen_ids:
+                index = pool.index_by_id.get(seen_id)
+                if index is not None:
+                    available[index] = False
+            index = pick_question_index(pool.difficulty[:count], available, target_difficulty(ability), band_width)
+            if index is None:
+                return None
+            self.questions_served += 1
+            return {**pool.questions[index], "difficulty": float(pool.difficulty[index])}
+
+    def record_answer(self, question_data, ability, ability_answers, correct):
+        """Update the question's difficulty and return the learner's new ability."""
+        with self._lock:
+            pool = self._topics.get(question_data.get("topic"))
+            index = pool.index_by_id.get(question_data.get("id")) if pool is not None else None
+            if index is None:
+                return ability_after_answer(ability, ability_answers, question_data.get("difficulty", 0.0), correct)
+            new_abilities, new_difficulties, _ = elo_update(
+                [ability], pool.difficulty[index:index + 1], [1.0 if correct else 0.0], [ability_answers], pool.answers[index:index + 1]
+            )
+            pool.difficulty[index] = new_difficulties[0]
+            pool.answers[index] += 1
+            return float(new_abilities[0])
+
+    def size(self, topic=None):
+        with self._lock:
+            if topic is not None:
+                return len(self._topics[topic].questions) if topic in self._topics else 0
+            return sum(len(pool.questions) for pool in self._topics.values())
+
+    def topic_count(self):
+        with self._lock:
+            return len(self._topics)
+
+    def fill(self, run_prompt, topic, tier, count):
+        bank_questions = generate_question_batch(run_prompt, topic, tier, count)
+        with self._lock:
+            self.batches_generated += 1
+        return self.add(topic, tier, [to_quiz_question_data(q, topic, tier) for q in bank_questions])
@@ -0,0 +1,32 @@
+import re
+from typing import Literal
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+class BankQuestion(BaseModel):
+    question: str = Field(min_length=1)
+    options: list[str] = Field(min_length=4, max_length=4)
+    correct_answer: Literal["A", "B", "C", "D"]
+    explanation: str = ""
+
+    @field_validator("options")
+    @classmethod
+    def strip_option_letters(cls, options):
+        # Models often echo "A) ..." even when asked for bare option text
+        cleaned = [re.sub(r'^\s*[A-Da-d][\).:]\s*', '', option).strip() for option in options]
+        if any(not option for option in cleaned):
+            raise ValueError("options must not be empty")
+        return cleaned
+
+    @field_validator("correct_answer", mode="before")
+    @classmethod
+    def normalize_answer_letter(cls, value):
+        if isinstance(value, str):
+            match = re.match(r'\s*([A-Da-d])\b', value)
+            if match:
+                return match.group(1).upper()
+        return value
+
+
+class QuestionBatch(BaseModel):
+    questions: list[BankQuestion] = Field(min_length=1)
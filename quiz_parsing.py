@@ -0,0 +1,271 @@
+import re
+
+OPTION_LETTERS = "ABCD"
+# Budgets for "clearly malformed": well-formed questions are a few hundred characters
+MAX_PREAMBLE_CHARS = 8000
+MAX_LINE_CHARS = 8000
+MAX_GAP_LINES = 3
+
+# Each pattern is anchored and applied to a single line, so parsing stays linear in the output size
+_DECORATION = r"[\s*_#>-]*"
+_QUESTION_HEADER = re.compile(rf"^{_DECORATION}question(?:\s*#?\d+)?(?:\s*[:.)]|\s*$)[\s*_]*(.*)$", re.IGNORECASE)
+_NUMBERED_LINE = re.compile(r"^\d+[.)]\s+(.*)$")
+_OPTION_LINE = re.compile(rf"^{_DECORATION}\(?([A-Ha-h])[).:\]][\s*_]*(.*)$")
+_ANSWER_LINE = re.compile(rf"^{_DECORATION}(?:the\s+)?(?:correct\s+)?answer\b(?:\s+is)?[\s:*_–-]*(.*)$", re.IGNORECASE)
+# A bare letter needs a delimiter or the end of the line, so "a capital city" is not read as option A
+_ANSWER_LETTER = re.compile(r"^\(?([A-Za-z])(?:[).:\]]|\s+[–-](?=\s)|$)[\s*_]*(.*)$")
+# The same header, searched for across a block of explanation lines at once
+_NEXT_QUESTION_HEADER = re.compile(r"^[ \t*_#>-]*question(?:[ \t]*#?\d+)?(?:[ \t]*[:.)]|[ \t]*$)", re.IGNORECASE | re.MULTILINE)
+_EXPLANATION_LINE = re.compile(rf"^{_DECORATION}explanation[\s*_]*[:–-][\s*_]*(.*)$", re.IGNORECASE)
+
+_QUESTION, _OPTIONS, _ANSWER, _EXPLANATION, _DONE = range(5)
+
+
+def _clean(text):
+    return text.strip().strip("*_").strip()
+
+
+class QuizStreamParser:
+    """Line-oriented parser for one quiz question, fed with streamed chunks.
+
+    Tolerates decoration and label drift ("**Correct answer:** C", "C)The
+    third", "Answer: The third option") but checks the structure as each
+    line completes: question, options A-D in order, an answer naming one of
+    them, then an explanation. ``feed`` returns False as soon as the output
+    can no longer become a valid question, with the reason in ``error``,
+    so a streamed generation can be abandoned early.
+    """
+
+    def __init__(self):
+        self.error = None
+        self._state = _QUESTION
+        self._partial = []
+        self._partial_chars = 0
+        self._preamble_chars = 0
+        self._question_lines = []
+        self._paragraph_ended = False
+        self._options = []
+        self._answer_index = None
+        self._gap_lines = 0
+        self._explanation_lines = []
+
+    @property
+    def done(self):
+        return self._state == _DONE
+
+    def feed(self, chunk):
+        if self.error is not None or self._state == _DONE:
+            return self.error is None
+        last_newline = chunk.rfind("\n")
+        if last_newline < 0:
+            self._partial.append(chunk)
+            self._partial_chars += len(chunk)
+            if self._partial_chars > MAX_LINE_CHARS:
+                self.error = "line too long"
+            return self.error is None
+        self._partial.append(chunk[:last_newline])
+        text = "".join(self._partial)
+        self._partial = [chunk[last_newline + 1:]]
+        self._partial_chars = len(self._partial[0])
+        start = 0
+        while start <= len(text):
+            if self._state == _EXPLANATION and self._explanation_lines:
+                # Past the structure: the rest of the chunk is taken in one piece
+                self._explanation_block(text[start:])
+                break
+            end = text.find("\n", start)
+            if end < 0:
+                end = len(text)
+            self._feed_line(text[start:end])
+            if self.error is not None or self._state == _DONE:
+                break
+            start = end + 1
+        return self.error is None
+
+    def finish(self):
+        """The parsed question dict once the output has ended, or None (see ``error``)."""
+        if self.error is None and self._state != _DONE and self._partial:
+            self._feed_line("".join(self._partial))
+            self._partial = []
+        if self.error is not None:
+            return None
+        explanation = "\n".join(self._explanation_lines).strip()
+        if self._state < _EXPLANATION or not explanation:
+            self.error = ("no options", "fewer than four options", "no answer line", "no explanation")[min(self._state, _EXPLANATION)]
+            return None
+        options = [f"{letter}) {text}" for letter, text in zip(OPTION_LETTERS, self._options)]
+        return {
+            "question": "\n".join(self._question_lines).strip(),
+            "options": options,
+            "correct_answer_full": options[self._answer_index],
+            "correct_answer_letter": OPTION_LETTERS[self._answer_index],
+            "explanation": explanation,
+        }
+
+    def _feed_line(self, line):
+        stripped = line.strip()
+        if self._state == _QUESTION:
+            self._question_line(line, stripped)
+        elif self._state == _OPTIONS:
+            self._option_line(line, stripped)
+        elif self._state == _ANSWER:
+            self._answer_line(line, stripped)
+        else:
+            self._explanation_line(line, stripped)
+
+    def _question_line(self, line, stripped):
+        self._preamble_chars += len(line) + 1
+        if self._preamble_chars > MAX_PREAMBLE_CHARS:
+            self.error = "no options"
+            return
+        if not stripped:
+            self._paragraph_ended = bool(self._question_lines)
+            return
+        option = _OPTION_LINE.match(line)
+        if option and option.group(1).upper() == "A":
+            if not self._question_lines:
+                self.error = "no question"
+                return
+            self._state = _OPTIONS
+            self._option_line(line, stripped)
+            return
+        header = _QUESTION_HEADER.match(line)
+        # The question is the last paragraph before the options; preambles and headers start a new one
+        if header or self._paragraph_ended:
+            self._question_lines = []
+            self._paragraph_ended = False
+        text = _clean(header.group(1) if header else line)
+        if not self._question_lines:
+            numbered = _NUMBERED_LINE.match(text)
+            text = numbered.group(1) if numbered else text
+        if text:
+            self._question_lines.append(text)
+
+    def _option_line(self, line, stripped):
+        if not stripped:
+            return
+        option = _OPTION_LINE.match(line)
+        if option:
+            letter = option.group(1).upper()
+            if letter != OPTION_LETTERS[len(self._options)]:
+                self.error = f"option {letter} out of order"
+            elif not _clean(option.group(2)):
+                self.error = f"option {letter} is empty"
+            else:
+                self._options.append(_clean(option.group(2)))
+                if len(self._options) == len(OPTION_LETTERS):
+                    self._state = _ANSWER
+                    self._gap_lines = 0
+            return
+        if _ANSWER_LINE.match(line):
+            self.error = "fewer than four options"
+        else:
+            # A wrapped option
+            self._skip_gap_line("malformed options")
+            self._options[-1] = f"{self._options[-1]} {_clean(line)}"
+
+    def _answer_line(self, line, stripped):
+        if not stripped:
+            return
+        answer = _ANSWER_LINE.match(line)
+        if answer is None:
+            if _OPTION_LINE.match(line):
+                self.error = "more than four options"
+            else:
+                self._skip_gap_line("no answer line")
+            return
+        answer_text = _clean(answer.group(1))
+        # "Answer: The third option" names the option by its text; that wins over a leading letter
+        folded = answer_text.casefold()
+        matches = [i for i, option_text in enumerate(self._options) if option_text.casefold() == folded]
+        letter = _ANSWER_LETTER.match(answer_text) if len(matches) != 1 else None
+        if letter:
+            if letter.group(1).upper() not in OPTION_LETTERS:
+                self.error = f"answer {letter.group(1)} is not an option"
+                return
+            self._answer_index = OPTION_LETTERS.index(letter.group(1).upper())
+        elif len(matches) == 1:
+            self._answer_index = matches[0]
+        else:
+            self.error = "answer does not name an option"
+            return
+        self._state = _EXPLANATION
+        self._gap_lines = 0
+
+    def _explanation_line(self, line, stripped):
+        if self._explanation_lines:
+            self._explanation_block(line)
+            return
+        if not stripped:
+            return
+        labelled = _EXPLANATION_LINE.match(line)
+        text = _clean(labelled.group(1)) if labelled else stripped
+        if text:
+            self._explanation_lines.append(text)
+        elif labelled is None:
+            self._skip_gap_line("no explanation")
+
+    def _explanation_block(self, text):
+        # Everything up to a second question's header belongs to the explanation
+        header = _NEXT_QUESTION_HEADER.search(text) if "uestion" in text or "UESTION" in text else None
+        if header:
+            text = text[:header.start()]
+            self._state = _DONE
+        self._explanation_lines.append(text.rstrip())
+
+    def _skip_gap_line(self, error):
+        self._gap_lines += 1
+        if self._gap_lines > MAX_GAP_LINES:
+            self.error = error
+
+
+def extract_json_object(text):
+    # Tolerate ```json fences or a stray sentence around the object
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("no JSON object found in response")
+    return text[start:end + 1]
+
+
+def parse_single_quiz_question_markdown(markdown_text):
+    parser = QuizStreamParser()
+    parser.feed(markdown_text)
+    return parser.finish()
+
+
+def parse_single_quiz_question_markdown_regex(markdown_text):
+    # The previous whole-text regex parser, kept as the baseline for benchmarks/run.py
+    match = re.search(
+        r'^(?:### Question \d+:)?\s*(.*?)\n'
+        r'([A-D]\).*?)\n'
+        r'([A-D]\).*?)\n'
+        r'([A-D]\).*?)\n'
+        r'([A-D]\).*?)\n'
+        r'Correct Answer: ([A-D]\) .*?)\n'
+        r'Explanation: (.*)$',
+        markdown_text, re.DOTALL | re.MULTILINE
+    )
+
+    if match:
+        question_text = match.group(1).strip()
+        options = [
+            match.group(2).strip(),
+            match.group(3).strip(),
+            match.group(4).strip(),
+            match.group(5).strip()
+        ]
+        correct_answer_full = match.group(6).strip()
+        explanation = match.group(7).strip()
+
+        correct_answer_letter_match = re.match(r'([A-D])\)', correct_answer_full)
+        correct_answer_letter = correct_answer_letter_match.group(1) if correct_answer_letter_match else None
+
+        return {
+            "question": question_text,
+            "options": options,
+            "correct_answer_full": correct_answer_full,
+            "correct_answer_letter": correct_answer_letter,
+            "explanation": explanation
+        }
+    return None
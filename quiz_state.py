@@ -0,0 +1,85 @@
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+def new_section_id():
+    return uuid.uuid4().hex[:12]
+
+
+def ensure_section_id(section_data):
+    # Curriculum JSON and manual additions arrive without ids; give each section one for life
+    if not section_data.get("id"):
+        section_data["id"] = new_section_id()
+    return section_data["id"]
+
+
+@dataclass(slots=True)
+class SectionQuizState:
+    """Everything the adaptive quiz tracks for one section."""
+
+    section_id: str
+    current_topic: str = "general knowledge"
+    current_topic_index: int = 0
+    difficulty_hint: str = "normal"
+    total_correct: int = 0
+    total_attempted: int = 0
+    question_count: int = 0
+    options_locked: bool = False
+    submitted: bool = False
+    feedback: str = ""
+    current_question: Optional[dict] = None
+    # Speculative follow-up questions, see start_quiz_prefetch in app.py
+    prefetch: Optional[dict] = None
+    # Elo ability estimate (logits) and the bank questions already shown, see ability_model
+    ability: float = 0.0
+    ability_answers: int = 0
+    seen_question_ids: set = field(default_factory=set)
+    # perf_counter() when the current question was shown, for answer latency
+    question_shown_at: float = 0.0
+
+    @property
+    def grade(self):
+        if self.total_attempted > 0:
+            return f"{self.total_correct / self.total_attempted * 100:.1f}%"
+        return "N/A"
+
+
+class QuizStateRegistry:
+    """Per-session map of stable section id -> SectionQuizState."""
+
+    __slots__ = ("_states",)
+
+    def __init__(self):
+        self._states = {}
+
+    def get(self, section_data):
+        section_id = ensure_section_id(section_data)
+        state = self._states.get(section_id)
+        if state is None:
+            state = self.reset(section_data)
+        return state
+
+    def reset(self, section_data):
+        topics = section_data.get("topics") or []
+        state = SectionQuizState(section_data["id"], current_topic=topics[0] if topics else "general knowledge")
+        previous = self._states.get(section_data["id"])
+        if previous is not None:
+            # A restarted quiz keeps what the learner has shown and already seen
+            state.ability = previous.ability
+            state.ability_answers = previous.ability_answers
+            state.seen_question_ids = previous.seen_question_ids
+        self._states[section_data["id"]] = state
+        return state
+
+    def find(self, section_id):
+        return self._states.get(section_id)
+
+    def discard(self, section_id):
+        return self._states.pop(section_id, None)
+
+    def __iter__(self):
+        return iter(self._states.values())
+
+    def __len__(self):
+        return len(self._states)
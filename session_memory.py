@@ -0,0 +1,259 @@
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+import zlib
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+DEFAULT_SPILL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "session_spill")
+DEFAULT_SESSION_BUDGET_BYTES = 4 * 1024 * 1024
+# Share of the budget that may stay uncompressed; the rest holds zlib-compressed entries
+HOT_FRACTION = 0.5
+COMPRESSION_LEVEL = 6
+
+_HOT, _COMPRESSED, _SPILLED = "hot", "compressed", "spilled"
+
+
+def _encode(value):
+    if isinstance(value, bytes):
+        return "b", value
+    if isinstance(value, str):
+        return "s", value.encode("utf-8")
+    return "j", json.dumps(value).encode("utf-8")
+
+
+def _decode(codec, data):
+    if codec == "b":
+        return data
+    if codec == "s":
+        return data.decode("utf-8")
+    return json.loads(data)
+
+
+class _Entry:
+    __slots__ = ("state", "codec", "value", "raw_size", "stored_size")
+
+    def __init__(self, codec, value, raw_size):
+        self.state = _HOT
+        self.codec = codec
+        self.value = value
+        self.raw_size = raw_size
+        self.stored_size = raw_size
+
+
+def _remove_tree(path):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class SessionMemory:
+    """One session's generated content, kept under a byte budget.
+
+    Entries of every named store share one budget. Past ``HOT_FRACTION``
+    of the budget the least recently used entries are zlib-compressed; past
+    the whole budget they are spilled to files under ``spill_dir``. Reading
+    a cold entry restores it transparently and makes it the most recent.
+    Sizes are the encoded (UTF-8 / JSON) byte counts, not Python object
+    overhead.
+    """
+
+    def __init__(self, budget_bytes=DEFAULT_SESSION_BUDGET_BYTES, spill_dir=None):
+        self.session_id = uuid.uuid4().hex
+        self.budget_bytes = budget_bytes
+        self.spill_dir = os.path.join(spill_dir or tempfile.gettempdir(), self.session_id)
+        self.compressions = 0
+        self.spills = 0
+        self.reloads = 0
+        self._entries = {}
+        # LRU order within each tier; demotion keeps it, since whatever is demoted is older than what stays
+        self._order = {_HOT: OrderedDict(), _COMPRESSED: OrderedDict(), _SPILLED: OrderedDict()}
+        self._keys = {}
+        self._bytes = {_HOT: 0, _COMPRESSED: 0, _SPILLED: 0}
+        self._lock = threading.RLock()
+        # Spill files go with the session's state
+        self._finalizer = weakref.finalize(self, _remove_tree, self.spill_dir)
+
+    def store(self, name):
+        with self._lock:
+            self._keys.setdefault(name, {})
+        return BoundedStore(self, name)
+
+    def usage(self):
+        with self._lock:
+            by_store = {}
+            for (name, _), entry in self._entries.items():
+                store_usage = by_store.setdefault(name, {"entries": 0, _HOT: 0, _COMPRESSED: 0, _SPILLED: 0, "raw": 0})
+                store_usage["entries"] += 1
+                store_usage[entry.state] += entry.stored_size
+                store_usage["raw"] += entry.raw_size
+            return {
+                "entries": len(self._entries),
+                "memory_bytes": self._bytes[_HOT] + self._bytes[_COMPRESSED],
+                "hot_bytes": self._bytes[_HOT],
+                "compressed_bytes": self._bytes[_COMPRESSED],
+                "spilled_bytes": self._bytes[_SPILLED],
+                "budget_bytes": self.budget_bytes,
+                "by_store": by_store,
+            }
+
+    def close(self):
+        with self._lock:
+            self._entries.clear()
+            for order in self._order.values():
+                order.clear()
+            for keys in self._keys.values():
+                keys.clear()
+            self._bytes = {_HOT: 0, _COMPRESSED: 0, _SPILLED: 0}
+        self._finalizer()
+
+    def _get(self, name, key):
+        with self._lock:
+            entry = self._entries[(name, key)]
+            if entry.state == _HOT:
+                self._order[_HOT].move_to_end((name, key))
+            else:
+                self._restore((name, key), entry)
+                self._enforce_budget()
+            return _decode(entry.codec, entry.value)
+
+    def _put(self, name, key, value):
+        codec, data = _encode(value)
+        with self._lock:
+            if (name, key) in self._entries:
+                self._drop((name, key))
+            self._entries[(name, key)] = _Entry(codec, data, len(data))
+            self._order[_HOT][(name, key)] = None
+            self._keys[name][key] = None
+            self._bytes[_HOT] += len(data)
+            self._enforce_budget()
+
+    def _delete(self, name, key):
+        with self._lock:
+            self._drop((name, key))
+            del self._keys[name][key]
+
+    def _drop(self, entry_key):
+        entry = self._entries.pop(entry_key)
+        del self._order[entry.state][entry_key]
+        self._bytes[entry.state] -= entry.stored_size
+        if entry.state == _SPILLED:
+            try:
+                os.remove(self._spill_path(entry_key))
+            except OSError:
+                pass
+
+    def _restore(self, entry_key, entry):
+        if entry.state == _SPILLED:
+            path = self._spill_path(entry_key)
+            with open(path, "rb") as spill_file:
+                compressed = spill_file.read()
+            os.remove(path)
+        else:
+            compressed = entry.value
+        self._bytes[entry.state] -= entry.stored_size
+        del self._order[entry.state][entry_key]
+        self._order[_HOT][entry_key] = None
+        entry.value = zlib.decompress(compressed)
+        entry.state = _HOT
+        entry.stored_size = entry.raw_size
+        self._bytes[_HOT] += entry.raw_size
+        self.reloads += 1
+
+    def _enforce_budget(self):
+        # The most recent entry always stays hot
+        hot_order, compressed_order = self._order[_HOT], self._order[_COMPRESSED]
+        while self._bytes[_HOT] > self.budget_bytes * HOT_FRACTION and len(hot_order) > 1:
+            entry_key, _ = hot_order.popitem(last=False)
+            entry = self._entries[entry_key]
+            self._bytes[_HOT] -= entry.stored_size
+            entry.value = zlib.compress(entry.value, COMPRESSION_LEVEL)
+            entry.state = _COMPRESSED
+            entry.stored_size = len(entry.value)
+            self._bytes[_COMPRESSED] += entry.stored_size
+            compressed_order[entry_key] = None
+            self.compressions += 1
+        while self._bytes[_HOT] + self._bytes[_COMPRESSED] > self.budget_bytes and compressed_order:
+            entry_key, _ = compressed_order.popitem(last=False)
+            entry = self._entries[entry_key]
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(self._spill_path(entry_key), "wb") as spill_file:
+                spill_file.write(entry.value)
+            self._bytes[_COMPRESSED] -= entry.stored_size
+            entry.value = None
+            entry.state = _SPILLED
+            self._bytes[_SPILLED] += entry.stored_size
+            self._order[_SPILLED][entry_key] = None
+            self.spills += 1
+
+    def _spill_path(self, entry_key):
+        return os.path.join(self.spill_dir, hashlib.sha1(json.dumps(entry_key).encode("utf-8")).hexdigest())
+
+
+class BoundedStore(MutableMapping):
+    """Dict-like view of one named store in a SessionMemory."""
+
+    __slots__ = ("_memory", "_name")
+
+    def __init__(self, memory, name):
+        self._memory = memory
+        self._name = name
+
+    def __getitem__(self, key):
+        return self._memory._get(self._name, key)
+
+    def __setitem__(self, key, value):
+        self._memory._put(self._name, key, value)
+
+    def __delitem__(self, key):
+        self._memory._delete(self._name, key)
+
+    def __contains__(self, key):
+        # Membership never reloads a cold entry
+        return key in self._memory._keys[self._name]
+
+    def __iter__(self):
+        return iter(list(self._memory._keys[self._name]))
+
+    def __len__(self):
+        return len(self._memory._keys[self._name])
+
+
+class SessionMemoryRegistry:
+    """Creates every session's SessionMemory and reports usage across the server process."""
+
+    def __init__(self, budget_bytes=DEFAULT_SESSION_BUDGET_BYTES, spill_dir=DEFAULT_SPILL_DIR):
+        self.budget_bytes = budget_bytes
+        os.makedirs(spill_dir, exist_ok=True)
+        # One directory per process, so a restart never sees another process's files
+        self.spill_dir = tempfile.mkdtemp(prefix="process_", dir=spill_dir)
+        atexit.register(_remove_tree, self.spill_dir)
+        self._sessions = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def new_session(self):
+        memory = SessionMemory(self.budget_bytes, self.spill_dir)
+        with self._lock:
+            self._sessions.add(memory)
+        return memory
+
+    def usage(self):
+        with self._lock:
+            sessions = list(self._sessions)
+        totals = {"sessions": len(sessions), "entries": 0, "memory_bytes": 0, "hot_bytes": 0, "compressed_bytes": 0, "spilled_bytes": 0}
+        for memory in sessions:
+            session_usage = memory.usage()
+            for name in ("entries", "memory_bytes", "hot_bytes", "compressed_bytes", "spilled_bytes"):
+                totals[name] += session_usage[name]
+        return totals
+
+    def gauges(self):
+        usage = self.usage()
+        return [
+            ("session_memory_sessions", {}, usage["sessions"]),
+            *[("session_memory_bytes", {"tier": tier}, usage[f"{tier}_bytes"]) for tier in (_HOT, _COMPRESSED, _SPILLED)],
+        ]
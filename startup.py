@@ -0,0 +1,48 @@
+import importlib
+import threading
+import time
+
+
+class StartupReport:
+    """Where a server process spends its cold start.
+
+    Eager imports and the first script run are recorded once per process;
+    heavy optional dependencies are timed the first time they are imported
+    through ``lazy_import``.
+    """
+
+    def __init__(self):
+        self.created_at = time.perf_counter()
+        self.phases = {}
+        self.imports = {}
+        self._lock = threading.Lock()
+
+    def record_phase(self, phase, seconds):
+        # Only the first occurrence is the cold one
+        with self._lock:
+            self.phases.setdefault(phase, seconds)
+
+    def lazy_import(self, module_name):
+        with self._lock:
+            already_timed = module_name in self.imports
+        if already_timed:
+            return importlib.import_module(module_name)
+        started_at = time.perf_counter()
+        module = importlib.import_module(module_name)
+        with self._lock:
+            self.imports.setdefault(module_name, time.perf_counter() - started_at)
+        return module
+
+    def rows(self):
+        with self._lock:
+            return (
+                [{"kind": "phase", "name": phase, "seconds": seconds} for phase, seconds in self.phases.items()]
+                + [{"kind": "import", "name": module_name, "seconds": seconds} for module_name, seconds in self.imports.items()]
+            )
+
+    def gauges(self):
+        with self._lock:
+            return (
+                [("startup_phase_seconds", {"phase": phase}, seconds) for phase, seconds in self.phases.items()]
+                + [("lazy_import_seconds", {"module": module_name}, seconds) for module_name, seconds in self.imports.items()]
+            )
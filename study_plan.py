@@ -0,0 +1,94 @@
+import re
+from bisect import bisect_left
+
+
+def search_tokens(text):
+    return re.findall(r"\w+", text.casefold())
+
+
+class StudyPlanIndex:
+    """Hash index over the session's sections for O(1) lookups and de-duplication.
+
+    Maps section names to their position and keeps a set of topic names per
+    section, so manual additions never scan the curriculum. A sorted
+    (token, position, topic index) list answers prefix searches over topic
+    names; it is rebuilt lazily, on the first search after a change.
+    """
+
+    __slots__ = ("_sections", "_positions", "_topic_sets", "_terms", "_section_count")
+
+    def __init__(self, sections):
+        self.rebuild(sections)
+
+    def rebuild(self, sections):
+        self._sections = sections
+        self._positions = {}
+        self._topic_sets = []
+        for section_data in sections:
+            self._positions.setdefault(section_data['name'], len(self._topic_sets))
+            self._topic_sets.append(set(section_data['topics']))
+        self._section_count = len(sections)
+        self._terms = None
+
+    def sync(self, sections):
+        # Cheap staleness check for lists replaced or extended behind the index's back
+        if sections is not self._sections or len(sections) != self._section_count:
+            self.rebuild(sections)
+
+    def section_names(self):
+        return [section_data['name'] for section_data in self._sections]
+
+    def position(self, section_name):
+        return self._positions.get(section_name)
+
+    def has_section(self, section_name):
+        return section_name in self._positions
+
+    def has_topic(self, section_name, topic_name):
+        position = self._positions.get(section_name)
+        return position is not None and topic_name in self._topic_sets[position]
+
+    def add_section(self, section_data):
+        if section_data['name'] in self._positions:
+            return False
+        self._positions[section_data['name']] = len(self._sections)
+        self._topic_sets.append(set(section_data['topics']))
+        self._sections.append(section_data)
+        self._section_count = len(self._sections)
+        self._terms = None
+        return True
+
+    def add_topic(self, section_name, topic_name):
+        position = self._positions.get(section_name)
+        if position is None or topic_name in self._topic_sets[position]:
+            return False
+        self._topic_sets[position].add(topic_name)
+        self._sections[position]['topics'].append(topic_name)
+        self._terms = None
+        return True
+
+    def search(self, query, limit=10):
+        """(section position, topic index) of topics with a word starting with every query word."""
+        words = search_tokens(query)
+        if not words:
+            return []
+        if self._terms is None:
+            self._terms = sorted(
+                (token, position, topic_index)
+                for position, section_data in enumerate(self._sections)
+                for topic_index, topic_name in enumerate(section_data['topics'])
+                for token in set(search_tokens(topic_name))
+            )
+        matches = None
+        # Longest word first: usually the most selective prefix range
+        for word in sorted(set(words), key=len, reverse=True):
+            word_matches = set()
+            for token, position, topic_index in self._terms[bisect_left(self._terms, (word,)):]:
+                if not token.startswith(word):
+                    break
+                if matches is None or (position, topic_index) in matches:
+                    word_matches.add((position, topic_index))
+            matches = word_matches
+            if not matches:
+                return []
+        return sorted(matches)[:limit]
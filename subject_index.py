@@ -0,0 +1,211 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import Counter, namedtuple
+
+import numpy as np
+
+DEFAULT_SUBJECT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "subjects.sqlite3")
+DEFAULT_MATCH_THRESHOLD = 0.8
+NGRAM_SIZE = 3
+# Shorter words must match exactly: "C" is not "R", nor "Calculus 1" "Calculus 2"
+MIN_TYPO_WORD_LENGTH = 5
+# Filler words that only tell "Programming in Java" apart from "Java Programming"
+STOPWORDS = frozenset({"a", "an", "and", "for", "in", "intro", "introduction", "of", "on", "the", "to", "with"})
+
+SubjectMatch = namedtuple("SubjectMatch", ["subject", "score"])
+
+
+def normalize_subject(subject):
+    words = re.sub(r"[^\w\s]", " ", subject.casefold()).split()
+    return " ".join(word for word in words if word not in STOPWORDS) or " ".join(words)
+
+
+def subject_ngrams(subject):
+    # Per-word character n-grams, so word order does not matter and typos cost only a few grams
+    grams = Counter()
+    for word in normalize_subject(subject).split():
+        padded = f" {word} "
+        grams.update(padded[i:i + NGRAM_SIZE] for i in range(max(1, len(padded) - NGRAM_SIZE + 1)))
+    return grams
+
+
+def _within_one_edit(word, other):
+    # One substitution, insertion, deletion or swap of adjacent letters ("theroy")
+    if len(word) > len(other):
+        word, other = other, word
+    if len(other) - len(word) > 1:
+        return False
+    mismatch = next((i for i, (a, b) in enumerate(zip(word, other)) if a != b), len(word))
+    if len(word) < len(other):
+        return word[mismatch:] == other[mismatch + 1:]
+    if word[mismatch + 1:] == other[mismatch + 1:]:
+        return True
+    swapped = other[:mismatch] + other[mismatch + 1:mismatch + 2] + other[mismatch:mismatch + 1] + other[mismatch + 2:]
+    return word == swapped
+
+
+def same_words(subject, other):
+    """Whether two subjects have the same words, up to order and one typo per longer word.
+
+    N-gram similarity alone scores "Inorganic Chemistry" 0.88 against
+    "Organic Chemistry"; a whole extra syllable is a different subject.
+    """
+    words = normalize_subject(subject).split()
+    other_words = normalize_subject(other).split()
+    if len(words) != len(other_words):
+        return False
+    for word in words:
+        if word in other_words:
+            other_words.remove(word)
+            continue
+        typo = next(
+            (candidate for candidate in other_words
+             if min(len(word), len(candidate)) >= MIN_TYPO_WORD_LENGTH and _within_one_edit(word, candidate)),
+            None,
+        )
+        if typo is None:
+            return False
+        other_words.remove(typo)
+    return True
+
+
+class SubjectIndex:
+    """Character n-gram TF-IDF index over subjects that already have a curriculum.
+
+    Postings are stored CSR-style in NumPy (per n-gram: document ids and
+    pre-normalized TF-IDF weights), so ``match`` only touches the postings
+    of the query's own n-grams. IDF weights and postings are rebuilt, fully
+    vectorized, on ``add``, which follows a multi-second generation; lookups
+    never pay for it. Subjects are kept in SQLite so the index survives
+    restarts.
+    """
+
+    def __init__(self, path=DEFAULT_SUBJECT_INDEX_PATH, match_threshold=DEFAULT_MATCH_THRESHOLD):
+        self.path = path
+        self.match_threshold = match_threshold
+        self._subjects = []
+        self._normalized = {}
+        self._gram_ids = {}
+        # One (document id, n-gram id, count) triple per distinct n-gram of each subject
+        self._entry_documents = array("i")
+        self._entry_grams = array("q")
+        self._entry_counts = array("f")
+        self._idf = np.zeros(0, dtype=np.float32)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._posting_documents = np.zeros(0, dtype=np.int32)
+        self._posting_weights = np.zeros(0, dtype=np.float32)
+        self._document_count = 0
+        self._lock = threading.Lock()
+
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS subjects (subject TEXT PRIMARY KEY, added_at REAL NOT NULL)")
+            self._conn.commit()
+            rows = self._conn.execute("SELECT subject FROM subjects ORDER BY added_at").fetchall()
+            self._add_to_index([subject for (subject,) in rows])
+
+    def __len__(self):
+        return len(self._subjects)
+
+    def add(self, subject):
+        return self.add_many([subject])
+
+    def add_many(self, subjects):
+        added = self._add_to_index(subjects)
+        if added and self._conn is not None:
+            with self._lock:
+                self._conn.executemany("INSERT OR IGNORE INTO subjects (subject, added_at) VALUES (?, ?)", [(subject, time.time()) for subject in added])
+                self._conn.commit()
+        return len(added)
+
+    def match(self, subject, threshold=None):
+        # Best previously indexed subject with cosine similarity >= threshold (default
+        # match_threshold) and the same words (see same_words), or None
+        if threshold is None:
+            threshold = self.match_threshold
+        exact = self._normalized.get(normalize_subject(subject))
+        if exact is not None:
+            return SubjectMatch(exact, 1.0)
+        with self._lock:
+            idf, offsets, posting_documents, posting_weights = self._idf, self._offsets, self._posting_documents, self._posting_weights
+            gram_ids, document_count = self._gram_ids, self._document_count
+        if not document_count:
+            return None
+
+        known = []
+        unknown_squared = 0.0
+        for gram, count in subject_ngrams(subject).items():
+            gram_id = gram_ids.get(gram)
+            if gram_id is None or gram_id >= len(idf):
+                # Unseen n-grams still count towards the query norm, at the rarest n-gram's weight
+                unknown_squared += (count * float(idf.max(initial=1.0))) ** 2
+            else:
+                known.append((gram_id, count * float(idf[gram_id])))
+        if not known:
+            return None
+        query_norm = math.sqrt(sum(weight * weight for _, weight in known) + unknown_squared)
+
+        scores = np.zeros(document_count, dtype=np.float32)
+        for gram_id, weight in known:
+            start, end = offsets[gram_id], offsets[gram_id + 1]
+            scores[posting_documents[start:end]] += (weight / query_norm) * posting_weights[start:end]
+        candidates = np.flatnonzero(scores >= threshold)
+        for best in candidates[np.argsort(-scores[candidates], kind="stable")]:
+            if same_words(subject, self._subjects[best]):
+                return SubjectMatch(self._subjects[best], float(scores[best]))
+        return None
+
+    def _add_to_index(self, subjects):
+        with self._lock:
+            added = []
+            for subject in subjects:
+                normalized = normalize_subject(subject)
+                if not normalized or normalized in self._normalized:
+                    continue
+                document_id = len(self._subjects)
+                self._normalized[normalized] = subject
+                self._subjects.append(subject)
+                for gram, count in subject_ngrams(subject).items():
+                    self._entry_documents.append(document_id)
+                    self._entry_grams.append(self._gram_ids.setdefault(gram, len(self._gram_ids)))
+                    self._entry_counts.append(count)
+                added.append(subject)
+            if not added:
+                return added
+            documents = np.frombuffer(self._entry_documents, dtype=np.int32).copy()
+            grams = np.frombuffer(self._entry_grams, dtype=np.int64).copy()
+            counts = np.frombuffer(self._entry_counts, dtype=np.float32).copy()
+            gram_count = len(self._gram_ids)
+            document_count = len(self._subjects)
+        # Rebuilt outside the lock so lookups keep running on the previous arrays meanwhile
+        self._rebuild(documents, grams, counts, gram_count, document_count)
+        return added
+
+    def _rebuild(self, documents, grams, counts, gram_count, document_count):
+        document_frequency = np.bincount(grams, minlength=gram_count)
+        idf = (np.log((1 + document_count) / (1 + document_frequency)) + 1.0).astype(np.float32)
+        weights = counts * idf[grams]
+        norms = np.sqrt(np.bincount(documents, weights=weights * weights, minlength=document_count)).astype(np.float32)
+        weights /= norms[documents]
+
+        order = np.argsort(grams, kind="stable")
+        offsets = np.zeros(gram_count + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=offsets[1:])
+        with self._lock:
+            # A concurrent add may already have swapped in a newer build
+            if document_count > self._document_count:
+                self._posting_documents = documents[order]
+                self._posting_weights = weights[order]
+                self._offsets = offsets
+                self._idf = idf
+                self._document_count = document_count
@@ -0,0 +1,252 @@
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRIC_PREFIX = "study_assistant_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_HELP = {
+    "llm_request_seconds": "Wall time of one agent.run call, including streaming.",
+    "llm_request_total": "Agent calls by outcome (ok or the exception class).",
+    "llm_tokens_total": "Tokens reported by the model, by kind (prompt or completion).",
+    "content_cache_lookups_total": "Content cache lookups before an agent call, by result.",
+    "subject_match_seconds": "Time to look up a similar, already generated curriculum subject.",
+    "subject_match_total": "Similar-subject lookups by result (hit, miss, or expired from the content cache).",
+    "quiz_parse_seconds": "Time spent parsing one streamed quiz question generation.",
+    "quiz_parse_total": "Quiz question generations by parse result (ok, aborted early or failed).",
+    "question_batch_total": "Question bank batch generations by result (failed after all retries, deadline or ok).",
+    "llm_deadline_fallback_total": "Calls past their deadline by job kind and what was served instead (cache, bank or none).",
+    "llm_hedge_extra_request_ratio": "Hedged duplicate requests sent per hedged-eligible LLM call.",
+    "llm_hedged_calls": "Deadline-bound LLM calls by agent and outcome (calls, hedges, hedge_wins, hedges_skipped, deadlines_exceeded).",
+    "warmup_coverage_ratio": "Share of the most requested content that is already generated.",
+    "warmup_demand_tracked": "Subjects, topics and quizzes with recorded demand.",
+    "warmup_items": "Most requested content by kind and state (warm or cold).",
+    "warmup_spend": "LLM requests and estimated tokens spent on warm-up, by kind.",
+    "warmup_tasks": "Warm-up tasks by outcome (warmed, failed or yielded to other work).",
+    "quiz_prefetch_total": "Next-question requests by whether a prefetched question was used.",
+    "tts_seconds": "Time from Read Aloud click until every audio part is ready.",
+    "tts_total": "Read Aloud requests by outcome.",
+    "script_run_seconds": "Wall time of full-script and fragment reruns, by scope.",
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\"", '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_key, extra=()):
+    pairs = [*label_key, *extra]
+    if not pairs:
+        return ""
+    escaped = (f'{name}="{_escape_label_value(value)}"' for name, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def percentile(ordered_samples, fraction):
+    if not ordered_samples:
+        return None
+    return ordered_samples[min(len(ordered_samples) - 1, int(len(ordered_samples) * fraction))]
+
+
+class _Histogram:
+    __slots__ = ("bucket_counts", "count", "total", "recent")
+
+    def __init__(self, bucket_count, max_samples):
+        self.bucket_counts = [0] * bucket_count
+        self.count = 0
+        self.total = 0.0
+        # Recent raw samples for p50/p95; the buckets keep the all-time shape
+        self.recent = deque(maxlen=max_samples)
+
+
+class Telemetry:
+    """Process-wide counters and latency histograms, safe to use from any thread.
+
+    Counters and histograms are created on first use and keyed by name plus
+    labels. Collectors registered with add_collector are polled on export for
+    gauges owned by other components (cache sizes, queue depth, ...).
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, max_samples=1024):
+        self.buckets = tuple(buckets)
+        self.max_samples = max_samples
+        self.started_at = time.time()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            self._counters[(name, _label_key(labels))] += amount
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(self.buckets) + 1, self.max_samples)
+            histogram.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+            histogram.count += 1
+            histogram.total += value
+            histogram.recent.append(value)
+
+    @contextmanager
+    def track(self, name, **labels):
+        # Times the block into <name>_seconds and counts it in <name>_total by outcome
+        started_at = time.perf_counter()
+        try:
+            yield
+        except BaseException as error:
+            self.observe(f"{name}_seconds", time.perf_counter() - started_at, **labels)
+            self.inc(f"{name}_total", outcome=type(error).__name__, **labels)
+            raise
+        self.observe(f"{name}_seconds", time.perf_counter() - started_at, **labels)
+        self.inc(f"{name}_total", outcome="ok", **labels)
+
+    def add_collector(self, collector):
+        # collector() returns an iterable of (name, labels_dict, value)
+        self._collectors.append(collector)
+
+    def _collect_gauges(self):
+        gauges = []
+        for collector in self._collectors:
+            try:
+                gauges.extend((name, _label_key(labels), value) for name, labels, value in collector())
+            except Exception:
+                # A broken collector must not take the metrics endpoint down with it
+                continue
+        return gauges
+
+    def counter_value(self, name, **labels):
+        # Sum over every series of `name` whose labels include the given ones
+        wanted = set(_label_key(labels))
+        with self._lock:
+            return sum(value for (counter_name, label_key), value in self._counters.items() if counter_name == name and wanted.issubset(label_key))
+
+    def latency_summary(self):
+        with self._lock:
+            items = [(name, label_key, histogram.count, histogram.total, sorted(histogram.recent)) for (name, label_key), histogram in self._histograms.items()]
+        return [
+            {
+                "metric": name,
+                "labels": dict(label_key),
+                "count": count,
+                "mean_s": total / count if count else None,
+                "p50_s": percentile(recent, 0.5),
+                "p95_s": percentile(recent, 0.95),
+            }
+            for name, label_key, count, total, recent in sorted(items)
+        ]
+
+    def snapshot(self):
+        with self._lock:
+            counters = [{"metric": name, "labels": dict(label_key), "value": value} for (name, label_key), value in sorted(self._counters.items())]
+        return {
+            "timestamp": time.time(),
+            "uptime_s": time.time() - self.started_at,
+            "counters": counters,
+            "latency": self.latency_summary(),
+            "gauges": [{"metric": name, "labels": dict(label_key), "value": value} for name, label_key, value in self._collect_gauges()],
+        }
+
+    def render_prometheus(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                ((key, list(histogram.bucket_counts), histogram.count, histogram.total) for key, histogram in self._histograms.items()),
+                key=lambda item: item[0]
+            )
+        gauges = sorted(self._collect_gauges(), key=lambda gauge: gauge[:2])
+
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name in described:
+                return
+            described.add(name)
+            if name in METRIC_HELP:
+                lines.append(f"# HELP {METRIC_PREFIX}{name} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+
+        for (name, label_key), value in counters:
+            describe(name, "counter")
+            lines.append(f"{METRIC_PREFIX}{name}{_format_labels(label_key)} {value:g}")
+        for (name, label_key), bucket_counts, count, total in histograms:
+            describe(name, "histogram")
+            cumulative = 0
+            for upper_bound, bucket_count in zip((*self.buckets, "+Inf"), bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(label_key, (('le', upper_bound),))} {cumulative}")
+            lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(label_key)} {total:.6f}")
+            lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(label_key)} {count}")
+        for name, label_key, value in gauges:
+            describe(name, "gauge")
+            lines.append(f"{METRIC_PREFIX}{name}{_format_labels(label_key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(telemetry, port, host="0.0.0.0"):
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] == "/metrics":
+                body = telemetry.render_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path.split("?")[0] == "/metrics.json":
+                body = json.dumps(telemetry.snapshot()).encode("utf-8")
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics_server", daemon=True).start()
+    return server
+
+
+def write_json_snapshot(telemetry, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, "w") as snapshot_file:
+        json.dump(telemetry.snapshot(), snapshot_file, indent=2)
+    os.replace(temp_path, path)
+
+
+def start_json_dump(telemetry, path, interval_s=30.0):
+    """Rewrite ``path`` with a JSON snapshot every ``interval_s`` seconds from a daemon thread."""
+
+    def dump_forever():
+        while True:
+            time.sleep(interval_s)
+            try:
+                write_json_snapshot(telemetry, path)
+            except OSError:
+                continue
+
+    thread = threading.Thread(target=dump_forever, name="metrics_json_dump", daemon=True)
+    thread.start()
+    return thread
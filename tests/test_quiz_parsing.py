@@ -0,0 +1,36 @@
+from quiz_parsing import parse_single_quiz_question_markdown
+
+
+def quiz_markdown(answer_line, options=("Paris", "Lyon", "a capital city", "Marseille")):
+    lines = ["### Question 1:", "Which of these describes Paris?"]
+    lines += [f"{letter}) {text}" for letter, text in zip("ABCD", options)]
+    lines += [answer_line, "Explanation: Paris is the capital of France."]
+    return "\n".join(lines)
+
+
+def test_answer_letter_with_delimiter():
+    for answer_line in ("Correct Answer: C) a capital city", "Correct Answer: C", "**Answer:** (C)", "Answer: C. a capital city", "Answer: C - a capital city"):
+        parsed = parse_single_quiz_question_markdown(quiz_markdown(answer_line))
+        assert parsed is not None, answer_line
+        assert parsed["correct_answer_letter"] == "C", answer_line
+
+
+def test_answer_text_starting_with_an_article_is_not_a_letter():
+    parsed = parse_single_quiz_question_markdown(quiz_markdown("Answer: a capital city"))
+    assert parsed["correct_answer_letter"] == "C"
+    assert parsed["correct_answer_full"] == "C) a capital city"
+
+
+def test_answer_text_matches_option_case_insensitively():
+    parsed = parse_single_quiz_question_markdown(quiz_markdown("Answer: LYON"))
+    assert parsed["correct_answer_letter"] == "B"
+
+
+def test_answer_naming_no_option_is_rejected():
+    assert parse_single_quiz_question_markdown(quiz_markdown("Answer: a small town")) is None
+    assert parse_single_quiz_question_markdown(quiz_markdown("Answer: E")) is None
+
+
+def test_lowercase_bare_letter():
+    parsed = parse_single_quiz_question_markdown(quiz_markdown("Answer: d"))
+    assert parsed["correct_answer_letter"] == "D"
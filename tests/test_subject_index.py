@@ -0,0 +1,38 @@
+from subject_index import SubjectIndex, same_words
+
+
+def index_of(*subjects):
+    subject_index = SubjectIndex(path=None)
+    subject_index.add_many(subjects)
+    return subject_index
+
+
+def test_near_miss_subjects_are_not_reused():
+    subject_index = index_of("Organic Chemistry", "Calculus 1", "C Programming")
+    assert subject_index.match("Inorganic Chemistry") is None
+    assert subject_index.match("Biochemistry") is None
+    assert subject_index.match("Calculus 2") is None
+    assert subject_index.match("R Programming") is None
+
+
+def test_near_duplicate_subjects_are_reused():
+    subject_index = index_of("Java Programming", "Quantum Field Theory", "Organic Chemistry")
+    assert subject_index.match("Programming in Java").subject == "Java Programming"
+    assert subject_index.match("java programing").subject == "Java Programming"
+    assert subject_index.match("Quantum Field Theroy", threshold=0.7).subject == "Quantum Field Theory"
+    assert subject_index.match("organic chemistry").score == 1.0
+
+
+def test_a_near_miss_does_not_hide_a_real_match():
+    subject_index = index_of("Inorganic Chemistry", "Organic Chemistry Basics")
+    assert subject_index.match("Organic Chemistry") is None
+    subject_index.add("Organic Chemistry")
+    assert subject_index.match("Organic Chemistry").subject == "Organic Chemistry"
+    assert subject_index.match("Organic Chemistyr", threshold=0.7).subject == "Organic Chemistry"
+
+
+def test_same_words():
+    assert same_words("Theory of Quantum Field", "Quantum Field Theory")
+    assert same_words("Neural Networks", "neural network")
+    assert not same_words("Inorganic Chemistry", "Organic Chemistry")
+    assert not same_words("Linear Algebra", "Linear Algebra II")
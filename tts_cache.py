@@ -0,0 +1,183 @@
+import hashlib
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+DEFAULT_TTS_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "tts")
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz), about 26 ms of audio
+_SILENT_MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+def split_into_chunks(text, max_chars=400):
+    """Split text into paragraph/sentence chunks of at most ``max_chars`` characters.
+
+    Short neighbouring pieces are merged so each chunk is a reasonable unit
+    to synthesize on its own.
+    """
+    pieces = []
+    for paragraph in re.split(r'\n\s*\n|\n', text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in re.split(r'(?<=[.!?;:])\s+', paragraph):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:].strip()
+            if sentence:
+                pieces.append(sentence)
+
+    chunks = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + 1 + len(piece) <= max_chars:
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+class GTTSSynthesizer:
+    name = "gtts"
+
+    def __init__(self, lang="en"):
+        self.lang = lang
+
+    def synthesize(self, text):
+        from gtts import gTTS
+        import io
+
+        audio_bytes_io = io.BytesIO()
+        gTTS(text=text, lang=self.lang).write_to_fp(audio_bytes_io)
+        return audio_bytes_io.getvalue()
+
+
+class StubSynthesizer:
+    """Offline stand-in: silent MP3 whose length scales with the text."""
+
+    name = "stub"
+
+    def __init__(self, lang="en"):
+        self.lang = lang
+
+    def synthesize(self, text):
+        # Roughly 15 characters per second of speech, ~38 frames per second
+        return _SILENT_MP3_FRAME * max(1, len(text) * 38 // 15)
+
+
+TTS_BACKENDS = {
+    GTTSSynthesizer.name: GTTSSynthesizer,
+    StubSynthesizer.name: StubSynthesizer,
+}
+
+
+def get_synthesizer(name="gtts", lang="en"):
+    try:
+        return TTS_BACKENDS[name](lang=lang)
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend '{name}'. Available: {', '.join(sorted(TTS_BACKENDS))}") from None
+
+
+class TTSAudioCache:
+    """Size-bounded on-disk store of synthesized MP3 chunks keyed by content hash.
+
+    The directory is scanned once at startup into an in-memory LRU index
+    (key -> size, least recently used first), so eviction never walks it.
+    """
+
+    def __init__(self, directory=DEFAULT_TTS_CACHE_DIR, max_bytes=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # File mtimes carry the LRU order across restarts
+        self._sizes = OrderedDict(
+            (os.path.basename(path).removesuffix(".mp3"), size)
+            for path, size, _ in sorted(self._entries(), key=lambda entry: entry[2])
+        )
+        self._total_bytes = sum(self._sizes.values())
+
+    @staticmethod
+    def make_key(backend_name, lang, text):
+        return hashlib.sha256(f"{backend_name}\0{lang}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.mp3")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                if file_name.endswith(".mp3"):
+                    path = os.path.join(root, file_name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as audio_file:
+                audio_bytes = audio_file.read()
+            # mtime doubles as the LRU timestamp
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                # Removed behind our back (e.g. by another process sharing the directory)
+                self._total_bytes -= self._sizes.pop(key, 0)
+            return None
+        with self._lock:
+            self.hits += 1
+            if key in self._sizes:
+                self._sizes.move_to_end(key)
+        return audio_bytes
+
+    def put(self, key, audio_bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as audio_file:
+            audio_file.write(audio_bytes)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._total_bytes += len(audio_bytes) - self._sizes.pop(key, 0)
+            self._sizes[key] = len(audio_bytes)
+            self._evict()
+
+    def _evict(self):
+        # Called with the lock held; least recently used first, O(1) per evicted chunk
+        while self._total_bytes > self.max_bytes and len(self._sizes) > 1:
+            key, size = self._sizes.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {"bytes": self._total_bytes, "hits": self.hits, "misses": self.misses}
+
+
+def synthesize_chunk(synthesizer, audio_cache, text):
+    key = TTSAudioCache.make_key(synthesizer.name, synthesizer.lang, text)
+    audio_bytes = audio_cache.get(key)
+    if audio_bytes is None:
+        audio_bytes = synthesizer.synthesize(text)
+        audio_cache.put(key, audio_bytes)
+    return key, audio_bytes
+
+
+def submit_chunks(executor, synthesizer, audio_cache, chunks):
+    """Start synthesizing every chunk in parallel; futures are returned in playback order."""
+    return [executor.submit(synthesize_chunk, synthesizer, audio_cache, chunk) for chunk in chunks]
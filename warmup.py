@@ -0,0 +1,381 @@
+import atexit
+import heapq
+import os
+import sqlite3
+import threading
+import time
+
+from llm_scheduler import TokenBucket
+
+DEFAULT_WARMUP_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "warmup.sqlite3")
+DEFAULT_HALF_LIFE_SECONDS = 3 * 24 * 3600
+DEFAULT_TOP_N = 20
+# Decayed request count before something is popular enough to pre-generate: about two recent requests
+DEFAULT_MIN_DEMAND = 1.5
+# Demand that has decayed below this is forgotten
+MIN_TRACKED_SCORE = 0.05
+PRUNE_SECONDS = 3600
+RETRY_FAILED_SECONDS = 15 * 60
+# Coverage is re-checked this often even without new demand, so expired cache entries are noticed
+REPLAN_SECONDS = 60.0
+
+WARMUP_STOPPED = "stopped"
+WARMUP_WAITING = "waiting"
+WARMUP_OVER_BUDGET = "over_budget"
+WARMUP_WARMING = "warming"
+WARMUP_COVERED = "covered"
+
+
+def demand_key(label):
+    # "Java  programming" and "java programming" are the same request, as for the content cache
+    return " ".join(label.casefold().split())
+
+
+class DemandTracker:
+    """How often each piece of content was asked for, with exponential decay.
+
+    Counts are kept per (kind, key) and halve every ``half_life_s``, so the
+    ranking follows what learners ask for now. ``record`` only touches
+    memory; ``flush`` (called by the warmer thread) writes the changes to
+    SQLite, so demand survives restarts.
+    """
+
+    def __init__(self, path=DEFAULT_WARMUP_DB_PATH, half_life_s=DEFAULT_HALF_LIFE_SECONDS):
+        self.path = path
+        self.half_life_s = half_life_s
+        self.version = 0
+        # (kind, key) -> [label, score at updated_at, updated_at]
+        self._entries = {}
+        self._dirty = set()
+        self._pruned_at = time.time()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS demand ("
+            " kind TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " label TEXT NOT NULL,"
+            " score REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (kind, key))"
+        )
+        self._conn.commit()
+        for kind, key, label, score, updated_at in self._conn.execute("SELECT kind, key, label, score, updated_at FROM demand"):
+            self._entries[(kind, key)] = [label, score, updated_at]
+        atexit.register(self.flush)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _decayed(self, score, updated_at, now):
+        return score * 0.5 ** (max(0.0, now - updated_at) / self.half_life_s)
+
+    def record(self, kind, label, weight=1.0):
+        key = demand_key(label)
+        if not key:
+            return
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            score = self._decayed(entry[1], entry[2], now) if entry is not None else 0.0
+            self._entries[(kind, key)] = [" ".join(label.split()), score + weight, now]
+            self._dirty.add((kind, key))
+            self.version += 1
+
+    def top(self, kind, count, min_score=0.0):
+        """The ``count`` most requested (key, label, score) of ``kind`` scoring at least ``min_score``."""
+        now = time.time()
+        with self._lock:
+            scored = [
+                (self._decayed(score, updated_at, now), key, label)
+                for (entry_kind, key), (label, score, updated_at) in self._entries.items() if entry_kind == kind
+            ]
+        return [(key, label, score) for score, key, label in heapq.nlargest(count, scored) if score >= min_score]
+
+    def flush(self):
+        # Writes changed entries; about once an hour also forgets those that decayed away
+        now = time.time()
+        forgotten = []
+        with self._lock:
+            if now - self._pruned_at >= PRUNE_SECONDS:
+                self._pruned_at = now
+                forgotten = [entry_key for entry_key, (_, score, updated_at) in self._entries.items() if self._decayed(score, updated_at, now) < MIN_TRACKED_SCORE]
+                for entry_key in forgotten:
+                    del self._entries[entry_key]
+                    self._dirty.discard(entry_key)
+            rows = [(kind, key, *self._entries[(kind, key)]) for kind, key in self._dirty]
+            self._dirty.clear()
+        if not rows and not forgotten:
+            return
+        with self._db_lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO demand (kind, key, label, score, updated_at) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._conn.executemany("DELETE FROM demand WHERE kind = ? AND key = ?", forgotten)
+            self._conn.commit()
+
+
+class WarmupYield(Exception):
+    """A warm-up task stopped to make room for other LLM work or to stay within its budget."""
+
+
+class WarmupTask:
+    """One item being warmed, handed to its kind's ``warm`` handler."""
+
+    def __init__(self, warmer, kind, key, label):
+        self.kind = kind
+        self.key = key
+        self.label = label
+        # Why the task gave way, once it has
+        self.yielded = None
+        self._warmer = warmer
+
+    def charge(self, estimated_tokens):
+        """Take one request and ``estimated_tokens`` from the warm-up budget; call before every LLM request.
+
+        Raises WarmupYield when other LLM work is waiting or the budget is
+        spent. Once a task has yielded, every later charge raises too.
+        """
+        self._warmer._charge(self, estimated_tokens)
+
+
+class _PlanItem:
+    __slots__ = ("kind", "key", "label", "score", "warm")
+
+    def __init__(self, kind, key, label, score):
+        self.kind = kind
+        self.key = key
+        self.label = label
+        self.score = score
+        self.warm = False
+
+
+class Warmer:
+    """Pre-generates the most requested content while the LLM is otherwise idle.
+
+    Every kind of content is registered with ``is_warm(label)``, a cheap
+    check that it is already stored, ``warm(task)``, which generates it, and
+    optionally ``related(label)``: (kind, label) pairs to warm along with a
+    warm item, ranked with its demand (e.g. a curriculum's first topics).
+    One background thread keeps a plan of the ``top_n`` most requested
+    items of each kind with at least ``min_demand`` requests, and warms the
+    most requested cold one whenever ``is_idle()`` holds. Every LLM request
+    of a task is first charged to the warm-up's own requests/min and
+    tokens/min budget; the task yields as soon as ``is_idle()`` fails or the
+    budget is spent, and is simply run again later, so handlers should store
+    each call's result (e.g. in the content cache) to resume cheaply.
+    """
+
+    def __init__(self, demand, is_idle, requests_per_minute=6, tokens_per_minute=6000, top_n=DEFAULT_TOP_N, min_demand=DEFAULT_MIN_DEMAND, poll_seconds=1.0):
+        self.demand = demand
+        self.is_idle = is_idle
+        self.top_n = top_n
+        self.min_demand = min_demand
+        self.poll_seconds = poll_seconds
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.state = WARMUP_STOPPED
+        self.current = None
+        self.last_error = None
+        self._handlers = {}
+        # Related items of warm items, looked up once per item
+        self._related = {}
+        self._failed_at = {}
+        self._plan = []
+        self._planned_at = None
+        self._planned_version = None
+        self._resume_at = 0.0
+        self._spend = {}
+        self._outcomes = {"warmed": 0, "failed": 0, "yielded": 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, kind, is_warm, warm, related=None):
+        self._handlers[kind] = (is_warm, warm, related)
+
+    def record(self, kind, label):
+        if kind in self._handlers:
+            self.demand.record(kind, label)
+
+    def start(self):
+        if self._thread is None:
+            self.state = WARMUP_WAITING
+            self._thread = threading.Thread(target=self._run_forever, name="warmup", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run_forever(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                # A broken check must not end warm-up for the rest of the process
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def run_once(self):
+        """One step of the background loop: warm the most requested cold item if the LLM is idle.
+
+        Returns the task's outcome ("warmed", "failed" or "yielded"), or
+        None when nothing was run.
+        """
+        self.demand.flush()
+        now = time.monotonic()
+        if self._planned_at is None or self._planned_version != self.demand.version or now - self._planned_at >= REPLAN_SECONDS:
+            self._replan()
+        if not self.is_idle():
+            self.state = WARMUP_WAITING
+            return None
+        with self._lock:
+            if max(self._resume_at - now, self.request_bucket.delay_for(1, now)) > 0:
+                self.state = WARMUP_OVER_BUDGET
+                return None
+            item = next((
+                item for item in self._plan
+                if not item.warm and now - self._failed_at.get((item.kind, item.key), -RETRY_FAILED_SECONDS) >= RETRY_FAILED_SECONDS
+            ), None)
+        if item is None:
+            self.state = WARMUP_COVERED
+            return None
+        return self._run_task(item)
+
+    def _replan(self):
+        version = self.demand.version
+        items = {}
+        for kind in self._handlers:
+            for key, label, score in self.demand.top(kind, self.top_n, self.min_demand):
+                items[(kind, key)] = _PlanItem(kind, key, label, score)
+        self._check(items.values())
+
+        related_items = {}
+        for item in list(items.values()):
+            related = self._handlers[item.kind][2]
+            if related is None:
+                continue
+            if not item.warm:
+                # Looked up again once it is warm (e.g. the curriculum was regenerated)
+                self._related.pop((item.kind, item.key), None)
+                continue
+            if (item.kind, item.key) not in self._related:
+                self._related[(item.kind, item.key)] = list(related(item.label))
+            for related_kind, related_label in self._related[(item.kind, item.key)]:
+                entry_key = (related_kind, demand_key(related_label))
+                if related_kind not in self._handlers or not entry_key[1]:
+                    continue
+                existing = items.get(entry_key) or related_items.get(entry_key)
+                if existing is None:
+                    related_items[entry_key] = _PlanItem(related_kind, entry_key[1], related_label, item.score)
+                else:
+                    existing.score = max(existing.score, item.score)
+        self._check(related_items.values())
+        items.update(related_items)
+
+        plan = sorted(items.values(), key=lambda item: item.score, reverse=True)
+        with self._lock:
+            self._plan = plan
+        self._planned_at = time.monotonic()
+        self._planned_version = version
+
+    def _check(self, items):
+        for item in items:
+            item.warm = bool(self._handlers[item.kind][0](item.label))
+
+    def _run_task(self, item):
+        task = WarmupTask(self, item.kind, item.key, item.label)
+        self.state = WARMUP_WARMING
+        self.current = (item.kind, item.label)
+        error = None
+        try:
+            self._handlers[item.kind][1](task)
+            if task.yielded is None and not self._handlers[item.kind][0](item.label):
+                error = "generated, but still not stored"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        if task.yielded is not None:
+            outcome = "yielded"
+        elif error is not None:
+            outcome = "failed"
+            self.last_error = f"{item.kind} '{item.label}': {error}"
+        else:
+            outcome = "warmed"
+        with self._lock:
+            self._outcomes[outcome] += 1
+            if outcome == "failed":
+                self._failed_at[(item.kind, item.key)] = time.monotonic()
+            else:
+                self._failed_at.pop((item.kind, item.key), None)
+        self.state = WARMUP_OVER_BUDGET if task.yielded == "budget" else WARMUP_WAITING
+        self.current = None
+        self._planned_at = None
+        return outcome
+
+    def _charge(self, task, estimated_tokens):
+        if task.yielded is None and not self.is_idle():
+            task.yielded = "busy"
+        with self._lock:
+            if task.yielded is None:
+                now = time.monotonic()
+                delay = max(self.request_bucket.delay_for(1, now), self.token_bucket.delay_for(estimated_tokens, now))
+                if delay <= 0:
+                    self.request_bucket.consume(1)
+                    self.token_bucket.consume(estimated_tokens)
+                    spend = self._spend.setdefault(task.kind, {"requests": 0, "tokens": 0})
+                    spend["requests"] += 1
+                    spend["tokens"] += estimated_tokens
+                    return
+                task.yielded = "budget"
+                self._resume_at = now + delay
+        raise WarmupYield(f"warm-up of {task.kind} '{task.label}' gave way ({task.yielded})")
+
+    def plan(self):
+        with self._lock:
+            return [{"kind": item.kind, "label": item.label, "demand": item.score, "warm": item.warm} for item in self._plan]
+
+    def stats(self):
+        with self._lock:
+            plan = list(self._plan)
+            spend = {kind: dict(kind_spend) for kind, kind_spend in self._spend.items()}
+            outcomes = dict(self._outcomes)
+        by_kind = {kind: {"items": 0, "warm": 0} for kind in self._handlers}
+        for item in plan:
+            by_kind[item.kind]["items"] += 1
+            by_kind[item.kind]["warm"] += item.warm
+        warm = sum(kind_items["warm"] for kind_items in by_kind.values())
+        return {
+            "state": self.state,
+            "current": self.current,
+            "tracked": len(self.demand),
+            "items": len(plan),
+            "warm": warm,
+            # Nothing popular yet counts as fully covered
+            "coverage": warm / len(plan) if plan else 1.0,
+            "by_kind": by_kind,
+            "requests": sum(kind_spend["requests"] for kind_spend in spend.values()),
+            "tokens": sum(kind_spend["tokens"] for kind_spend in spend.values()),
+            "spend_by_kind": spend,
+            **outcomes,
+            "last_error": self.last_error,
+        }
+
+    def gauges(self):
+        stats = self.stats()
+        gauges = [
+            ("warmup_coverage_ratio", {}, stats["coverage"]),
+            ("warmup_demand_tracked", {}, stats["tracked"]),
+            *[("warmup_tasks", {"outcome": outcome}, stats[outcome]) for outcome in ("warmed", "failed", "yielded")],
+        ]
+        for kind, kind_items in stats["by_kind"].items():
+            gauges.append(("warmup_items", {"kind": kind, "state": "warm"}, kind_items["warm"]))
+            gauges.append(("warmup_items", {"kind": kind, "state": "cold"}, kind_items["items"] - kind_items["warm"]))
+        for kind, kind_spend in stats["spend_by_kind"].items():
+            for unit in ("requests", "tokens"):
+                gauges.append(("warmup_spend", {"kind": kind, "unit": unit}, kind_spend[unit]))
+        return gauges